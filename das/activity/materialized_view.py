@@ -1,12 +1,15 @@
+import datetime
+import hashlib
 import json
 import logging
 
-from activity.models import EventType
+import dateutil.parser
+
+from activity.models import Event, EventDetails, EventType
 from utils import schema_utils
 
-from django.db import connection
+from django.db import connection, transaction
 
-cursor = connection.cursor()
 table_name = 'event_details_view'
 
 invalid_eventtypes = []
@@ -45,21 +48,37 @@ CREATE_EVENT_DETAILS_VIEW_INDEX_SQL = '''
 CREATE UNIQUE INDEX IF NOT EXISTS event_details_view_index ON event_details_view (event_id);
 '''
 
-def generate_DDL():
+# Re-process rows touched shortly before the last sync, to cover transactions
+# that were still in flight when it ran. Re-upserting a row is harmless.
+SYNC_OVERLAP = datetime.timedelta(minutes=5)
+
+# Cache of generated SELECT statements, keyed by a hash of the EventType schemas.
+_select_cache = {}
+
+
+def generate_select(schema_accumulator=None):
+    schema_accumulator = load_schema() if schema_accumulator is None else schema_accumulator
     lines = []
-    lines.append(
-        f'create materialized view if not exists {table_name} as select ')
     lines.append('ed.event_id, et.display as "event_type", ')
 
     fieldset = set()
-    schema_accumulator = load_schema()
     for json_path, data_type in generate_field_details(schema_accumulator):
         fielddef = query_statement(json_path, data_type)
         fieldset.add(fielddef)
-    lines.append(',\n'.join(fieldset))
+    # Sorted so the generated DDL is stable from one run to the next.
+    lines.append(',\n'.join(sorted(fieldset)))
     lines.append(' from activity_eventdetails ed ')
     lines.append(' join activity_event e on e.id = ed.event_id ')
-    lines.append(' join activity_eventtype et on et.id = e.event_type_id; ')
+    lines.append(' join activity_eventtype et on et.id = e.event_type_id ')
+    return lines
+
+
+def generate_DDL():
+    lines = []
+    lines.append(
+        f'create table if not exists {table_name} as select ')
+    lines.extend(generate_select())
+    lines[-1] += '; '
     lines.append(CREATE_EVENT_DETAILS_VIEW_INDEX_SQL)
     return lines
 
@@ -95,12 +114,51 @@ def _cursor():
     return cursor
 
 
-def execute_DDL():
-    query_string = ''
-    for line in generate_DDL():
-        query_string += line
+def schema_hash():
+    """
+    Hash of every EventType schema and display name, used to decide whether
+    the table needs to be regenerated. The display name is included because
+    it is copied into the event_type column of every row of that type.
+    """
+    digest = hashlib.md5()
+    for et_id, display, schema in EventType.objects.order_by('id').values_list(
+            'id', 'display', 'schema'):
+        digest.update(str(et_id).encode('utf-8'))
+        digest.update((display or '').encode('utf-8'))
+        digest.update((schema or '').encode('utf-8'))
+    return digest.hexdigest()
+
+
+def get_sync_state():
     cursor = _cursor()
-    cursor.execute(query_string)
+    cursor.execute(f"SELECT obj_description('public.{table_name}'::regclass, 'pg_class')")
+    row = cursor.fetchone()
+    try:
+        return json.loads(row[0]) if row and row[0] else {}
+    except json.decoder.JSONDecodeError:
+        return {}
+
+
+def set_sync_state(cursor, state):
+    cursor.execute(f'COMMENT ON TABLE {table_name} IS %s', (json.dumps(state),))
+
+
+def _sync_started_at(cursor):
+    cursor.execute('SELECT now()')
+    return cursor.fetchone()[0]
+
+
+def execute_DDL():
+    current_hash = schema_hash()
+    with transaction.atomic():
+        cursor = _cursor()
+        started_at = _sync_started_at(cursor)
+        query_string = ''
+        for line in generate_DDL():
+            query_string += line
+        cursor.execute(query_string)
+        set_sync_state(cursor, {'schema_hash': current_hash,
+                                'synced_at': started_at.isoformat()})
 
 
 def check_db_view_exists():
@@ -110,21 +168,104 @@ def check_db_view_exists():
     return bool(view_exist)
 
 
-def re_create_view():
+def is_materialized_view():
+    cursor = _cursor()
+    cursor.execute('SELECT 1 FROM pg_matviews WHERE matviewname = %s', (table_name,))
+    return cursor.fetchone() is not None
+
+
+def drop_view():
     if check_db_view_exists():
+        kind = 'MATERIALIZED VIEW' if is_materialized_view() else 'TABLE'
         cursor = _cursor()
-        cursor.execute(f'DROP MATERIALIZED VIEW IF EXISTS {table_name}')
+        cursor.execute(f'DROP {kind} IF EXISTS {table_name}')
+
+
+def re_create_view():
+    drop_view()
     execute_DDL()
     return invalid_eventtypes
 
 
+def get_select_statement(current_hash):
+    if current_hash not in _select_cache:
+        _select_cache.clear()
+        _select_cache[current_hash] = 'select ' + ''.join(generate_select())
+    return _select_cache[current_hash]
+
+
+def changed_event_ids(since):
+    event_ids = set(EventDetails.objects.filter(
+        updated_at__gte=since).values_list('event_id', flat=True))
+    event_ids.update(Event.objects.filter(
+        updated_at__gte=since).values_list('id', flat=True))
+    return event_ids
+
+
+def upsert_event_details(event_ids, select_statement):
+    """
+    Replace the rows of the given events with freshly computed ones. Events
+    that no longer have details are simply removed.
+    """
+    event_ids = [str(event_id) for event_id in event_ids]
+    if not event_ids:
+        return
+    cursor = _cursor()
+    cursor.execute(f'DELETE FROM {table_name} WHERE event_id = ANY(%s::uuid[])', (event_ids,))
+    cursor.execute(f'INSERT INTO {table_name} {select_statement} WHERE ed.event_id = ANY(%s::uuid[])',
+                   (event_ids,))
+
+
+def delete_event_details(event_ids):
+    if not check_db_view_exists() or is_materialized_view():
+        return
+    cursor = _cursor()
+    cursor.execute(f'DELETE FROM {table_name} WHERE event_id = ANY(%s::uuid[])',
+                   ([str(event_id) for event_id in event_ids],))
+
+
+def update_event_details(event_ids):
+    """
+    Re-upsert the rows of the given events, e.g. after one of their
+    EventDetails was deleted. Skipped while the table awaits regeneration,
+    since the next refresh rebuilds it anyway.
+    """
+    if not check_db_view_exists() or is_materialized_view():
+        return
+    current_hash = schema_hash()
+    if get_sync_state().get('schema_hash') != current_hash:
+        return
+    with transaction.atomic():
+        upsert_event_details(event_ids, get_select_statement(current_hash))
+
+
 def refresh_materialized_view():
-    if check_db_view_exists():
+    """
+    Bring event_details_view up to date. The table is only rebuilt when an
+    EventType schema has changed (or it is still a materialized view);
+    otherwise only events changed since the previous sync are upserted.
+    """
+    if not check_db_view_exists() or is_materialized_view():
+        re_create_view()
+        return invalid_eventtypes
+
+    current_hash = schema_hash()
+    state = get_sync_state()
+    if state.get('schema_hash') != current_hash or not state.get('synced_at'):
+        logger.info('EventType schemas changed, regenerating %s.', table_name)
+        re_create_view()
+        return invalid_eventtypes
+
+    select_statement = get_select_statement(current_hash)
+    since = dateutil.parser.parse(state['synced_at']) - SYNC_OVERLAP
+    with transaction.atomic():
         cursor = _cursor()
-        cursor.execute(CREATE_EVENT_DETAILS_VIEW_INDEX_SQL)
-        cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {table_name}")
-    else:
-        execute_DDL()
+        started_at = _sync_started_at(cursor)
+        event_ids = changed_event_ids(since)
+        upsert_event_details(event_ids, select_statement)
+        set_sync_state(cursor, {'schema_hash': current_hash,
+                                'synced_at': started_at.isoformat()})
+    logger.info('Upserted %s rows into %s.', len(event_ids), table_name)
     return invalid_eventtypes
 
 
@@ -0,0 +1,17 @@
+# Generated by Django 3.1 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity', '0135_removing_enable_geometry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventdetails',
+            index=models.Index(fields=['updated_at'], name='activity_ev_updated_64dc9e_idx'),
+        ),
+    ]
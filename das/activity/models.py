@@ -9,6 +9,7 @@ from operator import attrgetter, itemgetter
 import pytz
 from versatileimagefield.fields import VersatileImageField
 
+import django.dispatch
 import django.utils
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -37,7 +38,7 @@ from observations.models import Subject, SubjectGroup, SubjectStatus
 from observations.utils import dateparse as dparse
 from observations.utils import is_banned
 from revision.manager import (Revision, RevisionAdapter, RevisionMixin,
-                              relation_deleted)
+                              bulk_update_with_revisions, relation_deleted)
 from utils.gis import convert_to_point
 from utils.html import clean_user_text
 
@@ -524,7 +525,31 @@ class EventFilteringQuerySet(models.QuerySet, FilterFieldMixin):
             return self.filter(updated_at__lte=upper)
 
 
+# Sent after parent collections were updated in bulk (bypassing Event.save).
+parent_events_updated = django.dispatch.Signal(providing_args=['event_ids'])
+
+
 class EventManager(models.Manager):
+    def touch_parent_events(self, event_ids, updated_at, sort_at, user=None):
+        """
+        Set updated_at and sort_at on every event having a 'contains'
+        relationship directed at one of event_ids. As Event.save does,
+        parents stuck on 'new' are moved to 'active'.
+
+        :return: list of the parent event ids that were updated.
+        """
+        if not event_ids:
+            return []
+        parents = self.filter(out_relationship__to_event__in=event_ids,
+                              out_relationship__type__value='contains')
+        with transaction.atomic():
+            parent_ids = bulk_update_with_revisions(
+                parents.exclude(state=Event.SC_NEW), user=user, updated_at=updated_at, sort_at=sort_at)
+            parent_ids += bulk_update_with_revisions(
+                parents.filter(state=Event.SC_NEW), user=user, updated_at=updated_at, sort_at=sort_at,
+                state=Event.SC_ACTIVE)
+        return parent_ids
+
     def create_event(self, **values):
         patrol_segments = values.pop('patrol_segments', None)
         event = self.create(**values)
@@ -975,24 +1000,24 @@ class Event(RevisionMixin, TimestampedModel):
             self.sort_at = self.updated_at
             self.save()
 
-    def update_parent_events(self, **kwargs):
-        # This updates all events having a 'contains' relationship directed at this event. (Ex. parent collections).
-        # Event.objects.filter(out_relationship__to_event=self, out_relationship__type__value='contains') \
-        #     .update(**kwargs)
+    def update_parent_events(self, updated_at=None, sort_at=None, **kwargs):
         '''
         This finds all the events having an indegree relation to this event, and updates them.
 
         The value 'contains' is a magic value that represents a relationship between a collection-event and another event.
-        :param kwargs: Unused
-        :return: None
+        The parents are updated with a single UPDATE; their revisions are written in bulk and
+        parent_events_updated is sent so notifications can be batched.
+        :param updated_at: timestamp to apply to the parents (defaults to this event's).
+        :param sort_at: sort timestamp to apply to the parents (defaults to this event's).
+        :return: list of parent event ids that were updated.
         '''
-
-        parents = Event.objects.filter(
-            out_relationship__to_event=self, out_relationship__type__value='contains')
-        for parent in parents:
-            parent.updated_at = self.updated_at
-            parent.sort_at = self.sort_at
-            parent.save(notify_parent_events=False)
+        parent_ids = Event.objects.touch_parent_events(
+            [self.id],
+            updated_at=updated_at or self.updated_at,
+            sort_at=sort_at or self.sort_at)
+        if parent_ids:
+            parent_events_updated.send(sender=Event, event_ids=parent_ids)
+        return parent_ids
 
     def save(self, *args, notify_parent_events=True, **kwargs):
         """
@@ -1210,6 +1235,11 @@ class EventDetails(RevisionMixin, TimestampedModel):
     data = models.JSONField()
     revision = Revision()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
     def save(self, *args, update_parent_event=True, **kwargs):
         result = super().save(*args, **kwargs)
         if update_parent_event:
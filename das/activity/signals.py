@@ -10,9 +10,12 @@ from django.dispatch import receiver
 from django.utils.text import slugify
 
 from accounts.models.permissionset import PermissionSet
+from activity import materialized_view
 from activity.models import (PC_DONE, PC_OPEN, Event, EventCategory,
-                             EventGeometry, EventPhoto, Patrol, PatrolFile,
-                             PatrolNote, PatrolSegment)
+                             EventDetails, EventGeometry, EventPhoto,
+                             EventType, Patrol, PatrolFile, PatrolNote,
+                             PatrolSegment, parent_events_updated)
+from choices.cache import DYNAMIC_VERSION_KEY, choice_versions_changed
 from das_server import celery, pubsub
 from usercontent.tasks import imagefile_rendered
 
@@ -35,12 +38,77 @@ def event_post_save(sender, instance, created, **kwargs):
         verify_patrol_constituent_for_rt_messaging(segment)
 
 
+def publish_bulk_event_updates(event_ids):
+    """
+    Notify for events changed by a bulk UPDATE (which bypasses
+    event_post_save): one batched pubsub message plus alert evaluation, and
+    one for the patrols whose segments the events are linked to.
+    """
+    event_ids = [str(event_id) for event_id in event_ids]
+    if not event_ids:
+        return
+    patrol_ids = [str(patrol_id) for patrol_id in Patrol.objects.filter(
+        patrol_segment__event__id__in=event_ids).values_list('id', flat=True).distinct()]
+
+    def publish():
+        pubsub.publish({'event_ids': event_ids}, 'das.event.update')
+        for event_id in event_ids:
+            celery.app.send_task(
+                'activity.tasks.evaluate_alert_rules', args=(event_id, False))
+        if patrol_ids:
+            pubsub.publish({'patrol_ids': patrol_ids}, 'das.patrol.update')
+
+    transaction.on_commit(publish)
+
+
+def publish_bulk_patrol_updates(patrol_ids):
+    """
+    Notify for patrols changed by a bulk UPDATE (which bypasses
+    patrol_post_save).
+    """
+    patrol_ids = [str(patrol_id) for patrol_id in patrol_ids]
+    if not patrol_ids:
+        return
+    transaction.on_commit(lambda: pubsub.publish(
+        {'patrol_ids': patrol_ids}, 'das.patrol.update'))
+    update_patrols_view(patrol_ids)
+
+
+@receiver(parent_events_updated, sender=Event)
+def parent_events_post_update(sender, event_ids, **kwargs):
+    logger.info("updated parent events {}".format(event_ids))
+    publish_bulk_event_updates(event_ids)
+
+
 @receiver(post_delete, sender=Event)
 def event_post_delete(sender, instance, **kwargs):
     logger.info("delete event {}".format(instance.pk))
     transaction.on_commit(lambda: pubsub.publish(
         {'event_id': str(instance.pk)},
         'das.event.delete'))
+    transaction.on_commit(lambda: remove_event_details_row(instance.pk))
+
+
+def remove_event_details_row(event_id):
+    try:
+        materialized_view.delete_event_details([event_id])
+    except Exception:
+        logger.exception('Failed to remove event %s from event_details_view.', event_id)
+
+
+@receiver(post_delete, sender=EventDetails)
+def event_details_post_delete(sender, instance, **kwargs):
+    # The incremental refresh only sees rows that still exist, so deletes are
+    # applied here; the event's remaining details (if any) are re-upserted.
+    event_id = instance.event_id
+    transaction.on_commit(lambda: update_event_details_row(event_id))
+
+
+def update_event_details_row(event_id):
+    try:
+        materialized_view.update_event_details([event_id])
+    except Exception:
+        logger.exception('Failed to update event %s in event_details_view.', event_id)
 
 
 @receiver(post_delete, sender=EventGeometry)
@@ -80,6 +148,7 @@ def patrol_post_save(sender, instance, created, **kwargs):
     patrol_action = 'das.patrol.new' if created else 'das.patrol.update'
     transaction.on_commit(lambda: pubsub.publish(
         {'patrol_id': str(instance.pk)}, patrol_action))
+    update_patrols_view((instance.pk,))
 
 
 @receiver(post_delete, sender=Patrol)
@@ -88,6 +157,13 @@ def patrol_post_delete(sender, instance, **kwargs):
     patrol_action = 'das.patrol.delete'
     transaction.on_commit(lambda: pubsub.publish(
         {'patrol_id': str(instance.pk)}, patrol_action))
+    update_patrols_view((instance.pk,))
+
+
+def update_patrols_view(patrol_ids):
+    patrol_ids = [str(patrol_id) for patrol_id in patrol_ids]
+    transaction.on_commit(lambda: celery.app.send_task(
+        'observations.tasks.update_patrols_view', args=(patrol_ids,)))
 
 
 @receiver(m2m_changed, sender=Event.patrol_segments.through)
@@ -108,6 +184,7 @@ def event_linked_to_patrol_segment(sender, instance, action, reverse, model, pk_
         event_ids = (instance.pk,) if isinstance(instance, Event) else pk_set
         transaction.on_commit(
             lambda: publish_patrol_event_actions(patrol_ids, event_ids))
+        update_patrols_view(patrol_ids)
 
 
 def verify_patrol_constituent_for_rt_messaging(instance):
@@ -125,6 +202,8 @@ def patrol_item_post_save(sender, instance, created, **kwargs):
         f"saved {sender._meta.verbose_name} {instance.pk}, created={str(created)}")
     set_eta(instance)
     verify_patrol_constituent_for_rt_messaging(instance)
+    if isinstance(instance, PatrolSegment) and instance.patrol_id:
+        update_patrols_view((instance.patrol_id,))
 
 
 @receiver(post_delete, sender=PatrolSegment)
@@ -133,6 +212,8 @@ def patrol_item_post_save(sender, instance, created, **kwargs):
 def patrol_item_post_delete(sender, instance, **kwargs):
     logger.info(f"deleted {sender._meta.verbose_name} {instance.pk}")
     verify_patrol_constituent_for_rt_messaging(instance)
+    if isinstance(instance, PatrolSegment) and instance.patrol_id:
+        update_patrols_view((instance.patrol_id,))
 
 
 def set_eta(instance):
@@ -202,3 +283,24 @@ def ensure_geographic_perms_exists(sender, **kwargs):
 def slugify_category_value_field(sender, instance, **kwargs):
     if instance._state.adding:
         instance.value = slugify(instance.value)
+
+
+def warm_event_type_schemas(event_type_ids=None):
+    from activity.tasks import warm_event_type_schemas as warm_task
+
+    args = ([str(event_type_id) for event_type_id in event_type_ids],) if event_type_ids else ()
+    transaction.on_commit(lambda: warm_task.apply_async(args=args))
+
+
+@receiver(post_save, sender=EventType)
+def event_type_post_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        warm_event_type_schemas([instance.id])
+
+
+@receiver(choice_versions_changed)
+def choice_versions_post_change(sender, version_keys, **kwargs):
+    # Dynamic choices change with the rows they are made of, those schemas
+    # are rendered again when next used instead.
+    if version_keys - {DYNAMIC_VERSION_KEY}:
+        warm_event_type_schemas()
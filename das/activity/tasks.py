@@ -10,12 +10,17 @@ from activity.alerting.service import evaluate_event
 from activity.materialized_view import (check_db_view_exists, re_create_view,
                                         refresh_materialized_view)
 from activity.models import (PC_DONE, PC_OPEN, SC_RESOLVED, AlertRule, Event,
-                             EventPhoto, Patrol,
+                             EventPhoto, EventType, Patrol,
                              RefreshRecreateEventDetailView)
 from activity.util import get_er_user
+from activity.signals import (publish_bulk_event_updates,
+                              publish_bulk_patrol_updates)
 from celery_once import QueueOnce
 from das_server import celery
+from django.db import transaction
 from django.db.models import DateTimeField, ExpressionWrapper, F, Q
+from revision.manager import bulk_update_with_revisions
+from utils.schema_utils import warm_rendered_schemas
 from versatileimagefield.image_warmer import VersatileImageFieldWarmer
 
 logger = logging.getLogger(__name__)
@@ -116,6 +121,18 @@ def send_alert_to_notificationmethod(alert_rule_id=None, event_id=None, notifica
                      notification_method_id=notification_method_id)
 
 
+@celery.app.task(base=QueueOnce, once={'graceful': True, })
+def warm_event_type_schemas(event_type_ids=None):
+    # Render event type schemas into the rendered schema cache, all of them
+    # unless event_type_ids is given.
+    event_types = EventType.objects.all()
+    if event_type_ids is not None:
+        event_types = event_types.filter(id__in=event_type_ids)
+    schemas = list(event_types.values_list('schema', flat=True))
+    failed = warm_rendered_schemas(schemas)
+    logger.info('Warmed rendered schemas. event_types=%s, failed=%s', len(schemas), failed)
+
+
 class EventDetailViewException(Exception):
     pass
 
@@ -187,27 +204,36 @@ def update_status_of_event_details_view_refresh(self, activity_and_status):
                                                   )
 
 
-@celery.app.task(base=QueueOnce, once={'graceful': True})
-def maintain_patrol_state():
+def transition_done_patrols():
+    """
+    Move every open patrol whose segments have all ended to 'done' with a
+    single UPDATE, recording revisions and notifying in bulk.
+    """
     now = datetime.now(tz=pytz.utc)
     done_patrols = Patrol.objects.filter(Q(patrol_segment__time_range__endswith__lte=now) & Q(
         state=PC_OPEN) & Q(patrol_segment__scheduled_end=None))
 
-    # Transition patrol state from open to done.
-    for instance in done_patrols:
-        instance.state = PC_DONE
-        instance.save()
+    # Patrol's pre_save signal would re-open a patrol that still has an
+    # open-ended segment, so leave those alone.
+    done_patrols = done_patrols.exclude(
+        patrol_segment__time_range__upper_inf=True)
+
+    patrol_ids = bulk_update_with_revisions(
+        done_patrols, state=PC_DONE, updated_at=now)
+    if patrol_ids:
+        logger.info('Transitioned %s patrols to done.', len(patrol_ids))
+        publish_bulk_patrol_updates(patrol_ids)
+    return patrol_ids
 
 
 @celery.app.task(base=QueueOnce, once={'graceful': True})
-def periodically_maintain_patrol_state():
-    now = datetime.now(tz=pytz.utc)
-    done_patrols = Patrol.objects.filter(Q(patrol_segment__time_range__endswith__lte=now) & Q(
-        state=PC_OPEN) & Q(patrol_segment__scheduled_end=None))
+def maintain_patrol_state():
+    transition_done_patrols()
 
-    for patrol in done_patrols:
-        patrol.state = PC_DONE
-        patrol.save()
+
+@celery.app.task(base=QueueOnce, once={'graceful': True})
+def periodically_maintain_patrol_state():
+    transition_done_patrols()
 
 
 @celery.app.task
@@ -220,7 +246,12 @@ def automatically_update_event_state():
     events = Event.objects.annotate(resolve_dt=expr).filter(resolve_dt__lte=now,
                                                             event_type__auto_resolve=True).exclude(state=SC_RESOLVED)
     er_system_user = get_er_user()
-    for e in events:
-        e.state = SC_RESOLVED
-        setattr(e, 'revision_user', er_system_user)
-        e.save()
+    with transaction.atomic():
+        event_ids = bulk_update_with_revisions(events, user=er_system_user,
+                                               state=SC_RESOLVED, sort_at=now, updated_at=now)
+        parent_ids = Event.objects.touch_parent_events(
+            event_ids, updated_at=now, sort_at=now, user=er_system_user)
+
+    if event_ids:
+        logger.info('Auto-resolved %s events.', len(event_ids))
+        publish_bulk_event_updates(set(event_ids) | set(parent_ids))
@@ -33,7 +33,7 @@ from activity import views
 from activity.models import (Event, EventCategory, EventDetails, EventNote,
                              EventProvider, EventRelationship, EventSource,
                              EventsourceEvent, EventType, Patrol,
-                             TSVectorModel, parse_date_range)
+                             PatrolSegment, TSVectorModel, parse_date_range)
 from activity.serializers import EventDetailsSerializer
 from activity.tasks import automatically_update_event_state
 from activity.tests import schema_examples
@@ -932,6 +932,95 @@ class TestEventView(BaseTestToolMixin, BaseAPITest):
         logger.debug(response_data)
         self.assertEqual(response.status_code, 201)
 
+    def test_child_save_updates_parent_collection(self):
+        collection_et = EventType.objects.get_by_value('incident_collection')
+        logistics_et = EventType.objects.get_by_value(ET_LOGISTICS)
+
+        event_collection = Event.objects.create(
+            title="incident_collection_event", event_type=collection_et)
+        child = Event.objects.create(title="Event_A", event_type=logistics_et)
+        EventRelationship.objects.add_relationship(
+            event_collection, child, 'contains')
+        revision_count = event_collection.revision.count()
+
+        child.title = "Event_A updated"
+        child.save()
+
+        event_collection.refresh_from_db()
+        self.assertEqual(event_collection.updated_at, child.updated_at)
+        self.assertEqual(event_collection.sort_at, child.sort_at)
+        self.assertEqual(event_collection.revision.count(), revision_count + 1)
+
+    def test_child_save_activates_new_parent_collection(self):
+        collection_et = EventType.objects.get_by_value('incident_collection')
+        logistics_et = EventType.objects.get_by_value(ET_LOGISTICS)
+
+        event_collection = Event.objects.create(
+            title="incident_collection_event", event_type=collection_et)
+        child = Event.objects.create(title="Event_A", event_type=logistics_et)
+        EventRelationship.objects.add_relationship(
+            event_collection, child, 'contains')
+        Event.objects.filter(id=event_collection.id).update(state=Event.SC_NEW)
+
+        child.title = "Event_A updated"
+        child.save()
+
+        event_collection.refresh_from_db()
+        self.assertEqual(event_collection.state, Event.SC_ACTIVE)
+        self.assertEqual(event_collection.updated_at, child.updated_at)
+        self.assertEqual(event_collection.revision.latest('sequence').data['state'], Event.SC_ACTIVE)
+
+    def test_automatically_update_event_state(self):
+        collection_et = EventType.objects.get_by_value('incident_collection')
+        logistics_et = EventType.objects.get_by_value(ET_LOGISTICS)
+        EventType.objects.filter(id=logistics_et.id).update(auto_resolve=True, resolve_time=1)
+
+        event_collection = Event.objects.create(
+            title="incident_collection_event", event_type=collection_et)
+        expired = Event.objects.create(title="Event_A", event_type=logistics_et)
+        recent = Event.objects.create(title="Event_B", event_type=logistics_et)
+        EventRelationship.objects.add_relationship(
+            event_collection, expired, 'contains')
+        Event.objects.filter(id=expired.id).update(
+            created_at=datetime.now(tz=pytz.utc) - timedelta(hours=2))
+        revision_count = expired.revision.count()
+
+        with mock.patch('activity.signals.transaction.on_commit', side_effect=lambda func: func()), \
+                mock.patch('activity.signals.pubsub.publish') as publish, \
+                mock.patch('activity.signals.celery.app.send_task'):
+            automatically_update_event_state()
+
+        expired.refresh_from_db()
+        event_collection.refresh_from_db()
+        self.assertEqual(expired.state, 'resolved')
+        self.assertNotEqual(Event.objects.get(id=recent.id).state, 'resolved')
+        self.assertEqual(expired.revision.count(), revision_count + 1)
+        self.assertEqual(expired.revision.latest('sequence').data['state'], 'resolved')
+        self.assertEqual(event_collection.updated_at, expired.updated_at)
+        self.assertEqual(event_collection.sort_at, expired.sort_at)
+
+        payload, routing_key = publish.call_args[0]
+        self.assertEqual(routing_key, 'das.event.update')
+        self.assertEqual(set(payload['event_ids']), {str(expired.id), str(event_collection.id)})
+
+    def test_automatically_update_event_state_publishes_patrol_update(self):
+        logistics_et = EventType.objects.get_by_value(ET_LOGISTICS)
+        EventType.objects.filter(id=logistics_et.id).update(auto_resolve=True, resolve_time=1)
+
+        patrol = Patrol.objects.create(title='Patrol with a report')
+        segment = PatrolSegment.objects.create(patrol=patrol)
+        expired = Event.objects.create(title="Event_A", event_type=logistics_et)
+        expired.patrol_segments.add(segment)
+        Event.objects.filter(id=expired.id).update(
+            created_at=datetime.now(tz=pytz.utc) - timedelta(hours=2))
+
+        with mock.patch('activity.signals.transaction.on_commit', side_effect=lambda func: func()), \
+                mock.patch('activity.signals.pubsub.publish') as publish, \
+                mock.patch('activity.signals.celery.app.send_task'):
+            automatically_update_event_state()
+
+        publish.assert_any_call({'patrol_ids': [str(patrol.id)]}, 'das.patrol.update')
+
     def test_collection_event_contains_with_different_user_permissions(self):
         # Create Event A, B and collection
         collection_et = EventType.objects.get_by_value('incident_collection')
@@ -1,6 +1,7 @@
 import json
 import uuid
 from collections import namedtuple
+from unittest import mock
 
 import django.db.models as models
 from django.contrib.admin.sites import AdminSite
@@ -10,6 +11,7 @@ from django.test import RequestFactory, override_settings
 
 from activity.admin import RefreshRecreateEventDetailViewAdmin
 from activity.materialized_view import (check_db_view_exists, generate_DDL,
+                                        get_sync_state, is_materialized_view,
                                         re_create_view,
                                         refresh_materialized_view)
 from activity.models import (Event, EventDetails, EventType,
@@ -53,6 +55,46 @@ class TestMaterializedView(BaseAPITest):
         refresh_materialized_view()
         self.assertTrue(check_db_view_exists())
 
+    def test_refresh_upserts_changed_events_only(self):
+        re_create_view()
+        self.assertFalse(is_materialized_view())
+        schema_hash_before = get_sync_state()['schema_hash']
+
+        event_type = EventType.objects.first()
+        event = Event.objects.create(title='incremental event', event_type=event_type,
+                                     created_by_user=self.app_user)
+        EventDetails.objects.create(data={'event_details': {}}, event=event)
+
+        refresh_materialized_view()
+        self.assertEqual(get_sync_state()['schema_hash'], schema_hash_before)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM event_details_view WHERE event_id = %s', (event.id,))
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_refresh_regenerates_on_event_type_rename(self):
+        re_create_view()
+        schema_hash_before = get_sync_state()['schema_hash']
+
+        event_type = EventType.objects.first()
+        event_type.display = 'Renamed event type'
+        event_type.save()
+
+        refresh_materialized_view()
+        self.assertNotEqual(get_sync_state()['schema_hash'], schema_hash_before)
+
+    @mock.patch('activity.signals.transaction.on_commit', side_effect=lambda func: func())
+    def test_deleted_event_details_are_removed(self, on_commit):
+        event_type = EventType.objects.first()
+        event = Event.objects.create(title='deleted details event', event_type=event_type,
+                                     created_by_user=self.app_user)
+        event_details = EventDetails.objects.create(data={'event_details': {}}, event=event)
+        re_create_view()
+
+        event_details.delete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM event_details_view WHERE event_id = %s', (event.id,))
+            self.assertEqual(cursor.fetchone()[0], 0)
+
     @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
     def test_when_admin_refresh_view(self):
         request = self.request.get('/admin')
@@ -3,6 +3,7 @@ import json
 import os
 import shutil
 import tempfile
+from unittest import mock
 from urllib.parse import urlencode
 
 import pytest
@@ -1686,6 +1687,78 @@ def test_patrols_materialized_view(django_assert_max_num_queries, client):
     # assert data[0] == (1,)
 
 
+def test_patrols_view_update_patrols():
+    patrol_type = PatrolType.objects.create(value='view_patrol', display='View Patrol')
+    patrol = Patrol.objects.create(title='Standard patrol')
+    segment = PatrolSegment.objects.create(patrol=patrol, patrol_type=patrol_type)
+
+    patrols_view.drop_view()
+    patrols_view.refresh_view()
+
+    Patrol.objects.filter(id=patrol.id).update(title='Renamed patrol')
+    patrols_view.update_patrols([patrol.id])
+
+    cursor = connection.cursor().cursor
+    cursor.execute('select "Title" from patrols_view where "Patrol Segment ID" = %s;', (str(segment.id),))
+    assert cursor.fetchall() == [('Renamed patrol',)]
+
+    segment.delete()
+    patrols_view.update_patrols([patrol.id])
+    cursor.execute('select count(*) from patrols_view where "Patrol ID" = %s;', (str(patrol.id),))
+    assert cursor.fetchall() == [(0,)]
+
+
+def test_patrols_view_refresh_reconciles():
+    patrol_type = PatrolType.objects.create(value='reconciled_patrol', display='Reconciled Patrol')
+    patrol = Patrol.objects.create(title='Standard patrol')
+    segment = PatrolSegment.objects.create(patrol=patrol, patrol_type=patrol_type)
+
+    patrols_view.drop_view()
+    patrols_view.refresh_view()
+
+    # Changes the signals did not report are picked up by the next refresh.
+    Patrol.objects.filter(id=patrol.id).update(title='Renamed patrol')
+    patrols_view.refresh_view()
+
+    cursor = connection.cursor().cursor
+    cursor.execute('select "Title" from patrols_view where "Patrol Segment ID" = %s;', (str(segment.id),))
+    assert cursor.fetchall() == [('Renamed patrol',)]
+
+    PatrolSegment.objects.filter(id=segment.id).delete()
+    patrols_view.refresh_view()
+    cursor.execute('select count(*) from patrols_view where "Patrol ID" = %s;', (str(patrol.id),))
+    assert cursor.fetchall() == [(0,)]
+
+
+def test_transition_done_patrols():
+    from activity.tasks import transition_done_patrols
+
+    patrol_type = PatrolType.objects.create(value='done_patrol', display='Done Patrol')
+    now = datetime.datetime.now(tz=pytz.utc)
+    ended = DateTimeTZRange(now - datetime.timedelta(hours=2), now - datetime.timedelta(minutes=1))
+
+    done = Patrol.objects.create(title='Ended patrol')
+    PatrolSegment.objects.create(patrol=done, patrol_type=patrol_type, time_range=ended)
+    # Patrol's pre_save re-opens a done patrol that has an open-ended segment.
+    still_open = Patrol.objects.create(title='Patrol with an open-ended segment')
+    PatrolSegment.objects.create(patrol=still_open, patrol_type=patrol_type, time_range=ended)
+    PatrolSegment.objects.create(patrol=still_open, patrol_type=patrol_type,
+                                 time_range=DateTimeTZRange(now - datetime.timedelta(hours=1), None))
+    revision_count = done.revision.count()
+
+    with mock.patch('activity.signals.transaction.on_commit', side_effect=lambda func: func()), \
+            mock.patch('activity.signals.pubsub.publish') as publish, \
+            mock.patch('activity.signals.celery.app.send_task') as send_task:
+        assert transition_done_patrols() == [done.id]
+
+    assert Patrol.objects.get(id=done.id).state == PC_DONE
+    assert Patrol.objects.get(id=still_open.id).state == PC_OPEN
+    assert done.revision.count() == revision_count + 1
+    assert done.revision.latest('sequence').data['state'] == PC_DONE
+    publish.assert_called_once_with({'patrol_ids': [str(done.id)]}, 'das.patrol.update')
+    send_task.assert_called_once_with('observations.tasks.update_patrols_view', args=([str(done.id)],))
+
+
 @pytest.mark.django_db
 class TestPatrolFilter:
     def test_filter_in_serial_number(self, five_patrols):
@@ -70,9 +70,11 @@ from activity.serializers.patrol_serializers import (PatrolFileSerializer,
                                                      PatrolSerializer,
                                                      TrackedBySerializer)
 from activity.util import get_permitted_event_categories, return_409_response
+from choices.cache import get_cached_choices
 from choices.models import Choice
 from das_server.views import CustomSchema
 from observations.models import Subject
+from revision.manager import revisions_batched
 from usercontent.serializers import get_stored_filename
 from utils.categories import get_categories_and_geo_categories
 from utils.drf import (StandardResultsSetGeoJsonPagination,
@@ -373,19 +375,18 @@ class EventTypeSchemaView(generics.ListCreateAPIView):
                     ):
                         schema_field["event_detail"] = key
 
-        choices = Choice.objects.filter(
-            is_active=True) if definition_format == 'flat' else Choice.objects.all()
+        active_only = definition_format == 'flat'
 
         parameters = {}
         enumImages_vals = {}
         for schema_field in schema_fields:
             if schema_field['lookup'] == 'enum':
                 icon_vals = schema_utils.get_enumImage_values(
-                    schema_field, queryset=choices)
+                    schema_field, active_only=active_only)
                 if icon_vals:
                     enumImages_vals[schema_field['field']] = icon_vals
                 parameters[schema_field['tag']
-                           ] = schema_utils.get_enum_choices(schema_field, queryset=choices)
+                           ] = schema_utils.get_enum_choices(schema_field, active_only=active_only)
             elif schema_field['lookup'] == 'query':
                 parameters[schema_field['tag']
                            ] = schema_utils.get_dynamic_choices(schema_field, event=event_id)
@@ -415,20 +416,15 @@ class EventTypeSchemaView(generics.ListCreateAPIView):
 
         if definition_format != 'flat':
             for choice_property in field_schema:
-                inactive_choices = []
-                objs = Choice.objects.get_choices(model=Choice.Field_Reports,
-                                                  field=choice_property.field_name).filter_inactive_choices()
-                for o in objs:
-                    inactive_choices.append(o.value)
+                inactive_choices = [c.value for c in get_cached_choices(Choice.Field_Reports,
+                                                                        choice_property.field_name)
+                                    if not c.is_active]
                 if inactive_choices:
                     choice_property.properties[f"inactive_{choice_property.lookup}"] = inactive_choices
 
             for value in schema_utils.get_values_titlemap(eventtype.schema):
-                inactive_choices = []
-                objs = Choice.objects.get_choices(model=Choice.Field_Reports,
-                                                  field=value).filter_inactive_choices()
-                for o in objs:
-                    inactive_choices.append(o.value)
+                inactive_choices = [c.value for c in get_cached_choices(Choice.Field_Reports, value)
+                                    if not c.is_active]
                 if inactive_choices:
                     for key in schema['definition']:
                         if isinstance(key, OrderedDict):
@@ -956,7 +952,9 @@ class EventsView(generics.ListCreateAPIView):
             errors = []
             serializer = self.get_serializer(data=new_record, many=True)
             if serializer.is_valid():
-                serializer.save()
+                # The revisions of every event saved are written together.
+                with revisions_batched():
+                    serializer.save()
                 data = serializer.data
                 data = data if len(new_record) > 1 else data[0]
                 return Response(data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class ChoicesConfig(AppConfig):
+    name = 'choices'
+
+    def ready(self):
+        import choices.signals
@@ -0,0 +1,158 @@
+"""
+A versioned cache of the Choice rows of each (model, field).
+
+Rows are kept in process and in the Django cache under a version token per
+(model, field). Saving or deleting a Choice, or disabling choices through
+the queryset, replaces the token once the transaction commits, so every
+process sharing the cache loads the rows again on its next lookup. When
+the cache is per process (the default LocMemCache), other processes can't
+see a replaced token, so entries only live UNSHARED_CACHE_TIMEOUT seconds.
+
+The tokens, along with those of choice tables and dynamic choices, also
+version anything derived from choices, like rendered event type schemas.
+"""
+import logging
+import time
+import uuid
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.dispatch import Signal
+
+from utils.cache import is_shared_cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_TIMEOUT = 60 * 60 * 24
+UNSHARED_CACHE_TIMEOUT = 60
+
+CachedChoice = namedtuple(
+    'CachedChoice', ['value', 'display', 'icon', 'is_active', 'parent_values'])
+
+DYNAMIC_CHOICE_MODELS_TIMEOUT = 60
+
+DYNAMIC_VERSION_KEY = 'choices:version:dynamic'
+
+# Sent with the version keys that were replaced.
+choice_versions_changed = Signal()
+
+# (model, field) -> (version, rows)
+_local_choices = {}
+
+# (expires at, labels of the models dynamic choices are made of)
+_dynamic_choice_models = (0, frozenset())
+
+
+def choice_version_key(model, field):
+    return f'choices:version:{model}:{field}'
+
+
+def table_version_key(table_name):
+    return f'choices:version:table:{table_name.lower()}'
+
+
+def get_cache_timeout():
+    return CACHE_TIMEOUT if is_shared_cache() else UNSHARED_CACHE_TIMEOUT
+
+
+def get_versions(version_keys):
+    """Return {version key: token}, creating tokens for new keys."""
+    versions = cache.get_many(version_keys)
+    for version_key in version_keys:
+        if version_key not in versions:
+            version = uuid.uuid4().hex
+            if not cache.add(version_key, version, get_cache_timeout()):
+                version = cache.get(version_key, version)
+            versions[version_key] = version
+    return versions
+
+
+def invalidate_versions(*version_keys):
+    """
+    Replace the token of each version key once the transaction commits, so
+    a concurrent lookup can't store rows that are about to change under the
+    new token.
+    """
+    version_keys = set(version_keys)
+    if not version_keys:
+        return
+
+    def replace_versions():
+        cache.set_many({version_key: uuid.uuid4().hex for version_key in version_keys}, get_cache_timeout())
+        choice_versions_changed.send(sender=None, version_keys=version_keys)
+    transaction.on_commit(replace_versions)
+
+
+def get_dynamic_choice_models():
+    """
+    Labels of the models dynamic choices are made of, reloaded every
+    DYNAMIC_CHOICE_MODELS_TIMEOUT seconds.
+    """
+    global _dynamic_choice_models
+    from choices.models import DynamicChoice
+
+    expires_at, labels = _dynamic_choice_models
+    if expires_at < time.monotonic():
+        try:
+            # In a savepoint, this can run before the table is migrated.
+            with transaction.atomic():
+                labels = frozenset(label.lower() for label in
+                                   DynamicChoice.objects.values_list('model_name', flat=True).distinct())
+        except DatabaseError:
+            logger.warning('Unable to load dynamic choice models.')
+            return frozenset()
+        _dynamic_choice_models = (time.monotonic() + DYNAMIC_CHOICE_MODELS_TIMEOUT, labels)
+    return labels
+
+
+def reset_dynamic_choice_models():
+    global _dynamic_choice_models
+    _dynamic_choice_models = (0, frozenset())
+
+
+def _rows_key(model, field, version):
+    return f'choices:rows:{model}:{field}:{version}'
+
+
+def _load_choices(model, field):
+    from choices.models import Choice
+
+    choices = Choice.objects.get_choices(model, field).extra(
+        select={'lower_name': 'lower(display)'}).order_by('ordernum', 'lower_name') \
+        .prefetch_related('sub_choice_of')
+    return tuple(CachedChoice(value=c.value, display=c.display, icon=c.icon, is_active=c.is_active,
+                              parent_values=tuple(p.value for p in c.sub_choice_of.all()))
+                 for c in choices)
+
+
+def get_cached_choices(model, field, active_only=False):
+    """
+    Return the CachedChoice rows of (model, field), ordered by ordernum and
+    display name.
+    """
+    version_key = choice_version_key(model, field)
+    version = get_versions([version_key])[version_key]
+
+    local = _local_choices.get((model, field))
+    if local and local[0] == version:
+        rows = local[1]
+    else:
+        rows_key = _rows_key(model, field, version)
+        rows = cache.get(rows_key)
+        if rows is None:
+            rows = _load_choices(model, field)
+            cache.set(rows_key, rows, get_cache_timeout())
+        _local_choices[(model, field)] = (version, rows)
+
+    if active_only:
+        return tuple(row for row in rows if row.is_active)
+    return rows
+
+
+def invalidate_choices(*model_fields):
+    """
+    Replace the version of each (model, field) pair. Rows kept in process
+    are dropped once their version is no longer current.
+    """
+    invalidate_versions(*(choice_version_key(model, field) for model, field in set(model_fields)))
@@ -8,6 +8,7 @@ from django.utils import timezone
 from django.utils.functional import lazy
 from django.utils.translation import gettext_lazy as _
 
+from choices.cache import get_cached_choices, invalidate_choices
 from core.utils import static_image_finder
 
 
@@ -40,7 +41,10 @@ class ChoiceQuerySet(models.QuerySet):
         return self.filter(is_active=False)
 
     def disable_choices(self):
-        return self.update(delete_on=timezone.now(), is_active=False)
+        model_fields = list(self.values_list('model', 'field').distinct())
+        updated = self.update(delete_on=timezone.now(), is_active=False)
+        invalidate_choices(*model_fields)
+        return updated
 
     def soft_delete(self):
         return self.disable_choices()
@@ -201,25 +205,27 @@ class ChoiceCharField(models.CharField):
         as SelectField choices for this field."""
         blank_defined = False
         model_name = self.model._meta.label_lower
-        _choices = Choice.objects.get_choices(model_name, self.name)
         if limit_choices_to:
-            _choices = _choices.filter(limit_choices_to)
-
-        if limit_choices_to or not self.filter_field:
-            choices = _choices.get_values()
+            choices = Choice.objects.get_choices(model_name, self.name).filter(
+                limit_choices_to).get_values()
 
             for choice, __ in choices:
                 if choice in ('', None):
                     blank_defined = True
                     break
+        elif not self.filter_field:
+            choices = []
+            for choice in get_cached_choices(model_name, self.name):
+                choices.append((choice.value, choice.display))
+                if choice.value in ('', None):
+                    blank_defined = True
         else:
             choices = {}
-            for choice in _choices:
+            for choice in get_cached_choices(model_name, self.name):
                 if choice.value in ('', None):
                     blank_defined = True
                     break
-                group_values = choice.sub_choice_of.all()
-                group_value = group_values[0].value if group_values else ''
+                group_value = choice.parent_values[0] if choice.parent_values else ''
                 choices.setdefault(group_value, []).append(
                     (choice.value, choice.display))
             choices = [(k, v) for k, v in choices.items()]
@@ -0,0 +1,122 @@
+import logging
+
+from celery.signals import task_prerun
+from django.apps import apps
+from django.core.signals import request_started
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from choices.cache import (DYNAMIC_VERSION_KEY, get_dynamic_choice_models,
+                           invalidate_choices, invalidate_versions,
+                           reset_dynamic_choice_models, table_version_key)
+from choices.models import Choice, DisableChoice, DynamicChoice
+
+logger = logging.getLogger(__name__)
+
+# Labels of the models dynamic_choice_source_changed is connected to.
+_dynamic_choice_sources = frozenset()
+
+
+def sub_choice_model_fields(choice):
+    """(model, field) pairs of the choices that are sub choices of choice."""
+    return Choice.objects.filter(sub_choice_of=choice).values_list('model', 'field').distinct()
+
+
+@receiver(pre_save, sender=Choice)
+@receiver(pre_save, sender=DisableChoice)
+def choice_pre_save(sender, instance, raw=False, **kwargs):
+    instance.previous_model_field = Choice.objects.filter(
+        pk=instance.pk).values_list('model', 'field').first()
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_save, sender=DisableChoice)
+def choice_post_save(sender, instance, created, raw=False, **kwargs):
+    model_fields = [(instance.model, instance.field)]
+    previous_model_field = getattr(instance, 'previous_model_field', None)
+    if previous_model_field:
+        model_fields.append(previous_model_field)
+    if not created:
+        # Sub choices are grouped by this choice's value.
+        model_fields.extend(sub_choice_model_fields(instance))
+    invalidate_choices(*model_fields)
+
+
+@receiver(post_delete, sender=Choice)
+@receiver(post_delete, sender=DisableChoice)
+def choice_post_delete(sender, instance, **kwargs):
+    invalidate_choices((instance.model, instance.field))
+
+
+@receiver(m2m_changed, sender=Choice.sub_choice_of.through)
+def choice_sub_choice_of_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_choices((instance.model, instance.field))
+    elif pk_set:
+        invalidate_choices(*Choice.objects.filter(pk__in=pk_set).values_list('model', 'field').distinct())
+    else:
+        # Clearing a parent's sub choices, find them before they are removed.
+        invalidate_choices(*sub_choice_model_fields(instance))
+
+
+@receiver(post_save, sender=DynamicChoice)
+@receiver(post_delete, sender=DynamicChoice)
+def dynamic_choice_changed(sender, **kwargs):
+    reset_dynamic_choice_models()
+    connect_dynamic_choice_sources()
+    invalidate_versions(DYNAMIC_VERSION_KEY)
+
+
+def choice_table_changed(sender, **kwargs):
+    invalidate_versions(table_version_key(sender._meta.model_name))
+
+
+def dynamic_choice_source_changed(sender, **kwargs):
+    invalidate_versions(DYNAMIC_VERSION_KEY)
+
+
+def get_model_or_none(label):
+    try:
+        return apps.get_model(label)
+    except (LookupError, ValueError):
+        logger.warning('Dynamic choices are made of an unknown model %s.', label)
+        return None
+
+
+@receiver(request_started)
+@receiver(task_prerun)
+def connect_dynamic_choice_sources(**kwargs):
+    """
+    Connect dynamic_choice_source_changed to the models dynamic choices are
+    made of, so saving any other model costs nothing here. Runs as each
+    request and task starts, and the models are reloaded every
+    DYNAMIC_CHOICE_MODELS_TIMEOUT seconds.
+    """
+    global _dynamic_choice_sources
+    labels = get_dynamic_choice_models()
+    if labels == _dynamic_choice_sources:
+        return
+
+    for label in _dynamic_choice_sources - labels:
+        model = get_model_or_none(label)
+        if model is not None:
+            post_save.disconnect(sender=model, dispatch_uid=f'choices.dynamic:{label}')
+            post_delete.disconnect(sender=model, dispatch_uid=f'choices.dynamic:{label}')
+    for label in labels - _dynamic_choice_sources:
+        model = get_model_or_none(label)
+        if model is not None:
+            post_save.connect(dynamic_choice_source_changed, sender=model, weak=False,
+                              dispatch_uid=f'choices.dynamic:{label}')
+            post_delete.connect(dynamic_choice_source_changed, sender=model, weak=False,
+                                dispatch_uid=f'choices.dynamic:{label}')
+    _dynamic_choice_sources = labels
+
+
+# Choice tables are the other models of this app.
+for choice_table in apps.get_app_config('choices').get_models():
+    if choice_table not in (Choice, DisableChoice, DynamicChoice):
+        post_save.connect(choice_table_changed, sender=choice_table)
+        post_delete.connect(choice_table_changed, sender=choice_table)
@@ -0,0 +1,90 @@
+from unittest import mock
+
+import pytest
+
+from choices.cache import (CACHE_TIMEOUT, DYNAMIC_VERSION_KEY, UNSHARED_CACHE_TIMEOUT,
+                           get_cache_timeout, get_cached_choices)
+from choices.models import Choice, DynamicChoice
+from observations.models import Source, Subject
+
+pytestmark = pytest.mark.django_db
+
+MODEL, FIELD = 'activity.event', 'cache_test_species'
+
+
+@pytest.fixture(autouse=True)
+def run_on_commit():
+    # Versions are replaced on commit, which the test transaction never does.
+    with mock.patch('choices.cache.transaction.on_commit', side_effect=lambda func: func()) as on_commit, \
+            mock.patch('activity.signals.warm_event_type_schemas'):
+        yield on_commit
+
+
+@pytest.fixture
+def species_choices():
+    return [Choice.objects.create(model=MODEL, field=FIELD, value=value, display=display, ordernum=ordernum)
+            for value, display, ordernum in (('rhino', 'Rhino', 2), ('elephant', 'Elephant', 1))]
+
+
+def test_cached_choices_are_ordered(species_choices):
+    assert [c.value for c in get_cached_choices(MODEL, FIELD)] == ['elephant', 'rhino']
+
+
+def test_cached_choices_are_not_reloaded(species_choices, django_assert_num_queries):
+    get_cached_choices(MODEL, FIELD)
+    with django_assert_num_queries(0):
+        assert len(get_cached_choices(MODEL, FIELD)) == 2
+
+
+def test_cached_choices_invalidated_on_save_and_delete(species_choices):
+    get_cached_choices(MODEL, FIELD)
+
+    rhino = species_choices[0]
+    rhino.display = 'Black Rhino'
+    rhino.save()
+    assert 'Black Rhino' in [c.display for c in get_cached_choices(MODEL, FIELD)]
+
+    rhino.delete()
+    assert [c.value for c in get_cached_choices(MODEL, FIELD)] == ['elephant']
+
+
+def test_cached_choices_invalidated_on_disable(species_choices):
+    get_cached_choices(MODEL, FIELD)
+
+    Choice.objects.filter(model=MODEL, field=FIELD, value='rhino').disable_choices()
+    assert [c.value for c in get_cached_choices(MODEL, FIELD, active_only=True)] == ['elephant']
+    assert [c.value for c in get_cached_choices(MODEL, FIELD) if not c.is_active] == ['rhino']
+
+
+def test_versions_are_replaced_on_commit(species_choices, run_on_commit):
+    rows = get_cached_choices(MODEL, FIELD)
+    run_on_commit.side_effect = None
+
+    rhino = species_choices[0]
+    rhino.display = 'Black Rhino'
+    rhino.save()
+    assert get_cached_choices(MODEL, FIELD) == rows
+
+    for call in run_on_commit.call_args_list:
+        call[0][0]()
+    assert 'Black Rhino' in [c.display for c in get_cached_choices(MODEL, FIELD)]
+
+
+def test_cache_timeout_is_short_without_shared_cache():
+    with mock.patch('choices.cache.is_shared_cache', return_value=False):
+        assert get_cache_timeout() == UNSHARED_CACHE_TIMEOUT
+    with mock.patch('choices.cache.is_shared_cache', return_value=True):
+        assert get_cache_timeout() == CACHE_TIMEOUT
+
+
+def test_only_dynamic_choice_sources_invalidate():
+    DynamicChoice.objects.create(id='elephants', model_name='observations.subject',
+                                 criteria='[["subject_subtype", "elephant"]]',
+                                 value_col='id', display_col='name')
+
+    with mock.patch('choices.signals.invalidate_versions') as invalidate_versions:
+        Source.objects.create(manufacturer_id='cache-test', source_type='tracking-device')
+        invalidate_versions.assert_not_called()
+
+        Subject.objects.create(name='Alvin', subject_subtype_id='elephant')
+        invalidate_versions.assert_called_once_with(DYNAMIC_VERSION_KEY)
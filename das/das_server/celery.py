@@ -53,6 +53,8 @@ app.conf.task_routes = {
     'rt_api.tasks.handle_delete_patrol': {'queue': 'realtime_p3', },
     'activity.tasks.periodically_maintain_patrol_state': {'queue': 'realtime_p2'},
     'observations.tasks.handle_source_with_new_observations': {'queue': 'realtime_p2'},
+    'observations.tasks.enforce_geo_permission_speeds': {'queue': 'realtime_p2'},
+    'observations.tasks.maintain_subjectstatus_all': {'queue': 'maintenance'},
     'observations.tasks.maintain_subjectstatus_for_subject': {'queue': 'maintenance'},
     'observations.tasks.maintain_observation_data': {'queue': 'maintenance'},
     'mapping.tasks.automate_download_features_from_wfs': {'queue': 'maintenance'},
@@ -129,7 +131,8 @@ app.conf.beat_schedule = {
     'refresh-event-details-view': {
         'task': 'activity.tasks.refresh_event_details_view_task',
         'args': ('Celery',),
-        'schedule': timedelta(hours=1)
+        # Incremental, so it can run often enough to keep reports current.
+        'schedule': timedelta(minutes=15)
     },
     'publish-daily-site-metrics': {
         'task': 'das_server.tasks.publish_daily_site_metrics',
@@ -166,6 +169,11 @@ app.conf.beat_schedule = {
     'periodically_maintain_patrol_state': {
         'task': 'activity.tasks.periodically_maintain_patrol_state',
         'schedule': timedelta(minutes=1)
+    },
+    'enforce-geo-permission-speeds': {
+        'task': 'observations.tasks.enforce_geo_permission_speeds',
+        'schedule': timedelta(seconds=10),
+        'options': {'expires': 10},
     }
 }
 
@@ -11,7 +11,7 @@ def new_event_handler(body, message):
 
 
 def update_event_handler(body, message):
-    event_id = body.get('event_id')
+    event_id = body.get('event_id') or body.get('event_ids')
     logger.info('Heard update-event for event_id: %s', event_id)
 
 
@@ -25,7 +25,7 @@ def new_patrol_handler(body, message):
 
 
 def update_patrol_handler(body, message):
-    logger.info('Heard update-patrol for patrol_id: %s', body.get('patrol_id'))
+    logger.info('Heard update-patrol for patrol_id: %s', body.get('patrol_id') or body.get('patrol_ids'))
 
 
 def delete_patrol_handler(body, message):
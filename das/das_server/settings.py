@@ -316,6 +316,20 @@ CACHES = {
     }
 }
 
+# A cache shared by every process, with a short-lived in-process copy of
+# hot keys. See utils/cache.py.
+if os.getenv('DAS_CACHE_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'utils.cache.TieredRedisCache',
+        'LOCATION': os.getenv('DAS_CACHE_URL'),
+        'KEY_PREFIX': 'das',
+        'OPTIONS': {
+            'L1_TIMEOUT': int(os.getenv('DAS_CACHE_L1_TIMEOUT', '5')),
+            'L1_KEY_PREFIXES': ('choices:', 'schema:', 'changestamp:'),
+            'REDIS_CLIENT_CLASS': 'utils.telemetry.InstrumentedRedis',
+        },
+    }
+
 RASTER_WORKDIR = '/tmp/raster'
 
 '''
@@ -464,6 +478,13 @@ SHOW_TRACK_DAYS = 16
 
 REALTIME_AUTH_TIMEOUT_SECONDS = 1.0
 
+# Only render realtime subject and event updates for sessions whose map
+# viewport (bbox) intersects the update. Sessions without a bbox always
+# get every update. The margin (in degrees) pads each viewport.
+REALTIME_VIEWPORT_FILTERING = True
+REALTIME_VIEWPORT_CELL_SIZE = 0.5
+REALTIME_VIEWPORT_MARGIN = 0.05
+
 NOTIFY_HIGH_PRIORITY_EVENT = None
 NOTIFY_MEDIUM_PRIORITY_EVENT = None
 NOTIFY_LOW_PRIORITY_EVENT = None
@@ -590,3 +611,8 @@ PERSISTENT_STORAGE = {
     "PORT": "6379"
 }
 DISABLE_STATSD = True
+
+# Requests slower than this are logged, at the sample rate, with the
+# fingerprints of their slowest queries.
+SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', '2'))
+SLOW_REQUEST_SAMPLE_RATE = float(os.getenv('SLOW_REQUEST_SAMPLE_RATE', '0.1'))
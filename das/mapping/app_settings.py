@@ -11,13 +11,26 @@ MBTILES_DEFAULT = {'root': os.path.join(settings.MEDIA_ROOT, 'mbtiles'),
 
 MBTILES = MBTILES_DEFAULT
 
+# extent and buffer are in tile coordinates, simplify_pixels is the
+# simplification tolerance in screen pixels at the requested zoom.
+VECTOR_TILES_DEFAULT = {'extent': 4096,
+                        'buffer': 64,
+                        'max_zoom': 22,
+                        'simplify_pixels': 1.0,
+                        'cache_timeout': 24 * 60 * 60}
+
+VECTOR_TILES = VECTOR_TILES_DEFAULT
+
 
 def reload():
-    global MBTILES
-    mbtiles = getattr(settings, 'MAPPING', {})
-    if 'MBTILES' in mbtiles:
-        mbtiles = mbtiles['MBTILES']
+    global MBTILES, VECTOR_TILES
+    mapping = getattr(settings, 'MAPPING', {})
+    if 'MBTILES' in mapping:
+        mbtiles = mapping['MBTILES']
         MBTILES = {k: mbtiles.get(k, v) for k, v in MBTILES_DEFAULT.items()}
+    if 'VECTOR_TILES' in mapping:
+        vector_tiles = mapping['VECTOR_TILES']
+        VECTOR_TILES = {k: vector_tiles.get(k, v) for k, v in VECTOR_TILES_DEFAULT.items()}
 
 
 reload()
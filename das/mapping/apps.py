@@ -6,3 +6,5 @@ class MappingConfig(AppConfig):
     name = 'mapping'
     verbose_name = 'Map Layers'
 
+    def ready(self):
+        import mapping.signals
@@ -0,0 +1,135 @@
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from mapping import models
+from revision.manager import (AC_ADDED, AC_UPDATED, RevisionAdapter,
+                              bulk_create_revisions, capture_revision_original)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def report_spatialfile_progress(spatialfile, status):
+    """
+    Write status on the SpatialFeatureFile row over a separate connection,
+    so it can be seen while the import transaction is still open.
+    """
+    table = models.SpatialFeatureFile._meta.db_table
+    progress_connection = connection.copy()
+    try:
+        with progress_connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {table} SET status = %s WHERE id = %s',
+                           [status, str(spatialfile.id)])
+    except Exception:
+        logger.exception('Failed to report progress for SpatialFeatureFile id=%s', spatialfile.id)
+    finally:
+        progress_connection.close()
+
+
+class SpatialFeatureImporter:
+    """
+    Buffer SpatialFeature values and write them a chunk at a time.
+
+    Each chunk matches existing features by external_id in one query, then
+    inserts new features with bulk_create and changed features with
+    bulk_update, writing their revisions in bulk and bumping the change
+    stamps of the featuresets they belong to. Features that are
+    unchanged, or whose source modified_at is not newer than the stored
+    updated_at, are left alone.
+    """
+
+    def __init__(self, chunk_size=None, spatialfile=None, total=None):
+        self.chunk_size = chunk_size or getattr(
+            settings, 'SPATIAL_IMPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        self.spatialfile = spatialfile
+        self.total = total
+        self.adapter = RevisionAdapter(models.SpatialFeature)
+        self.processed = 0
+        self.created_ids = []
+        self.updated_ids = []
+        self._pending = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    @property
+    def changed_ids(self):
+        return self.created_ids + self.updated_ids
+
+    def add(self, external_id, values, modified_at=None):
+        # A later record for the same external_id replaces an earlier one.
+        self._pending[external_id] = (values, modified_at)
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+
+        records, self._pending = self._pending, {}
+        existing = {feature.external_id: feature for feature in
+                    models.SpatialFeature.objects.filter(external_id__in=records.keys())}
+
+        to_create, to_update, update_fields = [], [], set()
+        for external_id, (values, modified_at) in records.items():
+            feature = existing.get(external_id)
+            if feature is None:
+                feature = models.SpatialFeature(external_id=external_id, **values)
+                feature.clean()
+                to_create.append(feature)
+                continue
+
+            if modified_at and modified_at <= feature.updated_at:
+                continue
+            capture_revision_original(feature)
+            for key, value in values.items():
+                setattr(feature, key, value)
+            feature.clean()
+            diff = self.adapter.get_serialized_data_diff(feature, feature.revision_original)
+            if diff:
+                feature.revision_diff = diff
+                to_update.append(feature)
+                update_fields.update(values.keys())
+
+        if to_create:
+            models.SpatialFeature.objects.bulk_create(to_create)
+            bulk_create_revisions(
+                models.SpatialFeature,
+                {feature.id: self.adapter.get_serialized_data(feature) for feature in to_create},
+                action=AC_ADDED)
+            self.created_ids.extend(feature.id for feature in to_create)
+
+        if to_update:
+            now = timezone.now()
+            for feature in to_update:
+                feature.updated_at = now
+            models.SpatialFeature.objects.bulk_update(
+                to_update, sorted(update_fields) + ['updated_at'])
+            bulk_create_revisions(
+                models.SpatialFeature,
+                {feature.id: feature.revision_diff for feature in to_update},
+                action=AC_UPDATED)
+            self.updated_ids.extend(feature.id for feature in to_update)
+
+        if to_create or to_update:
+            feature_type_ids = {feature.feature_type_id for feature in to_create + to_update}
+            feature_type_ids.update(feature.revision_original.get('feature_type') for feature in to_update)
+            models.ChangeStamp.objects.bump_for_features(
+                feature_type_ids=feature_type_ids,
+                feature_ids=[feature.id for feature in to_update])
+
+        self.processed += len(records)
+        logger.info('Imported spatial features. processed=%s, created=%s, updated=%s',
+                    self.processed, len(self.created_ids), len(self.updated_ids))
+        if self.spatialfile is not None:
+            of_total = f' of {self.total}' if self.total else ''
+            report_spatialfile_progress(
+                self.spatialfile, f'Processing - {self.processed}{of_total} features')
@@ -12,10 +12,11 @@ from django.utils.translation import gettext as _
 
 from arcgis2geojson import arcgis2geojson
 from mapping import models
+from mapping.bulk_import import SpatialFeatureImporter
 from mapping.utils import (contains_unique_keys_in_layer, geometry_mapper,
-                           get_datasource_and_layer_num, get_or_create_feature,
+                           get_datasource_and_layer_num, get_feature_name,
                            get_or_create_spatial_feature_type, make_external_id,
-                           set_feature_name, get_spatial_feature_type_name)
+                           get_spatial_feature_type_name)
 
 logger = logging.getLogger(__name__)
 
@@ -183,49 +184,50 @@ def import_features_from_esri(obj, layer_num, layer_name, tmp_filename, arcgis_i
         # TODO: revisit and handle case where layer/features do not have a GlobalID
         has_unique_keys = contains_unique_keys_in_layer(
             id_field, name_field, layer)
-        processed_sfts = set()
-        for i, feature in enumerate(layer):
-            sft_name = get_spatial_feature_type_name(feature, type_field)
-            if simple_presentation and sft_name not in processed_sfts:
-                spatial_feature_type = get_or_create_spatial_feature_type(
-                    feature, type_field)
-                if not spatial_feature_type:
-                    logger.warning(
-                        'Did not get or create spatialfeaturetype for %s. Skipping', str(feature))
-                    continue
-
-                if not arcgis_item.arcgis_config.disable_import_feature_class_presentation:
-                    spatial_feature_type.presentation = simple_presentation
-                    spatial_feature_type.save()
-
-                processed_sfts.add(sft_name)
-
-            # linked to above to revisit if don't have a GlobalID
-            external_id = make_external_id(
-                layer_num, feature, id_field, name_field, arcgis_item.id)
-            if not has_unique_keys:
-                external_id = external_id + '-' + str(i)
-            external_ids.append(external_id)
-            save_esri_feature(feature, external_sourcename,
-                              external_id, type_field, name_field, arcgis_item, i)
+        processed_sfts, feature_types = set(), {}
+        with SpatialFeatureImporter() as importer:
+            for i, feature in enumerate(layer):
+                sft_name = get_spatial_feature_type_name(feature, type_field)
+                if simple_presentation and sft_name not in processed_sfts:
+                    spatial_feature_type = get_or_create_spatial_feature_type(
+                        feature, type_field, cache=feature_types)
+                    if not spatial_feature_type:
+                        logger.warning(
+                            'Did not get or create spatialfeaturetype for %s. Skipping', str(feature))
+                        continue
+
+                    if not arcgis_item.arcgis_config.disable_import_feature_class_presentation:
+                        spatial_feature_type.presentation = simple_presentation
+                        spatial_feature_type.save()
+
+                    processed_sfts.add(sft_name)
+
+                # linked to above to revisit if don't have a GlobalID
+                external_id = make_external_id(
+                    layer_num, feature, id_field, name_field, arcgis_item.id)
+                if not has_unique_keys:
+                    external_id = external_id + '-' + str(i)
+                external_ids.append(external_id)
+                values = esri_feature_values(feature, external_sourcename, external_id,
+                                             type_field, name_field, arcgis_item, i, feature_types)
+                if values:
+                    importer.add(external_id, values,
+                                 modified_at=esri_feature_edited_at(feature))
     finally:
         datasource = None
 
     return external_ids
 
 
-def db_feature_needs_update(feature_record, feature):
-    needs_update = True
-    if feature_record and ESRI_FEATURE_EDITDATE in feature.fields:
+def esri_feature_edited_at(feature):
+    if ESRI_FEATURE_EDITDATE in feature.fields:
         last_edit_ts = int(feature.get(ESRI_FEATURE_EDITDATE))
-        last_edit_at = datetime.datetime.fromtimestamp(
+        return datetime.datetime.fromtimestamp(
             int(last_edit_ts/1000), datetime.timezone.utc)
-        needs_update = last_edit_at > feature_record.updated_at
 
-    return needs_update
 
-
-def save_esri_feature(feature, source_name, external_id, type_label, name_field, arcgis_item, counter):
+def esri_feature_values(feature, source_name, external_id, type_label, name_field, arcgis_item, counter,
+                        feature_types=None):
     # With Esri integration we've seen some feature services give us json that has features with "geometry" missing
     # this handles and ignores that issue
     try:
@@ -238,30 +240,18 @@ def save_esri_feature(feature, source_name, external_id, type_label, name_field,
             f'Saving feature {external_id} raised GDALException: {gex}')
         return
 
-    feature_type = get_or_create_spatial_feature_type(feature, type_label)
+    feature_type = get_or_create_spatial_feature_type(
+        feature, type_label, cache=feature_types)
     if not feature_type:
         return
 
-    data = {
-        'external_id': external_id, 'feature_geometry': feature_geometry,
-        'feature_type': feature_type}
-
-    feature_record, created = get_or_create_feature(data)
-
-    if not feature_record:
-        return
-
-    if created or db_feature_needs_update(feature_record, feature):
-        logger.debug(f'creating or updating feature {external_id}')
-        feature_record.arcgis_item = arcgis_item
-        feature_record.external_source = source_name
-        feature_record.feature_geometry = feature_geometry
-        set_feature_name(feature_record, feature,
-                         feature_type, name_field, counter)
-        feature_record.clean()
-        feature_record.save()
-    else:
-        logger.debug(f'Skipping update for feature {external_id}')
+    return {
+        'feature_type': feature_type,
+        'feature_geometry': feature_geometry,
+        'arcgis_item': arcgis_item,
+        'external_source': source_name,
+        'name': get_feature_name(feature, feature_type, name_field, counter),
+    }
 
 
 def wfs_download_return_messages(request, errored_files, success_files):
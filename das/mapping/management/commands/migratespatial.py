@@ -188,5 +188,6 @@ class Command(BaseCommand):
             self.stdout.write('Hiding %d spatial feature types associated with analyzers' %
                               (models.SpatialFeatureType.objects.count() - len(to_exclude)))
             models.SpatialFeatureType.objects.exclude(id__in=to_exclude).update(is_visible=False)
+            models.ChangeStamp.objects.bump_all()
         else:
             self.stdout.write("Append or Overwrite mode. Pre-existing SpatialFeatureType objects' is_visible flag not updated")
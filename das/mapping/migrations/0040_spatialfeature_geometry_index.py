@@ -0,0 +1,20 @@
+# Generated by Django 3.1 on 2026-10-19 13:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Vector tiles filter SpatialFeature by a planar bounding box, which
+    # the geography index on feature_geometry cannot serve.
+
+    dependencies = [
+        ('mapping', '0039_changestamp'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS mapping_spatialfeature_geometry_gist '
+                'ON mapping_spatialfeature USING gist ((feature_geometry::geometry));',
+            reverse_sql='DROP INDEX IF EXISTS mapping_spatialfeature_geometry_gist;',
+        ),
+    ]
@@ -11,8 +11,10 @@ from tagulous.models import TagField, TagModel
 from django.conf import settings
 from django.contrib.gis import geos
 from django.contrib.gis.db import models
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
 from django.urls import NoReverseMatch, reverse
 from django.utils.deconstruct import deconstructible
 from django.utils.translation import gettext_lazy as _
@@ -23,6 +25,7 @@ from mapping.mbtiles import (ExtractionError, GoogleProjection,
                              InvalidFormatError, MBTilesReader)
 from mapping.utils import SPATIAL_FILES_FOLDER, check_file_extension
 from revision.manager import Revision, RevisionMixin
+from utils.cache import is_shared_cache
 from utils.decorator import reify
 
 logger = logging.getLogger(__name__)
@@ -799,3 +802,108 @@ class ArcgisItem(TimestampedModel):
     @property
     def features(self):
         return SpatialFeature.objects.filter(arcgis_item=self)
+
+
+FEATURES_STAMP_KEY = 'features'
+
+
+def featureset_stamp_key(display_category_id):
+    return f'featureset:{display_category_id}'
+
+
+def featuregroup_stamp_key(group_id):
+    return f'featuregroup:{group_id}'
+
+
+def legacy_featureset_stamp_key(feature_set_id):
+    # FeatureSet of the mapping v1 Feature models.
+    return f'featureset-v1:{feature_set_id}'
+
+
+def changestamp_cache_key(key):
+    return f'changestamp:{key}'
+
+
+class ChangeStampManager(models.Manager):
+    CACHE_TIMEOUT = 60 * 60
+
+    def bump(self, *keys):
+        """
+        Increment the version of each key (creating it if needed) in a
+        single upsert, and set its updated_at to the current time.
+        """
+        keys = sorted(set(keys))
+        if not keys:
+            return
+        table = self.model._meta.db_table
+        values = ', '.join(['(%s, 1, clock_timestamp())'] * len(keys))
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                INSERT INTO {table} (key, version, updated_at) VALUES {values}
+                ON CONFLICT (key) DO UPDATE
+                SET version = {table}.version + 1, updated_at = EXCLUDED.updated_at
+            ''', keys)
+
+        # Drop the cached stamps now, and again once the new versions are
+        # visible to other connections.
+        cache_keys = [changestamp_cache_key(key) for key in keys]
+        cache.delete_many(cache_keys)
+        transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+    def bump_for_features(self, feature_type_ids=(), feature_ids=()):
+        """
+        Bump the stamps of every featureset and feature group that the
+        given features (or feature types) appear in.
+        """
+        category_ids = SpatialFeatureType.objects.filter(
+            id__in=set(feature_type_ids), display_category__isnull=False).values_list(
+            'display_category_id', flat=True).distinct()
+        group_ids = SpatialFeatureGroupStatic.features.through.objects.filter(
+            spatialfeature_id__in=set(feature_ids)).values_list(
+            'spatialfeaturegroupstatic_id', flat=True).distinct() if feature_ids else ()
+
+        self.bump(FEATURES_STAMP_KEY,
+                  *(featureset_stamp_key(i) for i in category_ids),
+                  *(featuregroup_stamp_key(i) for i in group_ids))
+
+    def bump_all(self):
+        """Invalidate every featureset and feature group."""
+        self.bump(FEATURES_STAMP_KEY,
+                  *(featureset_stamp_key(i) for i in DisplayCategory.objects.values_list('id', flat=True)),
+                  *(featuregroup_stamp_key(i) for i in SpatialFeatureGroupStatic.objects.values_list('id', flat=True)))
+
+    def bump_for_feature_types(self, feature_type_ids):
+        """Bump the stamps of every v1 FeatureSet containing the given FeatureTypes."""
+        feature_set_ids = FeatureSet.types.through.objects.filter(
+            featuretype_id__in=set(feature_type_ids)).values_list('featureset_id', flat=True).distinct()
+        self.bump(*(legacy_featureset_stamp_key(i) for i in feature_set_ids))
+
+    def get_stamp(self, key):
+        """Return (version, updated_at) for key, (0, None) if it has never changed."""
+        if not is_shared_cache():
+            # A bump in another process can't invalidate a per-process cache.
+            return self.filter(key=key).values_list('version', 'updated_at').first() or (0, None)
+
+        cache_key = changestamp_cache_key(key)
+        stamp = cache.get(cache_key)
+        if stamp is None:
+            stamp = self.filter(key=key).values_list('version', 'updated_at').first() or (0, None)
+            cache.set(cache_key, stamp, self.CACHE_TIMEOUT)
+        return tuple(stamp)
+
+
+class ChangeStamp(models.Model):
+    """
+    A version counter and last-modified time for a set of map features
+    (a featureset, a feature group or all features), bumped whenever one
+    of its features changes. Feature layer views take their ETag and
+    Last-Modified from it instead of scanning the features.
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    objects = ChangeStampManager()
+
+    def __str__(self):
+        return f'{self.key}: {self.version}'
@@ -1,4 +1,5 @@
 from django.core.serializers import serialize
+import copy
 import logging
 
 import rest_framework.serializers as serializers
@@ -7,6 +8,7 @@ from django.urls import reverse
 from rest_framework.validators import UniqueValidator
 
 import mapping.models as models
+from mapping.vectortiles import simplify_tolerance
 import utils
 from core.serializers import BaseSerializer
 from choices.models import Choice
@@ -129,6 +131,13 @@ class SpatialFeatureSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         # rep = super().to_representation(instance)
+        zoom = self.context.get('zoom')
+        if zoom is not None:
+            # Serialize a copy, the caller's instance keeps its full geometry.
+            geometry = instance.feature_geometry.simplify(
+                simplify_tolerance(zoom, meters=False), preserve_topology=True)
+            instance = copy.copy(instance)
+            instance.feature_geometry = geometry
         return json.loads(serialize('geojson', (instance,), properties={}, geometry_field='feature_geometry', ))
 
         return rep
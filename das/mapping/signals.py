@@ -0,0 +1,114 @@
+import logging
+
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from mapping.models import (ChangeStamp, DisplayCategory, FeatureSet,
+                            FeatureType, LineFeature, PointFeature,
+                            PolygonFeature, SpatialFeature,
+                            SpatialFeatureGroupStatic, SpatialFeatureType,
+                            FEATURES_STAMP_KEY, featuregroup_stamp_key,
+                            featureset_stamp_key, legacy_featureset_stamp_key)
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=SpatialFeature)
+def spatialfeature_post_save(sender, instance, created, **kwargs):
+    feature_type_ids = {instance.feature_type_id}
+    # A feature moved to another type also leaves that type's featureset. A
+    # new feature has no original, so don't read one back from the database.
+    original_type_id = None if created else getattr(instance, 'revision_original', {}).get('feature_type')
+    if original_type_id:
+        feature_type_ids.add(original_type_id)
+    ChangeStamp.objects.bump_for_features(
+        feature_type_ids=feature_type_ids,
+        feature_ids=() if created else (instance.id,))
+
+
+@receiver(pre_delete, sender=SpatialFeature)
+def spatialfeature_pre_delete(sender, instance, **kwargs):
+    # Group membership is deleted along with the feature, so bump first.
+    ChangeStamp.objects.bump_for_features(
+        feature_type_ids=(instance.feature_type_id,), feature_ids=(instance.id,))
+
+
+@receiver(pre_save, sender=SpatialFeatureType)
+def spatialfeaturetype_pre_save(sender, instance, **kwargs):
+    instance.previous_display_category_id = SpatialFeatureType.objects.filter(
+        pk=instance.pk).values_list('display_category_id', flat=True).first()
+
+
+@receiver(post_save, sender=SpatialFeatureType)
+@receiver(post_delete, sender=SpatialFeatureType)
+def spatialfeaturetype_changed(sender, instance, **kwargs):
+    category_ids = {instance.display_category_id,
+                    getattr(instance, 'previous_display_category_id', None)}
+    ChangeStamp.objects.bump(FEATURES_STAMP_KEY,
+                             *(featureset_stamp_key(i) for i in category_ids if i))
+
+
+@receiver(post_save, sender=DisplayCategory)
+def displaycategory_post_save(sender, instance, **kwargs):
+    ChangeStamp.objects.bump(featureset_stamp_key(instance.id))
+
+
+@receiver(post_save, sender=SpatialFeatureGroupStatic)
+def spatialfeaturegroup_post_save(sender, instance, **kwargs):
+    ChangeStamp.objects.bump(featuregroup_stamp_key(instance.id))
+
+
+@receiver(m2m_changed, sender=SpatialFeatureGroupStatic.features.through)
+def spatialfeaturegroup_features_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            ChangeStamp.objects.bump(featuregroup_stamp_key(instance.id))
+    elif action in ('post_add', 'post_remove'):
+        ChangeStamp.objects.bump(*(featuregroup_stamp_key(i) for i in pk_set))
+    elif action == 'pre_clear':
+        # feature.groups.clear(), the groups are only known beforehand.
+        ChangeStamp.objects.bump(*(featuregroup_stamp_key(i) for i in
+                                   instance.groups.values_list('id', flat=True)))
+
+
+@receiver(pre_save, sender=PolygonFeature)
+@receiver(pre_save, sender=LineFeature)
+@receiver(pre_save, sender=PointFeature)
+def feature_pre_save(sender, instance, **kwargs):
+    instance.previous_featureset_id = sender.objects.filter(
+        pk=instance.pk).values_list('featureset_id', flat=True).first()
+
+
+@receiver(post_save, sender=PolygonFeature)
+@receiver(post_save, sender=LineFeature)
+@receiver(post_save, sender=PointFeature)
+@receiver(post_delete, sender=PolygonFeature)
+@receiver(post_delete, sender=LineFeature)
+@receiver(post_delete, sender=PointFeature)
+def feature_changed(sender, instance, **kwargs):
+    feature_set_ids = {instance.featureset_id,
+                       getattr(instance, 'previous_featureset_id', None)}
+    ChangeStamp.objects.bump(*(legacy_featureset_stamp_key(i) for i in feature_set_ids if i))
+
+
+@receiver(post_save, sender=FeatureType)
+def featuretype_post_save(sender, instance, **kwargs):
+    ChangeStamp.objects.bump_for_feature_types((instance.id,))
+
+
+@receiver(post_save, sender=FeatureSet)
+def featureset_post_save(sender, instance, **kwargs):
+    ChangeStamp.objects.bump(legacy_featureset_stamp_key(instance.id))
+
+
+@receiver(m2m_changed, sender=FeatureSet.types.through)
+def featureset_types_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        ChangeStamp.objects.bump(legacy_featureset_stamp_key(instance.id))
+    else:
+        # Changed from the feature type side; clear() has no pk_set.
+        ChangeStamp.objects.bump(*(legacy_featureset_stamp_key(i) for i in
+                                   pk_set or FeatureSet.objects.values_list('id', flat=True)))
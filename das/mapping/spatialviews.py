@@ -2,13 +2,21 @@ import logging
 
 from rest_framework import generics
 
-from mapping.models import SpatialFeatureGroupStatic, SpatialFeature
+from mapping.models import (SpatialFeatureGroupStatic, SpatialFeature,
+                            featuregroup_stamp_key)
+from mapping.views import get_layer_stamp, get_zoom, layer_condition
 import mapping.serializers as serializers
 
 
 logger = logging.getLogger(__name__)
 
 
+def featuregroup_stamp(request, id, **kwargs):
+    group_updated_at = SpatialFeatureGroupStatic.objects.filter(id=id).values_list(
+        'updated_at', flat=True).first()
+    return get_layer_stamp(request, featuregroup_stamp_key(id), group_updated_at)
+
+
 class SpatialFeatureGroupView(generics.RetrieveAPIView):
 
     serializer_class = serializers.SpatialFeatureGroupStaticSerializer
@@ -17,6 +25,15 @@ class SpatialFeatureGroupView(generics.RetrieveAPIView):
     def get_queryset(self):
         return SpatialFeatureGroupStatic.objects.all()
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['zoom'] = get_zoom(self.request)
+        return context
+
+    @layer_condition(featuregroup_stamp)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 class SpatialFeatureView(generics.RetrieveAPIView):
 
@@ -3,11 +3,14 @@ import logging
 
 from faker import Faker
 
-from django.contrib.gis.geos import Point
+from django.contrib.gis.geos import MultiPoint, Point
 
+import mapping.serializers as serializers
 import mapping.views as views
 from core.tests import BaseAPITest
-from mapping.models import DisplayCategory, SpatialFeature, SpatialFeatureType
+from mapping.models import (ChangeStamp, DisplayCategory, FeatureSet,
+                            FeatureType, PointFeature, SpatialFeature,
+                            SpatialFeatureType, featureset_stamp_key)
 from utils.tests_tools import is_url_resolved
 
 logger = logging.getLogger(__name__)
@@ -89,6 +92,143 @@ class TestFeatures(BaseAPITest):
         for field in self.expected_fields:
             self.assertIn(field, feature)
 
+    def test_get_featureset_single_not_modified(self):
+        def get_featureset(**headers):
+            request = self.factory.get(
+                self.api_base + f'/featureset/{self.category.id}/', **headers)
+            self.force_authenticate(request, self.app_user)
+            return views.FeatureSetGeoJsonView.as_view()(
+                request, id=str(self.category.id))
+
+        response = get_featureset()
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        response = get_featureset(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Saving a feature bumps its featureset's change stamp.
+        version = ChangeStamp.objects.get_stamp(
+            featureset_stamp_key(self.category.id))[0]
+        self.feature.name = self.fake.name()
+        self.feature.save()
+        self.assertEqual(ChangeStamp.objects.get_stamp(
+            featureset_stamp_key(self.category.id))[0], version + 1)
+
+        response = get_featureset(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_stamp_is_read_fresh_without_shared_cache(self):
+        key = featureset_stamp_key(self.category.id)
+        version = ChangeStamp.objects.get_stamp(key)[0]
+        # As a bump made by another process would leave it.
+        ChangeStamp.objects.filter(key=key).update(version=version + 5)
+        self.assertEqual(ChangeStamp.objects.get_stamp(key)[0], version + 5)
+
+    def test_get_featureset_tile(self):
+        def get_tile(z, x, y):
+            request = self.factory.get(
+                self.api_base + f'/featureset/{self.category.id}/tiles/{z}/{x}/{y}.mvt')
+            self.force_authenticate(request, self.app_user)
+            return views.FeatureSetTileView.as_view()(
+                request, id=str(self.category.id), z=str(z), x=str(x), y=str(y))
+
+        response = get_tile(0, 0, 0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertGreater(len(response.content), 0)
+
+        # The feature is in the north-west quadrant.
+        response = get_tile(1, 1, 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.content), 0)
+
+        response = get_tile(1, 2, 0)
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_featureset_tile_not_modified(self):
+        path = self.api_base + f'/featureset/{self.category.id}/tiles/0/0/0.mvt'
+        assert is_url_resolved(path, views.FeatureSetTileView)
+
+        def get_tile(**headers):
+            request = self.factory.get(path, **headers)
+            self.force_authenticate(request, self.app_user)
+            return views.FeatureSetTileView.as_view()(
+                request, id=str(self.category.id), z='0', x='0', y='0')
+
+        response = get_tile()
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = get_tile(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.feature.name = self.fake.name()
+        self.feature.save()
+        response = get_tile(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_get_legacy_featureset_tile(self):
+        feature_set = FeatureSet.objects.create(name=self.fake.name())
+        feature_type = FeatureType.objects.create(name=self.fake.name())
+        PointFeature.objects.create(name=self.fake.name(), type=feature_type, featureset=feature_set,
+                                    feature_geometry=MultiPoint(Point(36.8, -1.3)))
+        path = self.api_base + f'/featureset/v1/{feature_set.id}/tiles/0/0/0.mvt'
+        assert is_url_resolved(path, views.LegacyFeatureSetTileView)
+
+        def get_tile(**headers):
+            request = self.factory.get(path, **headers)
+            self.force_authenticate(request, self.app_user)
+            return views.LegacyFeatureSetTileView.as_view()(
+                request, id=str(feature_set.id), z='0', x='0', y='0')
+
+        response = get_tile()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertGreater(len(response.content), 0)
+
+        response = get_tile(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_get_featureset_simplified(self):
+        request = self.factory.get(
+            self.api_base + f'/featureset/{self.category.id}/', {'zoom': 5})
+        self.force_authenticate(request, self.app_user)
+        response = views.FeatureSetGeoJsonView.as_view()(
+            request, id=str(self.category.id))
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(len(data['features']), 1)
+        self.assertEqual(data['features'][0]['geometry']['type'], 'Point')
+
+        request = self.factory.get(
+            self.api_base + f'/featureset/{self.category.id}/', {'zoom': 'far'})
+        self.force_authenticate(request, self.app_user)
+        response = views.FeatureSetGeoJsonView.as_view()(
+            request, id=str(self.category.id))
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_featureset_simplified_etag(self):
+        def get_featureset(params, **headers):
+            request = self.factory.get(
+                self.api_base + f'/featureset/{self.category.id}/', params, **headers)
+            self.force_authenticate(request, self.app_user)
+            return views.FeatureSetGeoJsonView.as_view()(
+                request, id=str(self.category.id))
+
+        etag = get_featureset({})['ETag']
+        response = get_featureset({'zoom': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_simplified_serializer_keeps_instance_geometry(self):
+        geometry = self.feature.feature_geometry
+        serializers.SpatialFeatureSerializer(self.feature, context={'zoom': 5}).data
+        self.assertIs(self.feature.feature_geometry, geometry)
+
     def test_with_feature_class_is_visible_false(self):
         self.feature_class.is_visible = False
         self.feature_class.save()
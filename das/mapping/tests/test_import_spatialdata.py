@@ -90,6 +90,29 @@ class TestSpatialFile(BaseAPITest):
 
         assert SpatialFeature.objects.count() == 2
 
+    def test_spatial_feature_file_bulk_import(self):
+        data = File(
+            open(os.path.join(TESTS_PATH, 'testdata/wells_closed_points.geojson'), 'rb'))
+        spatialfile = SpatialFeatureFile.objects.create(data=data)
+
+        with self.settings(SPATIAL_IMPORT_CHUNK_SIZE=4):
+            process_spatialfile(spatialfile)
+        features = SpatialFeature.objects.all()
+        self.assertEqual(features.count(), 6)
+        for feature in features:
+            self.assertEqual(
+                list(feature.revision.values_list('action', flat=True)), ['added'])
+            self.assertEqual(feature.spatialfile, spatialfile)
+            self.assertEqual(feature.feature_geometry.geom_type, 'MultiPoint')
+
+        # Re-importing unchanged data matches existing features by
+        # external_id and writes no new rows or revisions.
+        with self.settings(SPATIAL_IMPORT_CHUNK_SIZE=4):
+            process_spatialfile(spatialfile)
+        self.assertEqual(SpatialFeature.objects.count(), 6)
+        for feature in SpatialFeature.objects.all():
+            self.assertEqual(feature.revision.count(), 1)
+
     def test_updating_spatialfile(self):
         data = File(
             open(os.path.join(TESTS_PATH, 'testdata/Matlamamba.zip'), 'rb'))
@@ -3,7 +3,9 @@ from django.urls import re_path
 from mapping.spatialviews import SpatialFeatureGroupView, SpatialFeatureView
 from mapping.views import (FeatureGeoJsonView, FeatureListJsonView,
                            FeatureSetGeoJsonView, FeatureSetListJsonView,
-                           LayerJsonView, LayerListJsonView, MapListJsonView)
+                           FeatureSetTileView, LayerJsonView,
+                           LayerListJsonView, LegacyFeatureSetTileView,
+                           MapListJsonView)
 from utils.constants import regex
 
 app_name = "mapping"
@@ -23,6 +25,17 @@ urlpatterns = (
         FeatureSetGeoJsonView.as_view(),
         name="mapping-featureset-geojson",
     ),
+    # vector tiles for a featureset
+    re_path(
+        rf"^featureset/(?P<id>{regex.UUID})/tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)(?:\.mvt|\.pbf)?/?$",
+        FeatureSetTileView.as_view(),
+        name="mapping-featureset-tile",
+    ),
+    re_path(
+        rf"^featureset/v1/(?P<id>{regex.UUID})/tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)(?:\.mvt|\.pbf)?/?$",
+        LegacyFeatureSetTileView.as_view(),
+        name="mapping-legacy-featureset-tile",
+    ),
     re_path(r"^maps/?$", MapListJsonView.as_view()),
     re_path(r"^layers/?$", LayerListJsonView.as_view()),
     re_path(rf'^layer/(?P<id>{regex.UUID})/?$', LayerJsonView.as_view()),
@@ -15,6 +15,7 @@ from django.utils.encoding import force_str
 
 import utils.json
 from mapping import models
+from mapping.bulk_import import SpatialFeatureImporter
 from utils.spatial import GeometryMapper
 
 geometry_mapper = GeometryMapper()
@@ -146,7 +147,7 @@ def get_spatial_feature_type_name(feature, type_label):
         return feature.get(type_label) if type_label in feature.fields else None
 
 
-def get_or_create_spatial_feature_type(feature, type_label=None):
+def resolve_spatial_feature_type_name(feature, type_label=None):
     type_name = get_spatial_feature_type_name(feature, type_label)
 
     if not type_name:
@@ -156,47 +157,47 @@ def get_or_create_spatial_feature_type(feature, type_label=None):
         except Exception:
             logger.warning('%s missing featuretype', str(feature))
             return
+    return type_name
+
+
+def get_or_create_spatial_feature_type(feature, type_label=None, cache=None):
+    type_name = resolve_spatial_feature_type_name(feature, type_label)
 
     if type_name:
+        if cache is not None and type_name in cache:
+            return cache[type_name]
         try:
-            return models.SpatialFeatureType.objects.get_or_create(name=type_name)[0]
+            feature_type = models.SpatialFeatureType.objects.get_or_create(name=type_name)[0]
         except IntegrityError as ie:
             logger.warning(ie)
             return
+        if cache is not None:
+            cache[type_name] = feature_type
+        return feature_type
 
 
-# set feature name to some reasonable default if we can't find a name
-def set_feature_name(feature_record, feature, feature_type, name_field, counter):
+# get feature name or some reasonable default if we can't find a name
+def get_feature_name(feature, feature_type, name_field, counter):
     name_field = name_field or default_name_field
     try:
-        feature_record.name = feature.get(name_field)
+        return feature.get(name_field)
     except Exception:
-        feature_record.name = feature_type.name + str(counter)
-
-
-def get_or_create_feature(attributes):
-    created = False
-    try:
-        feature_record = models.SpatialFeature.objects.get(
-            external_id=attributes.get('external_id'))
-    except models.SpatialFeature.DoesNotExist:
-        feature_record = None
+        return feature_type.name + str(counter)
 
-    if not feature_record:
-        try:
-            feature_record = models.SpatialFeature.objects.create_spatialfeature(
-                **attributes)
-            created = True
-        except IntegrityError as ie:
-            logger.exception(ie)
 
-    return feature_record, created
+def set_feature_name(feature_record, feature, feature_type, name_field, counter):
+    feature_record.name = get_feature_name(
+        feature, feature_type, name_field, counter)
 
 
-def mappingv2_save_spatial_data(feature, external_id, spatialfile, counter=0):
+def mappingv2_feature_values(feature, spatialfile, counter=0, feature_types=None):
+    """
+    Build the SpatialFeature field values for an OGR feature, or None if
+    the feature has no SpatialFeatureType.
+    """
     model = models.SpatialFeature
     feature_type = spatialfile.feature_type if spatialfile.feature_type else get_or_create_spatial_feature_type(
-        feature)
+        feature, cache=feature_types)
     if not feature_type:
         return
 
@@ -205,16 +206,6 @@ def mappingv2_save_spatial_data(feature, external_id, spatialfile, counter=0):
     model_field_type = model._meta.get_field(model_fieldname)
     feature_geometry = geometry_mapper.get_db_geom(
         feature.geom, model_field_type)
-    data = {
-        'external_id': external_id,
-        'feature_geometry': feature_geometry,
-        'feature_type': feature_type}
-
-    feature_record, created = get_or_create_feature(data)
-    if not feature_record:
-        return
-    feature_record.feature_type = feature_type
-    feature_record.feature_geometry = feature_geometry
 
     attribute_fields = feature_type.attribute_schema
 
@@ -229,27 +220,22 @@ def mappingv2_save_spatial_data(feature, external_id, spatialfile, counter=0):
     provenance = reduce_json(provenance)
     source = getattr(spatialfile, 'source', DEFAULT_SOURCE_NAME)
 
-    defaults = {'attributes': attributes, 'provenance': provenance,
-                'external_source': source}
+    values = {'feature_type': feature_type,
+              'feature_geometry': feature_geometry,
+              'spatialfile': spatialfile,
+              'attributes': attributes,
+              'provenance': provenance,
+              'external_source': source}
     for attribute_field, spatial_field in ATTRIBUTES_TO_SPATIAL_MAPPING.items():
         if attribute_field in fields:
-            defaults[spatial_field['field']] = spatial_field['validator'](
+            values[spatial_field['field']] = spatial_field['validator'](
                 feature[attribute_field].value)
 
-    logger.debug('Import feature: %s, created:%s', external_id, created)
-    feature_record.spatialfile = spatialfile
-
-    if 'tags' in feature.fields:
-        feature_record.tags = [value.strip()
-                               for value in feature['tags'].value.split(',')]
-    for key, value in defaults.items():
-        setattr(feature_record, key, value)
-    set_feature_name(feature_record, feature, feature_type,
-                     spatialfile.name_field, counter)
-    if hasattr(feature_record, "short_name") and not feature_record.short_name:
-        feature_record.short_name = ""
-    feature_record.clean()
-    feature_record.save()
+    values['name'] = get_feature_name(feature, feature_type,
+                                      spatialfile.name_field, counter)
+    if 'short_name' in values and not values['short_name']:
+        values['short_name'] = ''
+    return values
 
 
 def check_file_extension(f_type, data_file, feature_types_file):
@@ -275,22 +261,36 @@ def import_layer(layer, spatialfile):
 
     has_unique_keys = contains_unique_keys_in_layer(
         spatialfile.id_field, spatialfile.name_field, layer)
-    for i, feature in enumerate(layer):
-        if feature.geom.empty:
-            continue
-        else:
-            load_layer(layer, feature, i, spatialfile, has_unique_keys)
 
+    if spatialfile.__class__.__name__ == 'SpatialFile':
+        for i, feature in enumerate(layer):
+            if feature.geom.empty:
+                continue
+            external_id = get_layer_external_id(
+                layer, feature, i, spatialfile, has_unique_keys)
+            mappingv1_save_spatial_data(feature, external_id, spatialfile)
+        return
 
-def load_layer(layer, feature, i, spatialfile, has_unique_keys):
+    feature_types = {}
+    with SpatialFeatureImporter(spatialfile=spatialfile, total=len(layer)) as importer:
+        for i, feature in enumerate(layer):
+            if feature.geom.empty:
+                continue
+            values = mappingv2_feature_values(
+                feature, spatialfile, i, feature_types=feature_types)
+            if values:
+                external_id = get_layer_external_id(
+                    layer, feature, i, spatialfile, has_unique_keys)
+                importer.add(external_id, values)
+    return importer
+
+
+def get_layer_external_id(layer, feature, i, spatialfile, has_unique_keys):
     external_id = make_external_id(
         layer, feature, spatialfile.id_field, spatialfile.name_field)
     if not has_unique_keys:
         external_id = external_id + '-' + str(i)
-    if spatialfile.__class__.__name__ == 'SpatialFile':
-        mappingv1_save_spatial_data(feature, external_id, spatialfile)
-    else:
-        mappingv2_save_spatial_data(feature, external_id, spatialfile)
+    return external_id
 
 
 def mappingv1_save_spatial_data(feature, external_id, spatialfile, counter=0):
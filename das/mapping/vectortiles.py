@@ -0,0 +1,150 @@
+"""
+Mapbox Vector Tiles for feature layers, rendered by PostGIS (ST_AsMVT) and
+cached per layer change stamp, so a tile is only rendered again after a
+feature in its layer changes.
+"""
+import logging
+import math
+
+from django.contrib.gis.db.models import GeometryField
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Func, Value
+from django.db.models.functions import Cast
+
+from mapping import app_settings, models
+
+logger = logging.getLogger(__name__)
+
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+MVT_LAYER_NAME = 'features'
+
+# Half the width of the EPSG:3857 world, in meters.
+WEB_MERCATOR_HALF_WIDTH = 20037508.342789244
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= app_settings.VECTOR_TILES['max_zoom'] and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def tile_envelope(z, x, y):
+    """Return the (xmin, ymin, xmax, ymax) EPSG:3857 bounds of a tile."""
+    size = 2 * WEB_MERCATOR_HALF_WIDTH / 2 ** z
+    xmin = -WEB_MERCATOR_HALF_WIDTH + x * size
+    ymax = WEB_MERCATOR_HALF_WIDTH - y * size
+    return xmin, ymax - size, xmin + size, ymax
+
+
+def tile_lonlat_bounds(z, x, y, margin=0.0):
+    """
+    Return the (west, south, east, north) bounds of a tile, grown by margin
+    (a fraction of the tile size) on every side.
+    """
+    n = 2 ** z
+
+    def lon(tx):
+        return max(-180.0, min(180.0, tx / n * 360.0 - 180.0))
+
+    def lat(ty):
+        ty = max(0.0, min(float(n), ty))
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return lon(x - margin), lat(y + 1 + margin), lon(x + 1 + margin), lat(y - margin)
+
+
+def simplify_tolerance(z, meters=True):
+    """
+    Simplification tolerance of app_settings.VECTOR_TILES['simplify_pixels']
+    screen pixels (on a 256px tile) at zoom z, in EPSG:3857 meters or, with
+    meters=False, in degrees.
+    """
+    pixels = app_settings.VECTOR_TILES['simplify_pixels']
+    world = 2 * WEB_MERCATOR_HALF_WIDTH if meters else 360.0
+    return pixels * world / (256 * 2 ** z)
+
+
+def spatialfeature_source_sql():
+    feature_table = models.SpatialFeature._meta.db_table
+    type_table = models.SpatialFeatureType._meta.db_table
+    return f'''
+        SELECT f.feature_geometry::geometry AS geometry, f.id::text AS id, f.name AS title,
+               t.id::text AS feature_type, t.name AS type_name,
+               COALESCE(NULLIF(f.presentation, '{{}}'::jsonb), t.presentation)::text AS presentation
+        FROM {feature_table} f
+        JOIN {type_table} t ON t.id = f.feature_type_id
+        WHERE t.display_category_id = %(layer_id)s
+          AND (%(include_hidden)s OR t.is_visible)
+          AND f.feature_geometry::geometry && ST_MakeEnvelope(%(west)s, %(south)s, %(east)s, %(north)s, 4326)
+    '''
+
+
+def feature_source_sql():
+    type_table = models.FeatureType._meta.db_table
+    selects = [f'''
+        SELECT f.feature_geometry AS geometry, f.id::text AS id, f.name AS title,
+               t.id::text AS feature_type, t.name AS type_name,
+               COALESCE(NULLIF(f.presentation, '{{}}'::jsonb), t.presentation)::text AS presentation
+        FROM {model._meta.db_table} f
+        JOIN {type_table} t ON t.id = f.type_id
+        WHERE f.featureset_id = %(layer_id)s
+          AND f.feature_geometry && ST_MakeEnvelope(%(west)s, %(south)s, %(east)s, %(north)s, 4326)
+    ''' for model in (models.PolygonFeature, models.LineFeature, models.PointFeature)]
+    return ' UNION ALL '.join(selects)
+
+
+def render_tile(source_sql, layer_id, z, x, y, include_hidden=False):
+    extent = app_settings.VECTOR_TILES['extent']
+    buffer = app_settings.VECTOR_TILES['buffer']
+    xmin, ymin, xmax, ymax = tile_envelope(z, x, y)
+    west, south, east, north = tile_lonlat_bounds(z, x, y, margin=buffer / extent)
+
+    sql = f'''
+        WITH source AS ({source_sql}),
+        mvtgeom AS (
+            SELECT ST_AsMVTGeom(
+                       ST_SimplifyPreserveTopology(ST_Transform(geometry, 3857), %(tolerance)s),
+                       ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, 3857),
+                       %(extent)s, %(buffer)s, true) AS geom,
+                   id, title, feature_type, type_name, presentation
+            FROM source
+        )
+        SELECT ST_AsMVT(mvtgeom, %(layer_name)s, %(extent)s, 'geom')
+        FROM mvtgeom WHERE geom IS NOT NULL
+    '''
+    params = dict(layer_id=str(layer_id), include_hidden=include_hidden,
+                  west=west, south=south, east=east, north=north,
+                  xmin=xmin, ymin=ymin, xmax=xmax, ymax=ymax,
+                  tolerance=simplify_tolerance(z), extent=extent, buffer=buffer,
+                  layer_name=MVT_LAYER_NAME)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] else b''
+
+
+def get_tile(stamp_key, source_sql, layer_id, z, x, y, include_hidden=False):
+    """
+    Return the tile for a layer, from the cache if it was rendered since
+    the layer's change stamp was last bumped.
+    """
+    version, _ = models.ChangeStamp.objects.get_stamp(stamp_key)
+    cache_key = f'mvt:{stamp_key}:{version}:{int(include_hidden)}:{z}/{x}/{y}'
+    tile = cache.get(cache_key)
+    if tile is None:
+        tile = render_tile(source_sql, layer_id, z, x, y, include_hidden=include_hidden)
+        cache.set(cache_key, tile, app_settings.VECTOR_TILES['cache_timeout'])
+    return tile
+
+
+class SimplifyPreserveTopology(Func):
+    function = 'ST_SimplifyPreserveTopology'
+    output_field = GeometryField(srid=4326)
+
+
+def simplified_geometry(field_name, z):
+    """
+    Expression for field_name simplified for display at zoom z, for the
+    simplified GeoJSON served to clients that cannot use vector tiles.
+    """
+    return SimplifyPreserveTopology(Cast(field_name, GeometryField(srid=4326)),
+                                    Value(simplify_tolerance(z, meters=False)))
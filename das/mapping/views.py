@@ -1,37 +1,95 @@
 import hashlib
 import logging
-from itertools import chain
 
 import simplejson as json
-from rest_framework_extensions.etag.decorators import etag
 
 from django.core.serializers import serialize
 from django.db.models import F
 from django.http import Http404, HttpResponse
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import condition
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 import mapping.serializers as serializers
 from mapping import app_settings
-from mapping.models import (DisplayCategory, Map, MBTiles,
+from mapping import vectortiles
+from mapping.models import (FEATURES_STAMP_KEY, ChangeStamp,
+                            DisplayCategory, FeatureSet, Map, MBTiles,
                             MBTilesNotFoundError, MissingTileError,
-                            SpatialFeature, TileLayer)
+                            SpatialFeature, TileLayer, featureset_stamp_key,
+                            legacy_featureset_stamp_key)
 from mapping.permissions import LayerObjectPermissions
 from utils.json import parse_bool
 
 logger = logging.getLogger(__name__)
 
 
+def get_layer_stamp(request, key, *parts):
+    """
+    Return (etag, last_modified) for a feature layer from its ChangeStamp.
+    parts are the updated_at of any other objects in the response.
+    Memoized on the request, since the ETag and Last-Modified functions
+    both need it.
+    """
+    stamps = request.__dict__.setdefault('_layer_stamps', {})
+    if key not in stamps:
+        version, updated_at = ChangeStamp.objects.get_stamp(key)
+        include_hidden = parse_bool(request.GET.get('include_hidden', False))
+        # Simplified GeoJSON differs from the full resolution one.
+        zoom = request.GET.get('zoom', '')
+        etag = ':'.join([key, str(version), str(include_hidden), zoom] + [str(p) for p in parts])
+        last_modified = max([t for t in (updated_at,) + parts if t], default=None)
+        stamps[key] = (hashlib.md5(etag.encode('utf-8')).hexdigest(), last_modified)
+    return stamps[key]
+
+
+def featureset_stamp(request, id, **kwargs):
+    featureset_updated_at = DisplayCategory.objects.filter(id=id).values_list(
+        'updated_at', flat=True).first()
+    return get_layer_stamp(request, featureset_stamp_key(id), featureset_updated_at)
+
+
+def features_stamp(request, *args, **kwargs):
+    return get_layer_stamp(request, FEATURES_STAMP_KEY)
+
+
+def legacy_featureset_stamp(request, id, **kwargs):
+    feature_set_updated_at = FeatureSet.objects.filter(id=id).values_list(
+        'updated_at', flat=True).first()
+    return get_layer_stamp(request, legacy_featureset_stamp_key(id), feature_set_updated_at)
+
+
+def get_zoom(request):
+    """The optional zoom query parameter for simplified GeoJSON."""
+    zoom = request.GET.get('zoom')
+    if zoom is None:
+        return None
+    try:
+        zoom = int(zoom)
+    except ValueError:
+        raise ValidationError({'zoom': 'zoom must be an integer'})
+    return max(0, min(zoom, app_settings.VECTOR_TILES['max_zoom']))
+
+
+def layer_condition(stamp_func):
+    return method_decorator(condition(
+        etag_func=lambda *args, **kwargs: stamp_func(*args, **kwargs)[0],
+        last_modified_func=lambda *args, **kwargs: stamp_func(*args, **kwargs)[1]))
+
+
 class FeatureListJsonView(APIView):
     """
     A simple list of vector layers available to the clients
     """
 
+    @layer_condition(features_stamp)
     def get(self, request):
         # todo:  add api docs
         response_data = {'features': []}
@@ -96,39 +154,33 @@ class FeatureSetListJsonView(APIView):
         return HttpResponse(json.dumps(response_data), content_type='application/json')
 
 
-def calculate_featureset_etag(view_instance, view_method, request, args, kwargs):
-    include_hidden = parse_bool(request.GET.get('include_hidden', False))
-    featureset = DisplayCategory.objects.get(id=kwargs['id'])
-    field_list = ('updated_at', 'feature_type__updated_at')
-    qs = SpatialFeature.objects.filter(
-        feature_type__display_category=featureset) if include_hidden else SpatialFeature.objects.filter(
-        feature_type__display_category=featureset).filter(feature_type__is_visible=True)
-    objects = qs.values(*field_list)
-    etag = ','.join((str(f['updated_at']) + str(f['feature_type__updated_at'])
-                     for f in objects))
-
-    etag += str(featureset.updated_at)
-    return hashlib.md5(etag.encode('utf-8')).hexdigest()
-
-
 class FeatureSetGeoJsonView(APIView):
     parser_classes = (JSONParser,)
     lookup_field = 'id'
 
-    @etag(etag_func=calculate_featureset_etag)
+    @layer_condition(featureset_stamp)
     def get(self, request, **kwargs):
         # todo:  better 404 handling, what to do with empty featureset
         featureset = DisplayCategory.objects.get(id=kwargs['id'])
         include_hidden = parse_bool(request.GET.get('include_hidden', False))
-        querysets = SpatialFeature.objects.filter(
+        zoom = get_zoom(request)
+        queryset = SpatialFeature.objects.filter(
             feature_type__display_category=featureset) if include_hidden else SpatialFeature.objects.filter(
             feature_type__display_category=featureset).filter(feature_type__is_visible=True)
         # So type-name can appear in geojson properties.
-        querysets = (querysets.prefetch_related('feature_type').annotate(
-            type_name=F('feature_type__name')),)
+        queryset = queryset.prefetch_related('feature_type').annotate(
+            type_name=F('feature_type__name'))
+        if zoom is not None:
+            queryset = queryset.annotate(
+                simplified_geometry=vectortiles.simplified_geometry('feature_geometry', zoom))
+
+        features = list(queryset)
+        if zoom is not None:
+            for feature in features:
+                feature.feature_geometry = feature.simplified_geometry
 
         feature = serialize('geojson',
-                            list(chain(*querysets)),
+                            features,
                             properties={'name': 'title',
                                         'default_presentation': 'presentation',
                                         'type_name': 'type_name',
@@ -142,6 +194,38 @@ class FeatureSetGeoJsonView(APIView):
         pass
 
 
+class FeatureSetTileView(APIView):
+    """
+    A Mapbox Vector Tile of the features in a featureset, simplified for
+    the tile's zoom.
+    """
+
+    @layer_condition(featureset_stamp)
+    def get(self, request, id, z, x, y):
+        z, x, y = int(z), int(x), int(y)
+        if not vectortiles.is_valid_tile(z, x, y):
+            raise Http404
+        include_hidden = parse_bool(request.GET.get('include_hidden', False))
+        tile = vectortiles.get_tile(featureset_stamp_key(id), vectortiles.spatialfeature_source_sql(),
+                                    id, z, x, y, include_hidden=include_hidden)
+        return HttpResponse(tile, content_type=vectortiles.MVT_CONTENT_TYPE)
+
+
+class LegacyFeatureSetTileView(APIView):
+    """
+    A Mapbox Vector Tile of the (mapping v1) features in a FeatureSet.
+    """
+
+    @layer_condition(legacy_featureset_stamp)
+    def get(self, request, id, z, x, y):
+        z, x, y = int(z), int(x), int(y)
+        if not vectortiles.is_valid_tile(z, x, y):
+            raise Http404
+        tile = vectortiles.get_tile(legacy_featureset_stamp_key(id), vectortiles.feature_source_sql(),
+                                    id, z, x, y)
+        return HttpResponse(tile, content_type=vectortiles.MVT_CONTENT_TYPE)
+
+
 class MapListJsonView(generics.ListAPIView):
     """
     List of available maps. A Map defines the center location, zoom level and
@@ -1,5 +1,5 @@
 import logging
-from django.db import connection
+from django.db import connection, transaction
 
 logger = logging.getLogger(__name__)
 
@@ -11,15 +11,11 @@ class PatrolsMaterializedView:
         self.lookback = 30
 
     @property
-    def generate_ddl(self):
-        ddl = f"""
-
-        CREATE OR REPLACE FUNCTION to_four_dps(i float) RETURNS float AS $$
-            BEGIN RETURN ROUND(i::numeric, 4); END;
-        $$ LANGUAGE plpgsql;
-
-        CREATE MATERIALIZED VIEW IF NOT EXISTS {self.table_name} AS
-            SELECT p.serial_number as "Patrol Serial Number",
+    def select_statement(self):
+        return f"""
+            SELECT p.id as "Patrol ID",
+            ps.id as "Patrol Segment ID",
+            p.serial_number as "Patrol Serial Number",
             CASE 
                 WHEN p.title NOT LIKE '' THEN p.title
                 WHEN ps.leader_id IS NOT NULL THEN (SELECT name FROM observations_subject WHERE id=ps.leader_id)
@@ -79,7 +75,21 @@ class PatrolsMaterializedView:
             NOW() as "Refresh Time"
             
             FROM activity_patrol p INNER JOIN activity_patrolsegment ps  ON  p.id = ps.patrol_id  
-                INNER JOIN activity_patroltype pt ON ps.patrol_type_id = pt.id;
+                INNER JOIN activity_patroltype pt ON ps.patrol_type_id = pt.id
+        """
+
+    @property
+    def generate_ddl(self):
+        ddl = f"""
+
+        CREATE OR REPLACE FUNCTION to_four_dps(i float) RETURNS float AS $$
+            BEGIN RETURN ROUND(i::numeric, 4); END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TABLE IF NOT EXISTS {self.table_name} AS {self.select_statement};
+
+        CREATE UNIQUE INDEX IF NOT EXISTS {self.table_name}_segment_index ON {self.table_name} ("Patrol Segment ID");
+        CREATE INDEX IF NOT EXISTS {self.table_name}_patrol_index ON {self.table_name} ("Patrol ID");
         """
         return ddl
 
@@ -101,17 +111,94 @@ class PatrolsMaterializedView:
         view_exist = cursor.fetchone()[0]
         return bool(view_exist)
 
+    def is_materialized_view(self):
+        cursor = self.cursor()
+        cursor.execute(
+            "SELECT 1 FROM pg_matviews WHERE matviewname = %s", (self.table_name,))
+        return cursor.fetchone() is not None
+
+    def has_patrol_key(self):
+        cursor = self.cursor()
+        cursor.execute("SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s",
+                       (self.table_name, 'Patrol ID'))
+        return cursor.fetchone() is not None
+
+    def columns(self):
+        cursor = self.cursor()
+        cursor.execute(f"SELECT * FROM {self.table_name} LIMIT 0")
+        return [column[0] for column in cursor.description]
+
+    def lock(self, cursor):
+        """
+        Serialize writers of the table until the end of the transaction, so
+        a reconcile and update_patrols never race on "Patrol Segment ID".
+        """
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (self.table_name,))
+
     def refresh_view(self):
-        if self.check_view_exists():
-            cursor = self.cursor()
-            cursor.execute(f"REFRESH MATERIALIZED VIEW {self.table_name}")
-            logger.info(f"Succesfully refreshed table: {self.table_name}")
-        else:
+        """
+        Full reconcile of the patrols table. Patrol and segment signals keep
+        rows current through update_patrols, but no signal maintains the
+        columns that depend on NOW() (Status), on subject status (Distance
+        covered), on subject sources (Tracked Device) or on the names of
+        related rows, so this must run often (PATROL_VIEW_REFRESH_HOURS).
+        Only rows that differ are rewritten, so "Refresh Time" is when a
+        row last changed.
+        """
+        if not self.check_view_exists():
+            self.execute_ddl()
+            return
+
+        if self.is_materialized_view() or not self.has_patrol_key():
+            self.drop_view()
             self.execute_ddl()
+            return
+
+        columns = [f'"{column}"' for column in self.columns()]
+        compared = [column for column in columns if column != '"Refresh Time"']
+        with transaction.atomic():
+            cursor = self.cursor()
+            self.lock(cursor)
+            cursor.execute(f"""
+                INSERT INTO {self.table_name} AS t ({', '.join(columns)}) {self.select_statement}
+                ON CONFLICT ("Patrol Segment ID") DO UPDATE SET
+                    ({', '.join(columns)}) = ({', '.join(f'EXCLUDED.{column}' for column in columns)})
+                WHERE ({', '.join(f't.{column}' for column in compared)})
+                    IS DISTINCT FROM ({', '.join(f'EXCLUDED.{column}' for column in compared)})
+            """)
+            cursor.execute(f"""
+                DELETE FROM {self.table_name} t WHERE NOT EXISTS (
+                    SELECT 1 FROM activity_patrolsegment ps
+                    INNER JOIN activity_patrol p ON p.id = ps.patrol_id
+                    INNER JOIN activity_patroltype pt ON ps.patrol_type_id = pt.id
+                    WHERE ps.id = t."Patrol Segment ID")
+            """)
+        logger.info(f"Succesfully refreshed table: {self.table_name}")
+
+    def update_patrols(self, patrol_ids):
+        """
+        Replace the rows for the given patrols, removing those for patrols or
+        segments that no longer exist.
+        """
+        patrol_ids = [str(patrol_id) for patrol_id in patrol_ids]
+        if not patrol_ids or not self.check_view_exists() or self.is_materialized_view():
+            return
+
+        with transaction.atomic():
+            cursor = self.cursor()
+            self.lock(cursor)
+            cursor.execute(f'DELETE FROM {self.table_name} WHERE "Patrol ID" = ANY(%s::uuid[])',
+                           (patrol_ids,))
+            cursor.execute(f"INSERT INTO {self.table_name} {self.select_statement} WHERE p.id = ANY(%s::uuid[])",
+                           (patrol_ids,))
+        logger.info(f"Updated {len(patrol_ids)} patrols in table: {self.table_name}")
 
     def drop_view(self):
         cursor = self.cursor()
-        cursor.execute(f'DROP MATERIALIZED VIEW IF EXISTS {self.table_name}')
+        if self.check_view_exists() and not self.is_materialized_view():
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table_name}')
+        else:
+            cursor.execute(f'DROP MATERIALIZED VIEW IF EXISTS {self.table_name}')
         logger.info(f"{self.table_name} has been deleted.")
 
 
@@ -11,12 +11,13 @@ To re-sync your database with changes from others
 GIS
 * default geodjango spatial reference system is WGS84 (SRID 4326)
 """
+import json
 import logging
 import random
 import re
 import uuid
 from datetime import datetime, timedelta
-from functools import reduce
+from functools import lru_cache, reduce
 from operator import getitem
 from typing import NamedTuple, Set
 
@@ -33,7 +34,7 @@ from django.contrib.gis.db import models as dbmodels
 from django.contrib.gis.geos import Point, Polygon
 from django.contrib.postgres.fields import DateTimeRangeField, jsonb
 from django.contrib.postgres.fields.hstore import KeyTransform
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models import (BooleanField, Case, ExpressionWrapper, F,
                               FilteredRelation, Max, Q, Value, When)
 from django.db.models.constraints import UniqueConstraint
@@ -1325,16 +1326,19 @@ class Subject(TimestampedModel, PermissionSetGroupMixin):
             yield '-'.join((key, 'black', sex.lower()))
             yield '-'.join((key, sex.lower()))
 
-        try:
-            state = getattr(self, 'status_radio_state', None) or \
-                self.subjectstatus_set.filter(delay_hours=0).last().radio_state
-        except (SubjectStatus.DoesNotExist, AttributeError):
-            yield '-'.join((key, 'black'))
-            yield key
-        else:
-            color = STATUS_COLORS.get(state, 'black')
-            yield '-'.join((key, color))
-            yield key
+        state = getattr(self, 'status_radio_state', None) or self.current_radio_state
+        color = STATUS_COLORS.get(state, 'black')
+        yield '-'.join((key, color))
+        yield key
+
+    @cached_property
+    def current_radio_state(self):
+        """
+        Radio state of the current (delay_hours=0) SubjectStatus. Serializers
+        listing many subjects set it for all of them at once.
+        """
+        status = self.subjectstatus_set.filter(delay_hours=0).last()
+        return status.radio_state if status else None
 
     def get_users_to_notify(self):
         """
@@ -1411,6 +1415,9 @@ class SubjectStatusQuerySet(models.QuerySet):
 DEFAULT_STATUS_VALUE_DATE = datetime(1970, 1, 1, tzinfo=pytz.utc)
 DEFAULT_STATUS_VALUE_LOCATION = EMPTY_POINT
 
+# Subjects whose delayed SubjectStatus records are updated together.
+SUBJECT_STATUS_BATCH_SIZE = 500
+
 
 class SubjectStatusManager(models.Manager):
 
@@ -1464,34 +1471,90 @@ class SubjectStatusManager(models.Manager):
         :param subject:
         :return:
         '''
-        # Initialize the loop with the most recent 'delayed' observation.
-        key, delay_days = self.delayed_windows[0]
-        delay_hours = delay_days * 24
-        until = datetime.now(tz=pytz.utc) - timedelta(hours=delay_hours)
-        observation = Observation.objects.get_subject_observations(
-            subject=subject, until=until, limit=1).first()
-
-        # March through the view windows.
-        for key, delay_days in self.delayed_windows:
-
-            if not observation:  # No more work to be done.
-                return
-
-            delay_hours = delay_days * 24
-            until = datetime.now(tz=pytz.utc) - timedelta(hours=delay_hours)
-
-            if observation.recorded_at <= until:
-                # Update using the current observation until it's no longer
-                # valid.
-                update_subject_status_from_observation(
-                    observation, delay_hours=delay_hours)
-            else:
-                # Refresh the 'latest observation' for the given window.
-                observation = Observation.objects.get_subject_observations(subject=subject,
-                                                                           until=until, limit=1).first()
-                if observation:
-                    update_subject_status_from_observation(
-                        observation, delay_hours=delay_hours)
+        self.update_delayed_status_for_subjects(
+            [(subject.id, is_subject_stationary_subject(subject))])
+
+    def update_delayed_status_for_subjects(self, subjects):
+        '''
+        Update the delayed SubjectStatus records of many subjects at once.
+
+        The latest eligible Observation of each subject, for each delayed
+        window, is found in one query and applied to the existing records in
+        one UPDATE, with the same rules as update_subject_status.
+
+        :param subjects: (subject_id, is_stationary_subject) pairs.
+        '''
+        if not subjects:
+            return
+
+        now = datetime.now(tz=pytz.utc)
+        windows = [delay_days * 24 for key, delay_days in self.delayed_windows]
+        subject_values = ', '.join(['(%s::uuid, %s::boolean)'] * len(subjects))
+        window_values = ', '.join(['(%s::integer)'] * len(windows))
+        srid = Observation._meta.get_field('location').srid
+
+        observations = Observation.objects.raw(f'''
+            SELECT o.id, o.recorded_at, o.additional, o.source_id,
+                   s.subject_id AS status_subject_id, w.delay_hours AS status_delay_hours
+            FROM (VALUES {subject_values}) AS s (subject_id, include_empty_location)
+            CROSS JOIN (VALUES {window_values}) AS w (delay_hours)
+            CROSS JOIN LATERAL (
+                SELECT ob.* FROM {Observation._meta.db_table} ob
+                JOIN {SubjectSource._meta.db_table} ss ON ss.source_id = ob.source_id
+                WHERE ss.subject_id = s.subject_id
+                AND ss.assigned_range @> ob.recorded_at
+                AND ob.recorded_at <= %s - w.delay_hours * INTERVAL '1 hour'
+                AND ob.exclusion_flags = 0
+                AND (s.include_empty_location OR NOT ob.location ~= ST_SetSRID(ST_MakePoint(%s, %s), {srid}))
+                ORDER BY ob.recorded_at DESC
+                LIMIT 1
+            ) AS o''', [value for row in subjects for value in row] + windows
+            + [now, EMPTY_POINT.x, EMPTY_POINT.y])
+        observations = list(observations)
+        sources = Source.objects.select_related('provider').in_bulk(
+            {observation.source_id for observation in observations})
+
+        rows = []
+        for observation in observations:
+            observation.source = sources[observation.source_id]
+            values = get_subject_status_values(observation)
+            additional = None
+            if values['reported_subject_name']:
+                additional = {'subject_name': values['reported_subject_name']}
+            if values['transformed_additional_data'] is not None:
+                additional = additional or {}
+                additional['device_status_properties'] = values['transformed_additional_data']
+
+            radio_state, radio_state_at = values['radio_state'], values['radio_state_at']
+            if not (radio_state and radio_state_at):
+                radio_state = radio_state_at = None
+
+            rows.append((observation.status_subject_id, observation.status_delay_hours, observation.id,
+                         radio_state, radio_state_at, values['last_voice_call_start_at'],
+                         values['location_requested_at'],
+                         json.dumps(additional) if additional is not None else None))
+        if not rows:
+            return
+
+        update_values = ', '.join(['''(%s::uuid, %s::integer, %s::uuid, %s::varchar, %s::timestamptz,
+                                     %s::timestamptz, %s::timestamptz, %s::jsonb)'''] * len(rows))
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                UPDATE {SubjectStatus._meta.db_table} AS st SET
+                    recorded_at = GREATEST(st.recorded_at, o.recorded_at),
+                    location = CASE WHEN st.recorded_at <= o.recorded_at THEN o.location ELSE st.location END,
+                    radio_state = CASE WHEN st.radio_state_at <= v.radio_state_at
+                                       THEN v.radio_state ELSE st.radio_state END,
+                    radio_state_at = GREATEST(st.radio_state_at, v.radio_state_at),
+                    last_voice_call_start_at = GREATEST(st.last_voice_call_start_at, v.last_voice_call_start_at),
+                    location_requested_at = GREATEST(st.location_requested_at, v.location_requested_at),
+                    additional = COALESCE(v.additional, st.additional)
+                FROM (VALUES {update_values}) AS v (subject_id, delay_hours, observation_id, radio_state,
+                                                     radio_state_at, last_voice_call_start_at,
+                                                     location_requested_at, additional)
+                JOIN {Observation._meta.db_table} o ON o.id = v.observation_id
+                WHERE st.subject_id = v.subject_id AND st.delay_hours = v.delay_hours''',
+                [value for row in rows for value in row])
 
     def ensure_for_subject(self, subject):
         for delay_hours in VIEW_END_WINDOWS:
@@ -1499,6 +1562,31 @@ class SubjectStatusManager(models.Manager):
                 subject=subject, delay_hours=delay_hours[1] * 24,
                 defaults=SubjectStatusManager.DEFAULT_STATUS_VALUES)
 
+    def ensure_for_subjects(self, subject_ids):
+        existing = set(SubjectStatus.objects.filter(subject_id__in=subject_ids)
+                       .values_list('subject_id', 'delay_hours'))
+        SubjectStatus.objects.bulk_create(
+            [SubjectStatus(subject_id=subject_id, delay_hours=delay_days * 24,
+                           **SubjectStatusManager.DEFAULT_STATUS_VALUES)
+             for subject_id in subject_ids for key, delay_days in VIEW_END_WINDOWS
+             if (subject_id, delay_days * 24) not in existing],
+            ignore_conflicts=True)
+
+    def maintain_delayed_status_all(self, batch_size=SUBJECT_STATUS_BATCH_SIZE):
+        '''
+        Ensure every active subject has its SubjectStatus records and update
+        their delayed windows, batch_size subjects at a time.
+        '''
+        subjects = [(subject_id, subject_type == STATIONARY_SUBJECT_VALUE) for subject_id, subject_type in
+                    Subject.objects.filter(is_active=True).order_by('id')
+                    .values_list('id', 'subject_subtype__subject_type__value')]
+        for start in range(0, len(subjects), batch_size):
+            batch = subjects[start:start + batch_size]
+            logger.info('SubjectStatus maintenance for %s subjects', len(batch))
+            with transaction.atomic():
+                self.ensure_for_subjects([subject_id for subject_id, is_stationary in batch])
+                self.update_delayed_status_for_subjects(batch)
+
     def get_current_status(self, subject):
         value, created = SubjectStatus.objects.get_or_create(
             subject=subject, delay_hours=0,
@@ -1597,29 +1685,64 @@ def update_subject_status(source, recorded_at, location,
             .exclude(name=reported_subject_name).update(name=reported_subject_name)
 
 
+TRANSFORM_INDEX_RE = re.compile(r"\[([0-9]+)]")
+
+
+class CompiledTransform(NamedTuple):
+    """A transforms entry, with its source path split into keys."""
+    keys: tuple
+    dest: str
+    label: str
+    units: str
+
+    def get_value(self, additional):
+        return reduce(getitem, self.keys, additional)
+
+
+def compile_transform_source(source):
+    """Split a source path like 'additional.sensors.[0]' into its keys."""
+    keys = []
+    for k in source.split('.'):
+        if k not in ['', 'additional']:
+            index = TRANSFORM_INDEX_RE.search(k)
+            if index:
+                keys.append(int(index.group(1)))
+            else:
+                keys.append(k)
+    return tuple(keys)
+
+
+@lru_cache(maxsize=256)
+def _compile_transforms(transform_config):
+    return tuple(CompiledTransform(compile_transform_source(source), dest, label, units)
+                 for source, dest, label, units in transform_config)
+
+
+def compile_transforms(transform_format):
+    """
+    Return the CompiledTransforms of a SourceProvider's transforms.
+
+    Each configuration is compiled once and looked up by its contents, so
+    a changed configuration is compiled afresh.
+    """
+    if isinstance(transform_format, tuple):
+        return transform_format
+    return _compile_transforms(tuple((tf.get('source'), tf.get('dest'), tf.get('label'), tf.get('units'))
+                                     for tf in transform_format))
+
+
 def transform_additional_data(additional, transform_format):
     """Transform additional subject data for display."""
 
     device_attributes = []
-    dests = []
-    for tf in transform_format:
-        ds = tf.get('dest')
-
-        keys = []
-        for k in tf.get('source').split('.'):
-            if k not in ['', 'additional']:
-                index = re.search(r"\[([0-9]+)]", k)
-                if index:
-                    keys.append(int(index.group(1)))
-                else:
-                    keys.append(k)
-
+    dests = set()
+    for tf in compile_transforms(transform_format):
         try:
-            value = reduce(getitem, keys, additional)
+            value = tf.get_value(additional)
         except KeyError:
             continue
 
-        if value is not None and ds not in dests:
+        if value is not None and tf.dest not in dests:
 
             if isinstance(value, dict):  # list-ify a dict
                 value = [f'{k}:{str(v)}' for k, v in value.items()]
@@ -1628,15 +1751,17 @@ def transform_additional_data(additional, transform_format):
                 value = ",".join([str(x) for x in value])
 
             metadata = dict(value=value,
-                            label=tf.get('label'),
-                            units=tf.get('units'))
-            dests.append(ds)
+                            label=tf.label,
+                            units=tf.units)
+            dests.add(tf.dest)
             device_attributes.append(metadata)
     return device_attributes
 
 
-def update_subject_status_from_observation(observation, delay_hours=0, force=False):
-
+def get_subject_status_values(observation):
+    '''
+    The SubjectStatus values reported in an observation's additional data.
+    '''
     additional = observation.additional
     transformed_data = None
 
@@ -1651,38 +1776,45 @@ def update_subject_status_from_observation(observation, delay_hours=0, force=Fal
     except:
         location_requested_at = None
 
-    recorded_at = observation.recorded_at
-    source = observation.source
-    location = observation.location
     if additional:
 
         reported_subject_name = additional.get('subject_name')
 
-        radio_state = observation.additional.get('radio_state')
+        radio_state = additional.get('radio_state')
         try:
             radio_state_at = parse_date(
-                observation.additional.get('radio_state_at'))
+                additional.get('radio_state_at'))
         except:
             radio_state_at = None
 
         try:
             transformed_data = transform_additional_data(
-                additional, source.provider.transforms)
+                additional, observation.source.provider.transforms)
         except Exception as exc:
             logger.debug(f"failed with exception {exc}")
 
     else:
         reported_subject_name, radio_state, radio_state_at = None, None, None
 
+    return dict(last_voice_call_start_at=last_voice_call_start_at,
+                location_requested_at=location_requested_at,
+                radio_state=radio_state,
+                radio_state_at=radio_state_at,
+                reported_subject_name=reported_subject_name,
+                transformed_additional_data=transformed_data)
+
+
+def update_subject_status_from_observation(observation, delay_hours=0, force=False):
+
+    values = get_subject_status_values(observation)
+    recorded_at = observation.recorded_at
+    source = observation.source
+    location = observation.location
+
     update_subject_status(source=source, location=location, recorded_at=recorded_at,
-                          last_voice_call_start_at=last_voice_call_start_at,
-                          location_requested_at=location_requested_at,
-                          radio_state=radio_state,
-                          radio_state_at=radio_state_at,
-                          reported_subject_name=reported_subject_name,
-                          transformed_additional_data=transformed_data,
                           delay_hours=delay_hours,
-                          force=force)
+                          force=force,
+                          **values)
 
     # Ordinarily this will not be required, because an Observation signal will
     # trigger a notify. In the case of force, it is likely we're handling
@@ -14,8 +14,9 @@ import rest_framework.serializers
 from django.conf import settings
 from django.contrib.gis.geos import Point
 from django.contrib.postgres.fields import jsonb
-from django.db.models import Q
+from django.db.models import F, Manager, Q
 from django.urls import reverse
+from django.utils.functional import cached_property
 from rest_framework.fields import DateTimeField
 
 import utils.json
@@ -69,7 +70,6 @@ class GroupSerializer(rest_framework.serializers.ModelSerializer):
 
     def to_representation(self, instance):
         user = getattr(self.context.get('request', None), 'user', None)
-        data_serializer = self.serializer(context=self.context)
         contained_field = self.contained_field
         active = True
 
@@ -92,8 +92,7 @@ class GroupSerializer(rest_framework.serializers.ModelSerializer):
         # name is not a field of source object but model_name is.
         # queryset = sorted(queryset, key=lambda k: k.model_name, reverse=False)
         rep = super().to_representation(instance)
-        data = [data_serializer.to_representation(s)
-                for s in queryset]
+        data = self.serializer(many=True, context=self.context).to_representation(queryset)
         rep[contained_field] = data
         return rep
 
@@ -190,6 +189,120 @@ class SubjectSourceSerializer(rest_framework.serializers.ModelSerializer):
         return representation
 
 
+class SubjectBatch(object):
+    """
+    What SubjectSerializer reads of each subject besides its own fields,
+    loaded for every subject of a page at once. Each kind of data is loaded
+    with one query the first time a subject needs it.
+    """
+
+    def __init__(self, subjects, context):
+        self.subjects = list(subjects)
+        self.subject_ids = {subject.id for subject in self.subjects}
+        self.context = context
+        self.radio_states_set = False
+
+    def __contains__(self, subject):
+        return subject.id in self.subject_ids
+
+    @cached_property
+    def last_subject_sources(self):
+        # The same row as subject.subjectsources.last(), for every subject.
+        subject_sources = models.SubjectSource.objects.filter(subject_id__in=self.subject_ids) \
+            .select_related('source__provider').order_by('subject_id', '-pk').distinct('subject_id')
+        return {subject_source.subject_id: subject_source for subject_source in subject_sources}
+
+    def last_subject_source(self, subject):
+        return self.last_subject_sources.get(subject.id)
+
+    @cached_property
+    def status_values(self):
+        subjects = [subject for subject in self.subjects if not hasattr(subject, 'status_radio_state')]
+        if not subjects:
+            return {}
+        statuses = {status.subject_id: status for status in models.SubjectStatus.objects.filter(
+            subject__in=subjects, delay_hours=0)}
+        for subject in subjects:
+            if subject.id not in statuses:
+                statuses[subject.id] = resolve_status_values(subject)
+        return statuses
+
+    def resolve_status_values(self, subject):
+        if hasattr(subject, 'status_radio_state'):
+            return resolve_status_values(subject)
+        return self.status_values[subject.id]
+
+    def set_current_radio_states(self):
+        """Set Subject.current_radio_state where image_url would look it up."""
+        if self.radio_states_set:
+            return
+        self.radio_states_set = True
+        subjects = [subject for subject in self.subjects
+                    if not getattr(subject, 'status_radio_state', None)
+                    and 'current_radio_state' not in subject.__dict__]
+        if not subjects:
+            return
+        radio_states = dict(models.SubjectStatus.objects.filter(
+            subject__in=subjects, delay_hours=0).values_list('subject_id', 'radio_state'))
+        for subject in subjects:
+            subject.current_radio_state = radio_states.get(subject.id)
+
+    @cached_property
+    def linked_observations(self):
+        """
+        The latest Observation of each subject's latest linked source (see
+        SubjectsView.subject_linked_sources) within its assigned range.
+        """
+        subject_linked_sources = self.context.get('subject_linked_sources') or {}
+        rows = []
+        for subject in self.subjects:
+            linked_sources = subject_linked_sources.get(subject.id)
+            if linked_sources and linked_sources['latest_range'] and linked_sources['oldest_range']:
+                latest_range = linked_sources['latest_range']
+                rows.append((subject.id, linked_sources['latest_source'],
+                             latest_range.lower, latest_range.upper))
+        if not rows:
+            return {}
+
+        values = ', '.join(['(%s::uuid, %s::uuid, %s::timestamptz, %s::timestamptz)'] * len(rows))
+        observations = models.Observation.objects.raw(f'''
+            SELECT o.*, v.subject_id AS linked_subject_id
+            FROM (VALUES {values}) AS v (subject_id, source_id, lower_bound, upper_bound)
+            CROSS JOIN LATERAL (
+                SELECT * FROM {models.Observation._meta.db_table}
+                WHERE source_id = v.source_id
+                AND recorded_at BETWEEN v.lower_bound AND v.upper_bound
+                ORDER BY recorded_at DESC
+                LIMIT 1
+            ) AS o''', [value for row in rows for value in row])
+        return {observation.linked_subject_id: observation for observation in observations}
+
+    @cached_property
+    def two_way_subject_sources(self):
+        two_way_subject_sources = {}
+        for ss_by_source in self.context.get('two_way_subject_sources', {}).values():
+            for subject_source in ss_by_source.values():
+                two_way_subject_sources.setdefault(subject_source['subject_id'], []).append(subject_source)
+        return two_way_subject_sources
+
+
+class SubjectBatchListMixin(object):
+    """Resolve a page of subjects as a SubjectBatch before serializing them."""
+
+    def to_representation(self, data):
+        subjects = list(data.all() if isinstance(data, Manager) else data)
+        self.child.batch = SubjectBatch(subjects, self.context)
+        return super().to_representation(subjects)
+
+
+class SubjectListSerializer(SubjectBatchListMixin, rest_framework.serializers.ListSerializer):
+    pass
+
+
+class SubjectGeoJsonListSerializer(SubjectBatchListMixin, GeoFeatureModelListSerializer):
+    pass
+
+
 class SubjectSerializer(rest_framework.serializers.Serializer):
 
     content_type = ContentTypeField(read_only=True, required=False)
@@ -218,6 +331,15 @@ class SubjectSerializer(rest_framework.serializers.Serializer):
                             'content_type', 'subject_type')
         fields = ('id', 'name', 'subject_subtype', 'common_name',
                   'additional', 'is_active',) + read_only_fields
+        list_serializer_class = SubjectListSerializer
+
+    # The SubjectBatch of the subjects being listed, if any.
+    batch = None
+
+    def get_batch(self, instance):
+        if self.batch is None or instance not in self.batch:
+            return SubjectBatch([instance], self.context)
+        return self.batch
 
     def to_internal_value(self, data):
         if 'id' in data:
@@ -240,6 +362,9 @@ class SubjectSerializer(rest_framework.serializers.Serializer):
         user = getattr(self.context.get('request', None), 'user', None)
         render_last_location = self.context.get('render_last_location', True)
 
+        batch = self.get_batch(instance)
+        batch.set_current_radio_states()
+
         rep = super(SubjectSerializer, self).to_representation(instance)
         additional = instance.additional
         additional = {
@@ -248,7 +373,7 @@ class SubjectSerializer(rest_framework.serializers.Serializer):
         rep.update(additional)
         rep['tracks_available'] = False
         rep['image_url'] = instance.image_url
-        is_stationary_subject = self._is_stationary_subject(instance)
+        is_stationary_subject = self._is_stationary_subject(instance, batch)
         if is_stationary_subject:
             rep["is_static"] = True
 
@@ -278,35 +403,23 @@ class SubjectSerializer(rest_framework.serializers.Serializer):
                 default_window_cutoff = pytz.utc.localize(
                     datetime.utcnow() - timedelta(days=settings.SHOW_TRACK_DAYS))
 
-                statusvalues = resolve_status_values(instance)
+                statusvalues = batch.resolve_status_values(instance)
 
                 # Get last_position details from latest accessible source
                 # according to SourceGroup permissions.
                 linked_sources = self.context.get(
                     'subject_linked_sources', {}).get(instance.id)
                 if linked_sources:
-                    # Fetch latest & oldest Observations available to plot
+                    # The latest Observation available to plot
                     # latest_position & tracks_range.
-                    latest_source = linked_sources['latest_source']
                     latest_range = linked_sources['latest_range']
-                    linked_sources['oldest_source']
                     oldest_range = linked_sources['oldest_range']
 
                     if latest_range and oldest_range:
-                        query = models.Observation.objects.filter(
-                            source=latest_source,
-                            recorded_at__range=[
-                                latest_range.lower,
-                                latest_range.upper
-                            ]
-                        )
-                        latest_observation = query.order_by(
-                            '-recorded_at').first()
-                        oldest_observation = query.order_by(
-                            'recorded_at').first()
+                        latest_observation = batch.linked_observations.get(instance.id)
 
                         rep['tracks_available'] = statusvalues.recorded_at and statusvalues.recorded_at > default_window_cutoff
-                        if latest_observation and oldest_observation:
+                        if latest_observation:
                             additional = latest_observation.additional
                             if not isinstance(additional, dict):
                                 additional = {}
@@ -321,8 +434,8 @@ class SubjectSerializer(rest_framework.serializers.Serializer):
                             rep['last_position_date'] = latest_observation.recorded_at
 
                             location = latest_observation.location
-                            if is_stationary_subject and instance.subjectsources.last().location:
-                                location = instance.subjectsources.last().location
+                            if is_stationary_subject and batch.last_subject_source(instance).location:
+                                location = batch.last_subject_source(instance).location
 
                             rep['last_position'] = make_feature(
                                 request,
@@ -350,8 +463,8 @@ class SubjectSerializer(rest_framework.serializers.Serializer):
                         'radio_state_at': None if statusvalues.radio_state_at == models.DEFAULT_STATUS_VALUE_DATE else statusvalues.radio_state_at,
                         'radio_state': statusvalues.radio_state
                     }
-                    if is_stationary_subject and instance.subjectsources.last().location:
-                        location = instance.subjectsources.last().location
+                    if is_stationary_subject and batch.last_subject_source(instance).location:
+                        location = batch.last_subject_source(instance).location
 
                     if tracks_available:
                         rep['last_position_date'] = recorded_at
@@ -366,7 +479,7 @@ class SubjectSerializer(rest_framework.serializers.Serializer):
                     statusvalues)
                 if is_stationary_subject:
                     rep['device_status_properties'] = self._get_device_properties_static_sensor(
-                        statusvalues, instance)
+                        statusvalues, instance, batch)
                     rep["tracks_available"] = False
 
         if request:
@@ -377,13 +490,7 @@ class SubjectSerializer(rest_framework.serializers.Serializer):
 
             # for ss in get_subjectsources_with_2way_msg(instance):
             if "two_way_subject_sources" in self.context.keys():
-                # two_way_subject_sources is a dict by source_id
-                two_way_subject_sources = self.context["two_way_subject_sources"]
-                instance_id = instance.id
-                for subject_source in [ss_for_subject
-                                       for ss_by_source in two_way_subject_sources.values()
-                                       for ss_for_subject in ss_by_source.values()
-                                       if ss_for_subject['subject_id'] == instance_id]:
+                for subject_source in batch.two_way_subject_sources.get(instance.id, ()):
                     message_url = utils.add_base_url(
                         request, reverse('messages-view'))
                     data = {
@@ -409,10 +516,10 @@ class SubjectSerializer(rest_framework.serializers.Serializer):
 
         return models.Subject.objects.create_subject(**validated_data)
 
-    def _is_stationary_subject(self, instance):
+    def _is_stationary_subject(self, instance, batch):
         if (
                 instance.subject_subtype.subject_type.value == STATIONARY_SUBJECT_VALUE
-                and instance.subjectsources.last()
+                and batch.last_subject_source(instance)
         ):
             return True
         return False
@@ -422,10 +529,10 @@ class SubjectSerializer(rest_framework.serializers.Serializer):
             return status_values.device_status_properties
         return None
 
-    def _get_device_properties_static_sensor(self, status_values, subject):
+    def _get_device_properties_static_sensor(self, status_values, subject, batch):
         device_status_properties = self._get_device_status_properties(
             status_values)
-        default_measure = self._get_default_measure(subject)
+        default_measure = self._get_default_measure(batch.last_subject_source(subject))
         if device_status_properties:
             for device in device_status_properties:
                 device["default"] = False
@@ -433,8 +540,7 @@ class SubjectSerializer(rest_framework.serializers.Serializer):
                     device["default"] = True
         return device_status_properties
 
-    def _get_default_measure(self, subject):
-        last_subject_source = subject.subjectsources.last()
+    def _get_default_measure(self, last_subject_source):
         if last_subject_source:
             transforms = last_subject_source.source.provider.transforms
             if transforms:
@@ -460,6 +566,9 @@ def get_subjectsources_with_2way_msg(subject):
 
 
 class SubjectGeoJsonSerializer(SubjectSerializer):
+    class Meta(SubjectSerializer.Meta):
+        list_serializer_class = SubjectGeoJsonListSerializer
+
     @classmethod
     def many_init(cls, *args, **kwargs):
         child_serializer = cls(*args, **kwargs)
@@ -646,29 +755,20 @@ class SubjectTrackSerializer(rest_framework.serializers.BaseSerializer):
         if subject_linked_sources:
             coordinates = []
             times = []
-            EMPTY_POINT = Point(0, 0)
             # Fetch Observations only from the linked sources to limit view
-            # on a Source level
-            for source in subject_linked_sources:
-                subject_source = models.SubjectSource.objects.get(
-                    source=source,
-                    subject=subject
-                )
-
-                lower = subject_source.safe_assigned_range.lower
-                upper = subject_source.safe_assigned_range.upper
-
-                queryset = models.Observation.objects.get_subjectsource_observations(
-                    subject_source,
-                    since=lower,
-                    until=upper,
-                )
-                queryset = queryset.exclude(location=EMPTY_POINT)
-                queryset = queryset.values("location", "recorded_at")
-                for observation in list(queryset):
-                    coordinates.append(observation["location"].coords)
-                    times.append(zeroout_microseconds(
-                        observation["recorded_at"]))
+            # on a Source level, within each source's assignment to the
+            # subject.
+            queryset = models.Observation.objects.filter(
+                source__subjectsource__subject=subject,
+                source__subjectsource__source__in=list(subject_linked_sources),
+                source__subjectsource__assigned_range__contains=F('recorded_at'))
+            # As in get_track, (0, 0) fixes are left out of the track.
+            queryset = queryset.by_exclusion_flags(0, include_empty_location=False)
+            queryset = queryset.order_by('-recorded_at').values("location", "recorded_at")
+            for observation in queryset:
+                coordinates.append(observation["location"].coords)
+                times.append(zeroout_microseconds(
+                    observation["recorded_at"]))
         else:
             coordinates, times = subject.get_track(
                 user,
@@ -1,13 +1,16 @@
 import json
 import logging
 import tempfile
+import xml.etree.ElementTree as etree
 from datetime import datetime, timedelta
 
 import pytz
-import xmltodict
 from celery_once import QueueOnce
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import Point
 from django.core.exceptions import ValidationError
 from django.core.files.storage import default_storage
+from django.db import transaction
 from django.db.models import F
 from django.utils.translation import gettext as _
 from google.api_core import exceptions
@@ -18,9 +21,10 @@ from observations import servicesutils
 from observations.materialized_views import patrols_view
 from observations.message_adapters import _handle_outbox_message
 from observations.models import (GPXTrackFile, Observation, Source,
-                                 SourceProvider, Subject, SubjectStatus, Announcement)
-from observations.serializers import ObservationSerializer
-from observations.utils import dateparse
+                                 SourceProvider, SubjectStatus, Announcement)
+from observations.utils import (block_user_temp, dateparse,
+                                is_observation_stationary_subject,
+                                pop_users_with_new_positions)
 
 logger = logging.getLogger(__name__)
 
@@ -33,9 +37,7 @@ def store_and_forward_service_status(provider_key=None, data=None):
 
 @celery.app.task(base=QueueOnce, once={'graceful': True})
 def maintain_subjectstatus_all():
-    for subject in Subject.objects.filter(is_active=True).values('id'):
-        maintain_subjectstatus_for_subject.apply_async(
-            args=(str(subject['id']),))
+    SubjectStatus.objects.maintain_delayed_status_all()
 
 
 @celery.app.task(base=QueueOnce, once={'graceful': True, })
@@ -72,78 +74,108 @@ def maintain_observation_data():
             observation_queryset.delete()
 
 
-def parse_xml_to_dict(xml):
-    try:
-        xml_todict = xmltodict.parse(xml)
-    except Exception as exc:
-        message = f"Error occurred when parsing gpx file: {str(exc)} "
-        logger.exception(message)
-        return message
-    else:
-        to_json = json.dumps(xml_todict)
-        return json.loads(to_json)
+GPX_CHUNK_SIZE = 1000
 
+GPX_TRACK_POINT_TAG = 'trkpt'
 
-def get_track_points(gpx):
-    try:
-        trkpoint = gpx['gpx']['trk']['trkseg']['trkpt']
-    except KeyError:
-        message = "No track points were found in the file."
-    except Exception as exc:
-        message = f"Error occurred when getting trackpoints from gpx file: {str(exc)}"
-        logger.exception(message)
-    else:
-        return trkpoint
-    return message
-
-
-def get_array_recorded_time(src, array_recorded_at):
-    """Returns an array of trackpoints datetime that does not exist in observation table"""
-    arr_obs = Observation.objects.filter(source=src,
-                                         recorded_at__in=array_recorded_at).values_list('recorded_at', flat=True)
-    arr_recorded_at = set(array_recorded_at).difference(set(arr_obs))
-    return arr_recorded_at
-
-
-def validate_observation(location, recorded_at, source_id, additional, obs_persist, obs_errors):
-    observation = {
-        'location': location,
-        'recorded_at': recorded_at,
-        'source': str(source_id),
-        'additional': additional,
-    }
-    validator = ObservationSerializer(data=observation)
-    if validator.is_valid():
-        obs_persist.append(observation)
-        logger.debug(f"Added new observation record {observation}")
-    else:
-        obs_errors.append(validator.errors)
-        logger.error(f"Observation validation failed {validator.errors}")
-
-
-def process_observation(observation_records, observation_errors):
-    if observation_records:
-        bulk_serializer = ObservationSerializer(
-            data=observation_records, many=True)
-        if bulk_serializer.is_valid():
-            bulk_serializer.save()
-            message = f"Successfully created {len(observation_records)} observations"
-            logger.info(message)
-            return True, message
+
+def _gpx_name(tag, prefixes):
+    """Render a {uri}local tag or attribute with the prefix it was declared with."""
+    if not tag.startswith('{'):
+        return tag
+    uri, local = tag[1:].split('}', 1)
+    prefix = prefixes.get(uri)
+    return f'{prefix}:{local}' if prefix else local
+
+
+def _gpx_element_to_dict(elem, prefixes):
+    """Convert an element the way xmltodict does, with @attributes and #text."""
+    children = list(elem)
+    text = elem.text.strip() if elem.text else ''
+    if not elem.attrib and not children:
+        return text or None
+
+    value = {f'@{_gpx_name(k, prefixes)}': v for k, v in elem.attrib.items()}
+    for child in children:
+        name = _gpx_name(child.tag, prefixes)
+        child_value = _gpx_element_to_dict(child, prefixes)
+        if name not in value:
+            value[name] = child_value
+        elif isinstance(value[name], list):
+            value[name].append(child_value)
         else:
-            message = f"Failed to process bulk observation: {bulk_serializer.errors}"
-            logger.error(message)
-            return False, message
-    elif observation_errors:
-        message = f"Failed to process observation: {observation_errors}"
-        logger.error(message)
-        return False, message
-    else:
-        message = 'Observations records already exists'
-        return True, message
+            value[name] = [value[name], child_value]
+    if text:
+        value['#text'] = text
+    return value
+
+
+def iter_gpx_track_points(file):
+    """
+    Yield the track points of a GPX file as dicts shaped like xmltodict's,
+    e.g. {'@lat': '-2.8', '@lon': '38.9', 'ele': '506.1', 'time': '...'}.
+
+    The file is parsed incrementally and elements are dropped once read, so
+    memory use does not grow with the size of the file.
+    """
+    prefixes = {}
+    stack = []
+    for event, item in etree.iterparse(file, events=('start-ns', 'start', 'end')):
+        if event == 'start-ns':
+            prefix, uri = item
+            prefixes.setdefault(uri, prefix)
+        elif event == 'start':
+            stack.append(item)
+        else:
+            stack.pop()
+            local_name = item.tag.rsplit('}', 1)[-1]
+            if local_name == GPX_TRACK_POINT_TAG:
+                yield _gpx_element_to_dict(item, prefixes)
+            elif len(stack) != 1:
+                continue
+            # Track points and the top level elements (metadata, waypoints,
+            # tracks) are done with, so let them go.
+            if stack:
+                stack[-1].remove(item)
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def get_additional(trkpoint):
+    keys = ['@lat', '@lon', 'time']
+    [trkpoint.pop(i, None) for i in keys]
+    return trkpoint
+
+
+def get_track_point_location(trkpt):
+    """Return a Point of the track point, or None when its coordinates are invalid."""
+    try:
+        latitude, longitude = float(trkpt.get('@lat')), float(trkpt.get('@lon'))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return Point(longitude, latitude)
 
 
 def process_trackpoints(source, source_id, trkpoints, file_name):
+    """
+    Turn a chunk of track points into new Observations of source. Points
+    recorded at a time the source already has an observation for, in the
+    database or earlier in the chunk, are skipped.
+
+    Returns (observations, errors), or (None, error message) when a point
+    has a missing or invalid timestamp.
+    """
     error_msg = None
 
     try:
@@ -157,31 +189,85 @@ def process_trackpoints(source, source_id, trkpoints, file_name):
     if error_msg:
         return None, error_msg
 
-    array_datetime = get_array_recorded_time(source, list_gpx_datetime)
+    existing = set(Observation.objects.filter(
+        source_id=source_id, recorded_at__in=list_gpx_datetime).values_list('recorded_at', flat=True))
 
-    obs_records = []
+    observations = []
     obs_errors = []
-    for trkpt in trkpoints:
-        recorded_at = dateparse(trkpt.get('time'))
-        if recorded_at in array_datetime:
-            lat = trkpt.get('@lat')
-            lon = trkpt.get('@lon')
-            location = {'latitude': float(lat), 'longitude': float(lon)}
-            additional = get_additional(trkpt)
-            validate_observation(location, recorded_at,
-                                 source_id, additional, obs_records, obs_errors)
-            array_datetime.remove(recorded_at)
-        else:
-            logger.info(
+    for trkpt, recorded_at in zip(trkpoints, list_gpx_datetime):
+        if recorded_at in existing:
+            logger.debug(
                 f"Ignored observation record of recorded_at: {recorded_at} and source: {source}")
+            continue
+        location = get_track_point_location(trkpt)
+        if location is None:
+            error = {'location': [f"Invalid coordinates ({trkpt.get('@lat')}, {trkpt.get('@lon')})"
+                                  f" at {trkpt.get('time')}"]}
+            obs_errors.append(error)
+            logger.error(f"Observation validation failed {error}")
+            continue
+        existing.add(recorded_at)
+        observations.append(Observation(source=source, location=location,
+                                        recorded_at=recorded_at, additional=get_additional(trkpt)))
 
-    return obs_records, obs_errors
+    return observations, obs_errors
 
 
-def get_additional(trkpoint):
-    keys = ['@lat', '@lon', 'time']
-    [trkpoint.pop(i) for i in keys]
-    return trkpoint
+class GPXImportError(Exception):
+    pass
+
+
+def import_gpx_track_points(source, file, file_name, progress=None, chunk_size=GPX_CHUNK_SIZE):
+    """
+    Stream the track points of a GPX file into Observations of source,
+    chunk_size points at a time. The file is imported in one transaction.
+
+    progress, if given, is called with (points read, points imported) after
+    each chunk.
+
+    Returns (success, message).
+    """
+    points_read = points_imported = 0
+    obs_errors = []
+    latest = None
+
+    try:
+        with transaction.atomic():
+            for trkpoints in chunked(iter_gpx_track_points(file), chunk_size):
+                observations, errors = process_trackpoints(source, source.id, trkpoints, file_name)
+                if observations is None:
+                    raise GPXImportError(errors)
+                obs_errors.extend(errors)
+                Observation.objects.bulk_create(observations)
+                if observations:
+                    latest = observations[-1]
+                points_read += len(trkpoints)
+                points_imported += len(observations)
+                if progress:
+                    progress(points_read, points_imported)
+    except GPXImportError as exc:
+        return False, str(exc)
+    except etree.ParseError as exc:
+        message = f"Error occurred when parsing gpx file: {str(exc)} "
+        logger.exception(message)
+        return False, message
+
+    if not points_read:
+        return False, "No track points were found in the file."
+
+    if points_imported:
+        # Bulk inserts skip the Observation post_save handler.
+        SubjectStatus.objects.update_current_from_source(
+            source, include_empty_location=is_observation_stationary_subject(latest))
+        message = f"Successfully created {points_imported} observations"
+        logger.info(message)
+        return True, message
+    elif obs_errors:
+        message = f"Failed to process observation: {obs_errors}"
+        logger.error(message)
+        return False, message
+    else:
+        return True, 'Observations records already exists'
 
 
 def success_process_gpxtrack(gpx_id, message):
@@ -191,6 +277,7 @@ def success_process_gpxtrack(gpx_id, message):
 
     return GPXTrackFile.objects.filter(id=gpx_id).update(
         processed_status='success',
+        status_description=None,
         points_imported=points_imported)
 
 
@@ -204,59 +291,52 @@ def failed_process_gpxtrack(gpx_id, error_msg=None):
 @celery.app.task
 def process_gpxtrack_file(gpx_id):
     gpx_file, file_name = GPXTrackFile.objects.get_file(gpx_id)
-    data = gpx_file.read()
-    response = parse_xml_to_dict(data)
-    if isinstance(response, str):
-        failed_process_gpxtrack(gpx_id, response)
-        return
-    trkpoints = get_track_points(response)
-    if isinstance(trkpoints, str):
-        failed_process_gpxtrack(gpx_id, trkpoints)
-        return
-
     source_id = GPXTrackFile.objects.get_source_id(gpx_id)
     source = Source.objects.get(id=source_id)
-    obs_records, obs_errors = process_trackpoints(
-        source, source_id, trkpoints, file_name)
 
-    status, message = process_observation(
-        observation_records=obs_records, observation_errors=obs_errors)
+    def progress(points_read, points_imported):
+        logger.info(f"GPX file {file_name}: read {points_read} points, imported {points_imported}")
+
+    gpx_file.open('rb')
+    try:
+        status, message = import_gpx_track_points(source, gpx_file, file_name, progress=progress)
+    finally:
+        gpx_file.close()
+
     if status:
         success_process_gpxtrack(gpx_id, message)
     else:
-        if obs_records is None:
-            failed_process_gpxtrack(gpx_id, obs_errors)
-        else:
-            failed_process_gpxtrack(gpx_id)
+        failed_process_gpxtrack(gpx_id, message)
 
 
 @celery.app.task(bind=True, track_started=True, ignore_result=False)
 def process_gpxdata_api(self, filename, source_id):
-    with default_storage.open(filename, 'r') as file:
-        data = file.read()
-
-        response = parse_xml_to_dict(data)
-        if isinstance(response, str):
-            raise ValidationError(response)
-
-        trkpoints = get_track_points(response)
-        if isinstance(trkpoints, str):
-            raise ValidationError(trkpoints)
-
     source = Source.objects.get(id=source_id)
-
     file_name = filename.split('/')[-1]
-    obs_records, obs_errors = process_trackpoints(
-        source, source_id, trkpoints, file_name)
 
-    status, message = process_observation(
-        observation_records=obs_records, observation_errors=obs_errors)
+    def progress(points_read, points_imported):
+        self.update_state(state='PROGRESS', meta=dict(points_read=points_read,
+                                                      points_imported=points_imported))
+
+    with default_storage.open(filename, 'rb') as file:
+        status, message = import_gpx_track_points(source, file, file_name, progress=progress)
+
     if status:
         return message
     else:
         raise ValidationError(message)
 
 
+@celery.app.task(base=QueueOnce, once={'graceful': True})
+def enforce_geo_permission_speeds():
+    """Block the users whose latest positions put them over the speed limit."""
+    user_ids = pop_users_with_new_positions()
+    if not user_ids:
+        return
+    for user in get_user_model().objects.filter(id__in=user_ids):
+        block_user_temp(user)
+
+
 @celery.app.task
 def refresh_patrols_view():
     _refresh_patrols_view.apply_async()
@@ -267,6 +347,11 @@ def _refresh_patrols_view():
     patrols_view.refresh_view()
 
 
+@celery.app.task
+def update_patrols_view(patrol_ids):
+    patrols_view.update_patrols(patrol_ids)
+
+
 @celery.app.task(base=QueueOnce, once={'graceful': True})
 def handle_outbox_message(message_id, user_email):
     _handle_outbox_message(message_id, user_email)
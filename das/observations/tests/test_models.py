@@ -12,7 +12,8 @@ from django.test import TestCase
 
 from accounts.models import PermissionSet, User
 from observations.models import (Observation, Source, Subject, SubjectGroup,
-                                 SubjectMaximumSpeed)
+                                 SubjectMaximumSpeed, SubjectStatus,
+                                 compile_transforms, transform_additional_data)
 
 
 def make_perm(perm):
@@ -202,6 +203,35 @@ class TestObservationManager:
         assert observation is None
 
 
+@pytest.mark.django_db
+class TestSubjectStatusManager:
+    def test_maintain_delayed_status_all(self, subject_source):
+        now = datetime.now(tz=pytz.utc)
+
+        def create_observation(age, point=(36.8, -1.3), **kwargs):
+            return Observation.objects.create(
+                recorded_at=now - age, location=Point(point), source=subject_source.source, **kwargs)
+
+        create_observation(timedelta(hours=2))
+        two_days_old = create_observation(timedelta(days=2), additional={
+            'radio_state': 'online-gps', 'radio_state_at': (now - timedelta(days=2)).isoformat()})
+        create_observation(timedelta(days=4), exclusion_flags=Observation.EXCLUDED_MANUALLY)
+        create_observation(timedelta(days=5), point=(0, 0))
+        six_days_old = create_observation(timedelta(days=6))
+        ten_days_old = create_observation(timedelta(days=10))
+        SubjectStatus.objects.filter(subject=subject_source.subject).exclude(delay_hours=0).delete()
+
+        SubjectStatus.objects.maintain_delayed_status_all()
+
+        statuses = {status.delay_hours: status for status in
+                    SubjectStatus.objects.filter(subject=subject_source.subject)}
+        assert statuses[24].recorded_at == two_days_old.recorded_at
+        assert statuses[24].radio_state == 'online-gps'
+        assert statuses[72].recorded_at == six_days_old.recorded_at
+        assert statuses[72].location == six_days_old.location
+        assert statuses[168].recorded_at == ten_days_old.recorded_at
+
+
 @pytest.mark.django_db
 class TestObservationTriggers:
     def test_source_last_observation_relation_without_observation(self, subject_source):
@@ -398,3 +428,29 @@ class TestObservationTriggers:
 
         assert not sources.first().last_observation
         assert not sources.first().last_observation_recorded_at
+
+
+class TestTransformAdditionalData:
+    transforms = [
+        {'dest': 'voltage', 'label': 'Voltage', 'source': 'additional.battery.voltage', 'units': 'V'},
+        {'dest': 'temperature', 'label': 'Temperature', 'source': 'sensors.[1]', 'units': 'C'},
+        {'dest': 'voltage', 'label': 'Voltage', 'source': 'voltage', 'units': 'V'},
+        {'dest': 'missing', 'label': 'Missing', 'source': 'missing', 'units': ''},
+    ]
+
+    def test_compiled_once_per_configuration(self):
+        compiled = compile_transforms(self.transforms)
+        assert compiled[0].keys == ('battery', 'voltage')
+        assert compiled[1].keys == ('sensors', 1)
+        assert compile_transforms([dict(t) for t in self.transforms]) is compiled
+        assert compile_transforms(compiled) is compiled
+
+        changed = [dict(self.transforms[0], units='mV')]
+        assert compile_transforms(changed)[0].units == 'mV'
+
+    def test_transform(self):
+        additional = {'battery': {'voltage': 3.7}, 'voltage': 4, 'sensors': {1: [20, 21]}}
+        assert transform_additional_data(additional, self.transforms) == [
+            {'value': 3.7, 'label': 'Voltage', 'units': 'V'},
+            {'value': '20,21', 'label': 'Temperature', 'units': 'C'},
+        ]
@@ -4,13 +4,16 @@ import pytest
 import pytz
 
 from django.contrib.gis.geos import Point
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIRequestFactory
 
-from factories import SubjectFactory, UserFactory
-from observations.models import (STATIONARY_SUBJECT_VALUE, SubjectSource,
-                                 SubjectType)
-from observations.serializers import (SubjectSourceSerializer,
+from factories import SubjectFactory, SubjectSourceFactory, UserFactory
+from observations.models import (STATIONARY_SUBJECT_VALUE, Observation,
+                                 Subject, SubjectSource, SubjectType)
+from observations.serializers import (SubjectSerializer,
+                                      SubjectSourceSerializer,
                                       SubjectTrackSerializer)
 
 
@@ -206,6 +209,46 @@ class TestSubjectTrackSerializer:
             in subject_serialized["features"][0]["properties"]["image"]
         )
 
+    @pytest.mark.parametrize("linked", [False, True])
+    def test_track_is_newest_first(self, subject, linked):
+        first, second = SubjectSourceFactory.create_batch(2, subject=subject)
+        now = pytz.utc.localize(datetime.utcnow())
+        for source, hours in ((first.source, 3), (second.source, 2), (first.source, 1)):
+            Observation.objects.create(source=source, recorded_at=now - timedelta(hours=hours),
+                                       location=Point(36.8, -hours))
+
+        request = APIRequestFactory().get(
+            reverse("subject-view-tracks", kwargs={"subject_id": subject.id}))
+        request.user = UserFactory(is_superuser=True)
+        context = {"request": request, "tracks_since": now - timedelta(days=1), "tracks_until": now}
+        if linked:
+            context["subject_linked_sources"] = [first.source, second.source]
+        feature = SubjectTrackSerializer(subject, context=context).data["features"][0]
+
+        times = feature["properties"]["coordinateProperties"]["times"]
+        assert len(times) == 3
+        assert times == sorted(times, reverse=True)
+        assert [c[1] for c in feature["geometry"]["coordinates"]] == [-1, -2, -3]
+
+    @pytest.mark.parametrize("linked", [False, True])
+    def test_track_excludes_empty_location(self, subject, linked):
+        subject_source = SubjectSourceFactory(subject=subject)
+        now = pytz.utc.localize(datetime.utcnow())
+        Observation.objects.create(source=subject_source.source, recorded_at=now - timedelta(hours=2),
+                                   location=Point(36.8, -1))
+        Observation.objects.create(source=subject_source.source, recorded_at=now - timedelta(hours=1),
+                                   location=Point(0, 0))
+
+        request = APIRequestFactory().get(
+            reverse("subject-view-tracks", kwargs={"subject_id": subject.id}))
+        request.user = UserFactory(is_superuser=True)
+        context = {"request": request, "tracks_since": now - timedelta(days=1), "tracks_until": now}
+        if linked:
+            context["subject_linked_sources"] = [subject_source.source]
+        feature = SubjectTrackSerializer(subject, context=context).data["features"][0]
+
+        assert [tuple(c) for c in feature["geometry"]["coordinates"]] == [(36.8, -1)]
+
     def test_serialized_format(self, subject_serialized):
         assert isinstance(subject_serialized["features"], list)
         assert len(subject_serialized["features"])
@@ -213,3 +256,29 @@ class TestSubjectTrackSerializer:
             subject_serialized["features"][0]["properties"], dict)
         assert isinstance(
             subject_serialized["features"][0]["properties"]["title"], str)
+
+
+@pytest.mark.django_db
+class TestSubjectSerializerBatch:
+    @pytest.fixture()
+    def context(self):
+        request = APIRequestFactory().get(reverse("subjects-list-view"))
+        request.user = UserFactory(is_superuser=True)
+        return {"request": request, "render_last_location": True, "two_way_subject_sources": {}}
+
+    def serialize(self, subject_ids, context):
+        subjects = Subject.objects.annotate_with_subjectstatus().filter(
+            id__in=subject_ids).select_related(
+            "subject_subtype__subject_type", "common_name").order_by("id")
+        with CaptureQueriesContext(connection) as queries:
+            data = SubjectSerializer(subjects, many=True, context=context).data
+        return data, len(queries)
+
+    def test_queries_do_not_grow_with_subjects(self, context):
+        subject_ids = [ss.subject_id for ss in SubjectSourceFactory.create_batch(6)]
+
+        data, few_queries = self.serialize(subject_ids[:2], context)
+        assert len(data) == 2
+        data, many_queries = self.serialize(subject_ids, context)
+        assert [s["id"] for s in data] == sorted(str(i) for i in subject_ids)
+        assert many_queries == few_queries
@@ -25,7 +25,8 @@ from core.tests import BaseAPITest
 from observations.admin import GPXAdmin
 from observations.models import (GPXTrackFile, Observation, Source, Subject,
                                  SubjectSource, SubjectStatus, SubjectSubType)
-from observations.tasks import process_trackpoints
+from observations.tasks import (import_gpx_track_points,
+                                iter_gpx_track_points, process_trackpoints)
 from observations.utils import calculate_track_range
 from observations.views import GPXFileUploadView, SubjectsView
 
@@ -608,6 +609,35 @@ class SubjectTestCase(BaseAPITest):
             source, source.id, trkpoints, file_name)
         assert obs_errors == 'Points are missing timestamps in GPX file test_file.gpx'
 
+    def test_import_gpx_track_points_in_chunks(self):
+        subject = Subject.objects.get(name='Topsy')
+        source = SubjectSource.objects.get(subject=subject).source
+        gpx_path = os.path.join(TESTS_PATH, 'testdata/gpsmap_data.gpx')
+        with open(gpx_path, 'rb') as gpx_file:
+            trkpoints = list(iter_gpx_track_points(gpx_file))
+        self.assertEqual(trkpoints[0], {'@lat': '-2.66951453872025', '@lon': '38.368555130437016',
+                                        'ele': '503.029999999999973', 'time': '2020-06-06T04:17:33Z'})
+
+        recorded_at = {t['time'] for t in trkpoints}
+        progress = []
+        with open(gpx_path, 'rb') as gpx_file:
+            status, message = import_gpx_track_points(
+                source, gpx_file, 'gpsmap_data.gpx',
+                progress=lambda *counts: progress.append(counts), chunk_size=100)
+        self.assertTrue(status)
+        self.assertEqual(message, f'Successfully created {len(recorded_at)} observations')
+        self.assertEqual(progress[-1], (len(trkpoints), len(recorded_at)))
+        recorded_at = [dateparser.parse(t) for t in recorded_at]
+        self.assertEqual(Observation.objects.filter(
+            source=source, recorded_at__in=recorded_at).count(), len(recorded_at))
+        self.assertTrue(SubjectStatus.objects.filter(
+            subject=subject, delay_hours=0, recorded_at__gte=max(recorded_at)).exists())
+
+        # A second import finds every point already recorded.
+        with open(gpx_path, 'rb') as gpx_file:
+            self.assertEqual(import_gpx_track_points(source, gpx_file, 'gpsmap_data.gpx', chunk_size=100),
+                             (True, 'Observations records already exists'))
+
     def test_process_gpx_upload_nopermission(self):
         # user that does not have permissions to create Observations records
         # cant import gpx file.
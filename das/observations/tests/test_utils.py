@@ -7,7 +7,9 @@ from django.contrib.gis.geos import Point
 
 from observations.models import (STATIONARY_SUBJECT_VALUE, Observation,
                                  SubjectType)
-from observations.utils import calculate_speed, has_exceed_speed
+from observations.tasks import enforce_geo_permission_speeds
+from observations.utils import (calculate_speed, has_exceed_speed,
+                                record_position)
 from observations.utils import is_observation_stationary_subject
 
 positions = [
@@ -75,6 +77,30 @@ class TestSpeedCalculation:
         assert not exceed_speed
 
 
+@pytest.mark.django_db
+class TestSpeedEnforcement:
+    def test_record_position_marks_user(self):
+        user = MagicMock(id="7c2b9a6e-5b8f-4d61-9f2a-3b8e4c1d2a10")
+        now = pytz.utc.localize(datetime(2022, 10, 2, 15, 0))
+        with patch("observations.utils.persistent_storage") as storage:
+            record_position(user, Point(-104.12, 19.62), now)
+
+        (key, position, score, marked_key, member), kwargs = \
+            storage.insert_in_sorted_set_and_mark.call_args
+        assert key == f"location:{user.id}"
+        assert score == now.timestamp()
+        assert (marked_key, member) == ("geo-speed-pending", user.id)
+        assert kwargs["min_score"] == now.timestamp() - 2 * 60 * 60
+
+    def test_enforce_speeds_of_users_with_new_positions(self, django_user_model):
+        user = django_user_model.objects.create_user("ranger", "ranger@example.com", "pass")
+        with patch("observations.tasks.pop_users_with_new_positions", return_value=[user.id]), \
+                patch("observations.tasks.block_user_temp") as block_user_temp:
+            enforce_geo_permission_speeds.run()
+
+        block_user_temp.assert_called_once_with(user)
+
+
 @pytest.mark.django_db
 class TestObservationUtils:
 
@@ -47,6 +47,9 @@ VIEW_OBSERVATION_PERMS = ('observations.view_observation', )
 
 LOCATION = "location"
 GEO_BANNED = "geo-banned"
+# Users with positions the speed check has not seen yet.
+GEO_SPEED_PENDING = "geo-speed-pending"
+POSITIONS_RETAINED_HOURS = 2
 
 
 def get_maximum_allowed_age(user):
@@ -354,10 +357,33 @@ def calculate_speed(user):
 def remove_outdated_positions(user):
     key = get_user_key(user, LOCATION)
     now_before_two_hours = datetime.timestamp(
-        datetime.now() - timedelta(hours=2))
+        datetime.now() - timedelta(hours=POSITIONS_RETAINED_HOURS))
     persistent_storage.slice_sorted_set(key, now_before_two_hours)
 
 
+def record_position(user, point, now):
+    """
+    Store a position of user, and leave the speed check to
+    enforce_geo_permission_speeds, in one round trip to the storage.
+    """
+    position = json.dumps({
+        "datetime": datetime.timestamp(now),
+        "position": {
+            "latitude": point.y,
+            "longitude": point.x,
+        },
+    })
+    persistent_storage.insert_in_sorted_set_and_mark(
+        get_user_key(user, LOCATION), position, datetime.timestamp(now),
+        GEO_SPEED_PENDING, str(user.id),
+        min_score=datetime.timestamp(now - timedelta(hours=POSITIONS_RETAINED_HOURS)))
+
+
+def pop_users_with_new_positions():
+    """Return the ids of users with positions recorded since the last call."""
+    return [uuid.UUID(member.decode("utf8")) for member in persistent_storage.pop_set(GEO_SPEED_PENDING)]
+
+
 def get_parsed_positions(key):
     positions = persistent_storage.get_sorted_set(key)
     return [
@@ -1864,7 +1864,7 @@ class GPXTaskStatusView(generics.ListAPIView):
                     task_success=asyncResult.successful(),
                     task_failed=asyncResult.failed()
                     )
-        if asyncResult.status != 'STARTED':
+        if asyncResult.status not in ('STARTED', 'PROGRESS'):
             # Release the resources whenever AsyncResult instance is called.
             asyncResult.forget()
         return Response(data, status=status.HTTP_200_OK)
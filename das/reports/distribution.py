@@ -2,7 +2,7 @@ import logging
 
 import django.contrib.auth
 from django.contrib.contenttypes.models import ContentType
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.utils.translation import gettext_lazy as _
 
 import accounts
@@ -16,26 +16,51 @@ OBSERVATION_LAG_NOTIFY_PERMISSION_CODENAME = 'receive_lag_notification'
 SILENT_SOURCE_NOTIFY_PERMISSION_CODENAME = 'receive_silent_source_notification'
 
 
-def send_report(subject='', to_email=None, text_content='', from_email=None, html_content=None):
+def build_report_message(subject='', to_email=None, text_content='', from_email=None, html_content=None,
+                         connection=None):
     '''
-    Send a message with optional HTML content.
+    Build a message with optional HTML content.
     '''
     # Allow caller to provide a single address or a list.
     if isinstance(to_email, (str,)):
         to_email = [to_email]
 
     msg = EmailMultiAlternatives(
-        subject=subject, body=text_content, from_email=from_email, to=to_email)
+        subject=subject, body=text_content, from_email=from_email, to=to_email, connection=connection)
     if html_content:
         msg.attach_alternative(html_content, "text/html")
+    return msg
+
+
+def send_report(subject='', to_email=None, text_content='', from_email=None, html_content=None):
+    '''
+    Send a message with optional HTML content.
+    '''
+    build_report_message(subject=subject, to_email=to_email, text_content=text_content,
+                         from_email=from_email, html_content=html_content).send()
+
+
+def send_report_to_each(subject='', to_emails=(), text_content='', from_email=None, html_content=None):
+    '''
+    Send the same report to each address in its own message, all over a single
+    connection to the mail server.
+    :return: the number of messages sent.
+    '''
+    to_emails = [email for email in to_emails if email]
+    if not to_emails:
+        return 0
 
-    msg.send()
+    connection = get_connection()
+    messages = [build_report_message(subject=subject, to_email=email, text_content=text_content,
+                                     from_email=from_email, html_content=html_content, connection=connection)
+                for email in to_emails]
+    return connection.send_messages(messages)
 
 
 def get_users_for_permission(permission_codename, usernames=None):
     User = django.contrib.auth.get_user_model()
     qs = User.objects.filter(
-        is_active=True, permission_sets__permissions__codename=permission_codename)
+        is_active=True, permission_sets__permissions__codename=permission_codename).distinct()
 
     if usernames:
         qs = qs.filter(username__in=usernames)
@@ -0,0 +1,62 @@
+import io
+
+import jinja2
+from docxtpl import DocxTemplate
+
+
+class DocxPartEnvironment(jinja2.Environment):
+    """
+    The jinja environment docx XML parts are rendered with. It keeps the
+    patched source and the compiled template of each part, so parts of a
+    template file are only patched and compiled once.
+    """
+
+    def __init__(self, **options):
+        super(DocxPartEnvironment, self).__init__(**options)
+        self.patched_parts = {}
+        self.compiled_parts = {}
+
+    def from_string(self, source, globals=None, template_class=None):
+        if globals or template_class:
+            return super(DocxPartEnvironment, self).from_string(source, globals, template_class)
+        template = self.compiled_parts.get(source)
+        if template is None:
+            template = self.compiled_parts[source] = super(DocxPartEnvironment, self).from_string(source)
+        return template
+
+
+class CachedDocxTemplate(DocxTemplate):
+    """
+    A DocxTemplate that patches and compiles its XML parts through a
+    DocxPartEnvironment shared with the other copies of its template file.
+    """
+
+    def __init__(self, docx, part_environment):
+        super(CachedDocxTemplate, self).__init__(docx)
+        self.part_environment = part_environment
+
+    def patch_xml(self, src_xml):
+        patched = self.part_environment.patched_parts.get(src_xml)
+        if patched is None:
+            patched = self.part_environment.patched_parts[src_xml] = super(
+                CachedDocxTemplate, self).patch_xml(src_xml)
+        return patched
+
+    def render(self, context, jinja_env=None):
+        return super(CachedDocxTemplate, self).render(context, jinja_env=jinja_env or self.part_environment)
+
+
+class DocxTemplateSource(object):
+    """
+    The contents of a docx template file. Rendering changes a DocxTemplate
+    in place, so every render gets a new copy of the document, while the
+    patched and compiled XML parts are shared between copies.
+    """
+
+    def __init__(self, contents, filename=None):
+        self.contents = contents
+        self.filename = filename
+        self.part_environment = DocxPartEnvironment()
+
+    def new_template(self):
+        return CachedDocxTemplate(io.BytesIO(self.contents), self.part_environment)
@@ -37,7 +37,7 @@ from jinja2._compat import imap, ifilter, string_types, iteritems, \
      encode_filename, PY2, PYPY
 from functools import reduce
 
-from docxtpl import DocxTemplate
+from reports.docxtemplate import DocxTemplateSource
 
 # for direct template usage we have up to ten living environments
 _spontaneous_environments = LRUCache(10)
@@ -778,30 +778,20 @@ class Environment(object):
     def _load_template(self, name, globals):
         if self.loader is None:
             raise TypeError('no loader for this environment specified')
-        try:
-            # use abs path for cache key
-
-            contents, filename, uptodate = self.loader.get_source(self, name)
-            cache_key = filename
-        except RuntimeError:
-            # if loader does not implement get_source()
-            cache_key = None
 
-        # if template is not file, use name for cache key
-        if cache_key is None:
-            cache_key = name
+        # use abs path and mtime for cache key, so a changed file is
+        # read again without checking auto_reload.
+        filename, mtime = self.loader.get_source_stamp(self, name)
+        cache_key = (filename, mtime)
 
-        if self.cache is not None:
-            template = self.cache.get(cache_key)
-            if template is not None and (not self.auto_reload or
-                                         template.is_up_to_date):
-                return template
-
-        if self.cache is not None:
-            self.cache[cache_key] = template
-        template = DocxTemplate(filename)
+        source = self.cache.get(cache_key) if self.cache is not None else None
+        if source is None:
+            contents, filename, uptodate = self.loader.get_source(self, name)
+            source = DocxTemplateSource(contents, filename=filename)
+            if self.cache is not None:
+                self.cache[cache_key] = source
 
-        return template
+        return source.new_template()
 
     @internalcode
     def get_template(self, name, parent=None, globals=None):
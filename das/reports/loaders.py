@@ -41,6 +41,17 @@ class DocxFileSystemLoader(FileSystemLoader):
         self.encoding = encoding
         self.followlinks = followlinks
 
+    def get_source_stamp(self, environment, template):
+        """Return the filename and mtime of template without reading it."""
+        pieces = split_template_path(template)
+        for searchpath in self.searchpath:
+            filename = path.join(searchpath, *pieces)
+            try:
+                return filename, path.getmtime(filename)
+            except OSError:
+                continue
+        raise TemplateNotFound(template)
+
     def get_source(self, environment, template):
         pieces = split_template_path(template)
         for searchpath in self.searchpath:
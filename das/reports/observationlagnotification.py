@@ -5,12 +5,14 @@ import pytz
 from celery_once import QueueOnce
 
 from django.conf import settings
-from django.db.models import Avg, Count, F
+from django.db import transaction
+from django.db.models import Avg, Count, F, OuterRef, Q, Subquery
 from django.utils.dateparse import parse_duration
 
-from activity.models import EventType
+from activity.models import EventRelatedSubject, EventType
 from das_server import celery
-from observations.models import Observation, Source, SourceProvider
+from observations.models import (LatestObservationSource, Observation, Source,
+                                 SourceProvider, SubjectSource)
 from reports.distribution import (OBSERVATION_LAG_NOTIFY_PERMISSION_CODENAME,
                                   get_users_for_permission, send_report)
 from reports.models import SourceEvent, SourceProviderEvent
@@ -29,7 +31,8 @@ def get_lagging_providers():
     providers = Observation.objects \
         .filter(created_at__gt=period_start) \
         .values(provider_key=F('source__provider__provider_key'),
-                provider_display_name=F('source__provider__display_name')) \
+                provider_display_name=F('source__provider__display_name'),
+                provider_additional=F('source__provider__additional')) \
         .annotate(avg_lag=Avg(F('created_at') - F('recorded_at')), data_points=Count('created_at')).order_by()
     # the blank order_by above clears the default order_by for Observation model which removes unwanted group by
     for provider in providers:
@@ -44,7 +47,7 @@ def get_lagging_providers():
         }
         # get config for this provider
         provider_lag_config = get_provider_lag_alert_config(
-            provider_lag_check_data.get('provider_key'))
+            provider_lag_check_data.get('provider_key'), provider.get('provider_additional'))
         # now we have config lets check if it exceeded threshold
         if check_source_provider_lag_exceeded(provider_lag_check_data, provider_lag_config):
             lagging_providers.append(
@@ -54,10 +57,11 @@ def get_lagging_providers():
 
 
 # return the config for this provider's lag alert report
-def get_provider_lag_alert_config(provider_key):
+def get_provider_lag_alert_config(provider_key, additional=None):
     # hard coded for now, but could come from file, etc.
-    provider = SourceProvider.objects.get(provider_key=provider_key)
-    threshold = provider.additional.get('lag_notification_threshold', None)
+    if additional is None:
+        additional = SourceProvider.objects.get(provider_key=provider_key).additional
+    threshold = additional.get('lag_notification_threshold', None)
     configured_lag_threshold = {
         'lag_notification_threshold': threshold,
         'site_name': settings.UI_SITE_NAME,
@@ -132,101 +136,126 @@ Average lag: {avg_lag}
 
 @celery.app.task(base=QueueOnce, once={'graceful': True})
 def check_sources_threshold():
-    source_providers = SourceProvider.objects.filter(
-        source__subjectsource__assigned_range__contains=datetime.datetime.now(
-            pytz.utc)
-    ).distinct()
     now = datetime.datetime.now(pytz.utc)
-
-    for source_provider in source_providers:
-        sources = (
-            Source.objects.filter(provider=source_provider)
-            .annotate(last_observation=F("last_observation_source__observation"))
-            .annotate(last_observation_recorded_at=F("last_observation_source__recorded_at"))
-            .order_by("last_observation_recorded_at")
-        )
-        if evaluate_source_provider_compliance(source_provider, sources, now):
-            continue
-
-        for source in sources.filter(last_observation__isnull=False, last_observation_recorded_at__isnull=False):
-            evaluate_source_compliance(source, source_provider, now)
-
-
-def evaluate_source_provider_compliance(source_provider, latest_observations, now):
-    silence_notification_threshold = source_provider.additional.get(
-        "silence_notification_threshold"
-    )
     source_report = SourcesReport()
-    if silence_notification_threshold and all_sources_have_observations(
-        source_provider, latest_observations
-    ):
-        provider_threshold = parse_duration(silence_notification_threshold)
-        threshold = now - provider_threshold
-
-        if not all_observations_reach_threshold(
-            latest_observations, threshold
-        ) and check_can_write_new_provider_event(
-            source_provider, now, provider_threshold
-        ):
-            logger.info(
-                f"Creating source provider report, due to all sources reach the provider({source_provider.display_name}) threshold."
-            )
-            source_report.create_silent_source_provider_report(
-                source_provider,
-                now,
-                latest_observation_record_at=latest_observations.first().last_observation_recorded_at,
-            )
-            return True
-    return False
-
-
-def all_sources_have_observations(source_provider, latest_observations):
-    return source_provider.sources.count() == latest_observations.filter(last_observation__isnull=False).count()
-
-
-def all_observations_reach_threshold(latest_observation, datetime_threshold):
-    return latest_observation.filter(last_observation_recorded_at__gt=datetime_threshold).count()
 
-
-def check_can_write_new_provider_event(source_provider, now, threshold):
-    if source_provider.events_reached_threshold.all():
-        lag = (
-            now
-            - source_provider.events_reached_threshold.latest("created_at").created_at
-        )
-        return lag > threshold
-    return True
-
-
-def evaluate_source_compliance(source, source_provider, now):
-    provider_default_threshold = source_provider.additional.get(
-        "default_silent_notification_threshold"
-    )
-    if provider_default_threshold:
-        provider_default_threshold = provider_default_threshold + ":00"
-    source_report = SourcesReport()
-
-    if is_threshold_reached(provider_default_threshold, now, source):
-        if can_write_new_source_event(
-            source, now, provider_default_threshold
-        ):
-            logger.info(
-                f"Creating source report, due to default provider threshold was reached by source {source_provider.display_name}"
-            )
-            source_report.create_silent_source_report(
-                source, now, provider_default_threshold, default_reached=True)
-    else:
-        source_threshold = source.additional.get(
-            "silence_notification_threshold"
+    silent_providers, providers = find_silent_source_providers(now)
+    source_report.create_silent_source_provider_reports(silent_providers, now)
+
+    # Sources of a provider that has just been reported silent are not
+    # reported individually.
+    remaining = [p for p in providers if p not in silent_providers]
+    silent_sources = find_silent_sources(remaining, now)
+    source_report.create_silent_source_reports(silent_sources, now)
+
+
+def parse_threshold(threshold):
+    return parse_duration(threshold) if isinstance(threshold, str) else None
+
+
+def get_provider_default_threshold(source_provider):
+    # Configured as HH:MM
+    threshold = source_provider.additional.get(
+        "default_silent_notification_threshold")
+    return threshold + ":00" if threshold else None
+
+
+def find_silent_source_providers(now):
+    """
+    Evaluate every provider with a currently assigned source in one query.
+
+    :return: (providers whose sources have all gone silent for longer than
+      their silence_notification_threshold and that are due a new event,
+      all evaluated providers)
+    """
+    assigned_provider_ids = SubjectSource.objects.filter(
+        assigned_range__contains=now).values('source__provider_id')
+    providers = list(
+        SourceProvider.objects.filter(id__in=assigned_provider_ids).annotate(
+            source_count=Subquery(
+                Source.objects.filter(provider=OuterRef('pk')).order_by().values('provider')
+                .annotate(c=Count('pk')).values('c')),
+            reporting_source_count=Subquery(
+                Source.objects.filter(provider=OuterRef('pk'), last_observation_source__isnull=False)
+                .order_by().values('provider').annotate(c=Count('pk')).values('c')),
+            oldest_recorded_at=Subquery(
+                LatestObservationSource.objects.filter(source__provider=OuterRef('pk'))
+                .order_by('recorded_at').values('recorded_at')[:1]),
+            latest_recorded_at=Subquery(
+                LatestObservationSource.objects.filter(source__provider=OuterRef('pk'))
+                .order_by('-recorded_at').values('recorded_at')[:1]),
+            last_event_at=Subquery(
+                SourceProviderEvent.objects.filter(source_provider=OuterRef('pk'))
+                .order_by('-created_at').values('created_at')[:1]),
+        ))
+
+    silent_providers = []
+    for provider in providers:
+        threshold = parse_threshold(
+            provider.additional.get("silence_notification_threshold"))
+        if not threshold or not provider.source_count \
+                or provider.source_count != provider.reporting_source_count:
+            continue
+        if provider.latest_recorded_at > now - threshold:
+            continue
+        if provider.last_event_at and now - provider.last_event_at <= threshold:
+            continue
+        logger.info(
+            f"Creating source provider report, due to all sources reach the provider({provider.display_name}) threshold."
         )
-        if is_threshold_reached(
-            source_threshold, now, source
-        ) and can_write_new_source_event(source, now, source_threshold):
-            logger.info(
-                f"Creating source report, due to source threshold was reached by source {source.model_name}"
-            )
-            source_report.create_silent_source_report(
-                source, now, source_threshold, default_reached=False)
+        silent_providers.append(provider)
+    return silent_providers, providers
+
+
+def find_silent_sources(providers, now):
+    """
+    Find, in one query, the sources of providers that have been silent for
+    longer than their provider's default threshold or their own
+    silence_notification_threshold and are due a new event.
+
+    :return: list of (source, threshold, default_reached)
+    """
+    provider_thresholds = {p.id: get_provider_default_threshold(p) for p in providers}
+
+    # Only sources past their provider's default threshold or with their
+    # own threshold can be silent.
+    candidates = Q(additional__has_key="silence_notification_threshold")
+    for provider_id, threshold in provider_thresholds.items():
+        if threshold:
+            candidates |= Q(provider_id=provider_id,
+                            last_observation_source__recorded_at__lt=now - parse_duration(threshold))
+
+    sources = Source.objects.filter(
+        candidates,
+        provider_id__in=list(provider_thresholds.keys()),
+        last_observation_source__isnull=False,
+    ).annotate(
+        last_observation_recorded_at=F("last_observation_source__recorded_at"),
+        last_observation_location=F("last_observation_source__observation__location"),
+        last_event_at=Subquery(
+            SourceEvent.objects.filter(source=OuterRef('pk'))
+            .order_by('-created_at').values('created_at')[:1]),
+    ).select_related("provider").prefetch_related("subjectsource_set__subject")
+
+    silent_sources = []
+    for source in sources:
+        provider_threshold = provider_thresholds[source.provider_id]
+        if is_threshold_reached(provider_threshold, now, source):
+            if can_write_new_source_event(source, now, provider_threshold):
+                logger.info(
+                    f"Creating source report, due to default provider threshold was reached by source {source.provider.display_name}"
+                )
+                silent_sources.append((source, provider_threshold, True))
+        else:
+            source_threshold = source.additional.get(
+                "silence_notification_threshold")
+            if is_threshold_reached(source_threshold, now, source) \
+                    and can_write_new_source_event(source, now, source_threshold):
+                logger.info(
+                    f"Creating source report, due to source threshold was reached by source {source.model_name}"
+                )
+                silent_sources.append((source, source_threshold, False))
+    return silent_sources
 
 
 def is_threshold_reached(threshold, now, source):
@@ -237,134 +266,108 @@ def is_threshold_reached(threshold, now, source):
 
 
 def can_write_new_source_event(source, now, threshold):
-    if source.events_reached_threshold.all():
-        lag = now - \
-            source.events_reached_threshold.latest("created_at").created_at
-        return lag > parse_duration(threshold)
+    if source.last_event_at:
+        return now - source.last_event_at > parse_duration(threshold)
     return True
 
 
 class SourcesReport:
-    def create_silent_source_report(self, source, now, threshold, default_reached) -> None:
-        last_observations = source.observation_set.order_by("recorded_at")
-        self._save_silent_source_report(
-            title=self._get_report_title(source, default_reached),
-            report_time=now.strftime("%Y-%m-%d %H:%M:%S"),
-            subject_name=self._get_subject_name(source),
-            source_provider=source.provider.display_name,
-            device_id=source.manufacturer_id,
-            silence_threshold=threshold[:-3],
-            last_device_reported_at=last_observations.last().recorded_at.strftime(
-                "%Y-%m-%d %H:%M:%S"
-            ),
-            subject=self._get_source_subject(source),
-            source=source,
-            location={
-                "latitude": last_observations.last().location.y,
-                "longitude": last_observations.last().location.x,
-            },
-        )
-
-    def create_silent_source_provider_report(
-        self, source_provider, now, latest_observation_record_at
-    ) -> None:
-        self._save_silent_source_provider_report(
-            title=f"{source_provider.display_name} integration disrupted",
-            report_time=now.strftime("%Y-%m-%d %H:%M:%S"),
-            silence_threshold=source_provider.additional.get(
-                "silence_notification_threshold"
-            )[:-3],
-            last_device_reported_at=latest_observation_record_at.strftime(
-                "%Y-%m-%d %H:%M:%S"
-            ),
-            source_provider=source_provider
-        )
-
-    def _save_silent_source_report(
-        self,
-        title: str,
-        report_time: str,
-        subject_name: str,
-        source_provider: str,
-        device_id: str,
-        silence_threshold: str,
-        last_device_reported_at: str,
-        subject,
-        source,
-        location=None,
-    ) -> None:
+    @transaction.atomic
+    def create_silent_source_reports(self, silent_sources, now) -> None:
+        """
+        Create the silent source events for (source, threshold,
+        default_reached) tuples, linking them to their sources and subjects
+        in bulk.
+        """
+        if not silent_sources:
+            return
+
+        event_type = EventType.objects.get(value="silence_source_rep")
+        report_time = now.strftime("%Y-%m-%d %H:%M:%S")
+        source_events, related_subjects = [], []
+        for source, threshold, default_reached in silent_sources:
+            subject = self._get_source_subject(source)
+            location = {
+                "latitude": source.last_observation_location.y,
+                "longitude": source.last_observation_location.x,
+            }
+            event = self._save_report(
+                title=self._get_report_title(source, default_reached),
+                event_type=event_type,
+                location=location,
+                event_details={
+                    "report_time": report_time,
+                    "location": location,
+                    "device_id": source.manufacturer_id,
+                    "name_assigned_subject": subject.name if subject else "(none)",
+                    "source_provider": source.provider.display_name,
+                    "silence_threshold": threshold[:-3],
+                    "latest_position_recorded_at": source.last_observation_recorded_at.strftime(
+                        "%Y-%m-%d %H:%M:%S"),
+                })
+            if event:
+                source_events.append(SourceEvent(source=source, event=event))
+                if subject:
+                    related_subjects.append(EventRelatedSubject(event=event, subject=subject))
+
+        SourceEvent.objects.bulk_create(source_events)
+        EventRelatedSubject.objects.bulk_create(related_subjects)
+
+    @transaction.atomic
+    def create_silent_source_provider_reports(self, source_providers, now) -> None:
+        """
+        Create the silent source provider events for providers annotated
+        with oldest_recorded_at, as returned by find_silent_source_providers.
+        """
+        if not source_providers:
+            return
+
+        event_type = EventType.objects.get(value="silence_source_provider_rep")
+        report_time = now.strftime("%Y-%m-%d %H:%M:%S")
+        provider_events = []
+        for source_provider in source_providers:
+            event = self._save_report(
+                title=f"{source_provider.display_name} integration disrupted",
+                event_type=event_type,
+                event_details={
+                    "report_time": report_time,
+                    "silence_threshold": source_provider.additional.get(
+                        "silence_notification_threshold")[:-3],
+                    "last_device_reported_at": source_provider.oldest_recorded_at.strftime("%Y-%m-%d %H:%M:%S"),
+                })
+            if event:
+                provider_events.append(SourceProviderEvent(
+                    source_provider=source_provider, event=event))
+
+        SourceProviderEvent.objects.bulk_create(provider_events)
+
+    def _save_report(self, title, event_type, event_details, location=None):
         data = {
             "title": title,
-            "event_type": EventType.objects.get(value="silence_source_rep").id,
-            "location": location,
-            "events": [
-                {
-                    "data": {
-                        "event_details": {
-                            "report_time": report_time,
-                            "location": location,
-                            "device_id": device_id,
-                            "name_assigned_subject": subject_name,
-                            "source_provider": source_provider,
-                            "silence_threshold": silence_threshold,
-                            "latest_position_recorded_at": last_device_reported_at,
-                        }
-                    }
-                }
-            ],
+            "event_type": event_type.id,
+            "events": [{"data": {"event_details": event_details}}],
         }
+        if location:
+            data["location"] = location
         serializer = EventSerializer(data=data)
         if serializer.is_valid():
-            event = serializer.save()
-            if subject:
-                event.related_subjects.add(subject)
-            SourceEvent.objects.create(source=source, event=event)
-        else:
-            logger.info(
-                f"Impossible create a source report {serializer.errors}")
+            return serializer.save()
+        logger.info(
+            f"Impossible create a {event_type.value} report {serializer.errors}")
 
-    def _save_silent_source_provider_report(
-        self, title, report_time, silence_threshold, last_device_reported_at, source_provider
-    ) -> None:
-        data = {
-            "title": title,
-            "event_type": EventType.objects.get(value="silence_source_provider_rep").id,
-            "events": [
-                {
-                    "data": {
-                        "event_details": {
-                            "report_time": report_time,
-                            "silence_threshold": silence_threshold,
-                            "last_device_reported_at": last_device_reported_at,
-                        }
-                    }
-                }
-            ],
-        }
-        serializer = EventSerializer(data=data)
-        if serializer.is_valid():
-            event = serializer.save()
-            SourceProviderEvent.objects.create(
-                source_provider=source_provider, event=event)
-        else:
-            logger.info(
-                f"Impossible create a source provider report {serializer.errors}"
-            )
+    def _get_source_subject(self, source):
+        # subjectsource_set is prefetched, take the last by pk as
+        # subjectsource_set.last() would.
+        subject_sources = sorted(source.subjectsource_set.all(), key=lambda ss: ss.pk)
+        if subject_sources and subject_sources[-1].subject:
+            return subject_sources[-1].subject
+        return None
 
     def _get_report_title(self, source, default_reached=False) -> str:
         extra_title = "has gone silent" if default_reached else "is silent"
-        if source.subjectsource_set.last() and source.subjectsource_set.last().subject:
-            return f"{source.subjectsource_set.last().subject.name} {extra_title}"
+        subject = self._get_source_subject(source)
+        if subject:
+            return f"{subject.name} {extra_title}"
         if default_reached:
             return f"{source.id} {extra_title}"
         return f"{source.manufacturer_id} {extra_title}"
-
-    def _get_subject_name(self, source) -> str:
-        if source.subjectsource_set.last() and source.subjectsource_set.last().subject:
-            return source.subjectsource_set.last().subject.name
-        return "(none)"
-
-    def _get_source_subject(self, source):
-        if source.subjectsource_set.last() and source.subjectsource_set.last().subject:
-            return source.subjectsource_set.last().subject
-        return None
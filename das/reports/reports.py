@@ -6,6 +6,7 @@ from django.utils import timezone
 from django.db.models import *
 
 from activity.models import Event
+from choices.cache import get_cached_choices
 from choices.models import Choice
 from observations.models import Subject
 
@@ -14,43 +15,56 @@ from django.utils.html import escape
 from reports.accumulator import accumulator, broadcast
 
 import utils.schema_utils as schema_utils
-from utils.memoize import memoize
 
 
 HWC_REPORT_TYPES = ('human_wildlife_conflict', 'hwc_crp',
                     'hwc_human', 'hwc_prd', 'hwc_pd', 'hwc_retaliation')
 
 
-@memoize
 def get_choices(field):
-    return {c.value: c.display for c in Choice.objects.get_choices(model=Choice.Field_Reports,
-                                                                   field=field)}
+    return {c.value: c.display for c in get_cached_choices(Choice.Field_Reports, field)}
 
 
-@memoize
 def get_dynamic_choices(field):
     field_details = dict(field=field, type='names')
     choices = schema_utils._get_dynamic_choices(field_details)
     return choices
 
 
+class ReportChoices(object):
+    '''
+    Escaped choice display maps for one report run. Each choice field is
+    resolved the first time it is looked up and reused for every event.
+    '''
+
+    def __init__(self):
+        self._choices = {}
+
+    def get_choices(self, field, is_dynamic=False):
+        key = (field, is_dynamic)
+        if key not in self._choices:
+            choices = get_dynamic_choices(field) if is_dynamic else get_choices(field)
+            self._choices[key] = {k: escape(v) for k, v in (choices or {}).items()}
+        return self._choices[key]
+
+    def safe_get_choice(self, val, key, choice_field, default=None, is_dynamic=False):
+        choices = self.get_choices(choice_field, is_dynamic=is_dynamic)
+
+        try:
+            val = val[key]
+            if isinstance(val, dict):
+                # With the old choice tables, we stored a dict of "name", "value"
+                # pairs
+                val = val['value']
+            if isinstance(val, str):
+                return choices[val]
+        except (KeyError, TypeError):
+            pass
+        return default
+
+
 def safe_get_choice(val, key, choice_field, default=None, is_dynamic=False):
-    if is_dynamic:
-        choices = get_dynamic_choices(choice_field)
-    else:
-        choices = get_choices(choice_field)
-
-    try:
-        val = val[key]
-        if isinstance(val, dict):
-            # With the old choice tables, we stored a dict of "name", "value"
-            # pairs
-            val = val['value']
-        if isinstance(val, str):
-            return escape(choices[val])
-    except (KeyError, TypeError):
-        pass
-    return default
+    return ReportChoices().safe_get_choice(val, key, choice_field, default=default, is_dynamic=is_dynamic)
 
 
 def _listify(o):
@@ -117,6 +131,9 @@ def get_daily_report_data(since, before, event_categories=None, **kwargs):
     '''
     generated_at = timezone.now()
 
+    # Choice tables are resolved once for the whole report run.
+    safe_get_choice = ReportChoices().safe_get_choice
+
     render_schema = schema_utils.get_schema_renderer_method()
 
     # Get the events we're interested in. We just need this list once and we'll run it through a set of
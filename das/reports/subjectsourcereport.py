@@ -1,8 +1,10 @@
 import logging
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 import pytz
 
+from django.db.models import Count, F
 from django.utils.translation import gettext_lazy as _
 
 from analyzers.models import SubjectAnalyzerResult
@@ -17,75 +19,85 @@ def generate_subject_records(report_hours=24):
     :param report_hours: How many hours of data should be interpreted for each subject.
     :return: generator of subject-source-performance records.
     '''
-    now = datetime.now(tz=pytz.utc)
-    for ss in SubjectSource.objects.filter(subject__subject_subtype__subject_type='wildlife', subject__is_active=True,
-                                           assigned_range__contains=datetime.now(tz=pytz.utc)):
-
-        result = {'subject_id': str(ss.subject.id),
+    window = timedelta(hours=report_hours)
+
+    # If a subject gets here but has no Observations then we'll exclude it from the report.
+    # TODO: Consider a 'blank' report record for this case.
+    subject_sources = list(
+        SubjectSource.objects.filter(subject__subject_subtype__subject_type='wildlife', subject__is_active=True,
+                                     assigned_range__contains=datetime.now(tz=pytz.utc),
+                                     source__last_observation_source__isnull=False)
+        .select_related('subject__subject_subtype', 'source')
+        .annotate(latest_observation_at=F('source__last_observation_source__recorded_at'),
+                  latest_observation_additional=F('source__last_observation_source__observation__additional')))
+    if not subject_sources:
+        return
+
+    # Every source's observations within report_hours of its latest one.
+    observations_by_source = defaultdict(list)
+    for observation in Observation.objects.filter(
+            source_id__in={ss.source_id for ss in subject_sources},
+            recorded_at__gt=F('source__last_observation_source__recorded_at') - window
+    ).only('id', 'source_id', 'location', 'recorded_at'):
+        observations_by_source[observation.source_id].append(observation)
+
+    # Alert counts per subject-source and analyzer category over the same window.
+    alerts_by_subject_source = defaultdict(dict)
+    for row in SubjectAnalyzerResult.objects.filter(
+            subject__subjectsource__id__in=[ss.id for ss in subject_sources],
+            estimated_time__gte=F('subject__subjectsource__source__last_observation_source__recorded_at') - window,
+            estimated_time__lte=F('subject__subjectsource__source__last_observation_source__recorded_at'),
+            level__gt=SubjectAnalyzerResult.LEVEL_OK
+    ).values('subject__subjectsource__id', 'subject_analyzer__analyzer_category').annotate(
+            count=Count('id')).order_by():
+        alerts_by_subject_source[row['subject__subjectsource__id']][
+            row['subject_analyzer__analyzer_category']] = row['count']
+
+    trajectory_filters = {}
+    for ss in subject_sources:
+        subject = ss.subject
+        result = {'subject_id': str(subject.id),
                   'model_name': ss.source.model_name,
                   'manufacturer_id': ss.source.manufacturer_id,
-                  'name': ss.subject.name,
+                  'name': subject.name,
                   'frequency': ss.source.additional.get('frequency', ''),
                   'data_starts': ss.safe_assigned_range.lower,
-                  'species': ss.subject.subject_subtype.display,
-                  'region': ss.subject.additional.get('region', 'Unassigned'),
+                  'species': subject.subject_subtype.display,
+                  'region': subject.additional.get('region', 'Unassigned'),
+                  'latest_observation_at': ss.latest_observation_at,
                   }
 
+        latest_observations = observations_by_source[ss.source_id]
+        alert_accumulator = alerts_by_subject_source[ss.id]
+
+        if subject.subject_subtype_id not in trajectory_filters:
+            trajectory_filters[subject.subject_subtype_id] = subject.default_trajectory_filter()
         try:
-            latest_observation = Observation.objects.filter(
-                source=ss.source).latest('recorded_at')
-        except Observation.DoesNotExist:
-            latest_observation = None
-
-        # If a subject gets here but has no Observations then we'll exclude it from the report.
-        # TODO: Consider a 'blank' report record for this case.
-
-        if latest_observation:
-
-            result['latest_observation_at'] = latest_observation.recorded_at
-
-            latest_observations = Observation.objects.filter(source=ss.source,
-                                                             recorded_at__gt=(
-                                                                 latest_observation.recorded_at -
-                                                                 timedelta(hours=report_hours)))
-
-            alert_accumulator = {}
-            for ar in SubjectAnalyzerResult.objects.filter(subject=ss.subject,
-                                                           estimated_time__range=(latest_observation.recorded_at -
-                                                                                  timedelta(
-                                                                                      hours=report_hours),
-                                                                                  latest_observation.recorded_at),
-                                                           level__gt=SubjectAnalyzerResult.LEVEL_OK
-                                                           ):
-                k = ar.subject_analyzer.analyzer_category
-                alert_accumulator.setdefault(k, 0)
-                alert_accumulator[k] += 1
-
-            try:
-                trajectory = ss.subject.create_trajectory(obs=latest_observations,
-                                                          trajectory_filter_params=ss.subject.default_trajectory_filter())
-                trajectory_length = trajectory.relocs.fix_count
-            except Exception:
-                trajectory_length = 'n/a'
-
-            result['performance'] = (
-                len(latest_observations), trajectory_length)
-
-            result['voltage'] = latest_observation.additional.get(
-                'voltage', '') if latest_observation.additional else ''
-
-            result['analyzers'] = alert_accumulator
-            result['analyzers_summary'] = ', '.join(
-                '{}({})'.format(k, v) for k, v in alert_accumulator.items())
-
-            result['time_since_last'] = calculate_age_description(
-                latest_observation.recorded_at)
-
-            result['styles'] = {}
-            los_styles = calculate_styles(
-                'latest_observation_at', latest_observation.recorded_at)
-            result['styles']['time_since_last'] = ';'.join(los_styles)
-            yield result
+            trajectory = subject.create_trajectory(obs=latest_observations,
+                                                   trajectory_filter_params=trajectory_filters[
+                                                       subject.subject_subtype_id])
+            trajectory_length = trajectory.relocs.fix_count
+        except Exception:
+            trajectory_length = 'n/a'
+
+        result['performance'] = (
+            len(latest_observations), trajectory_length)
+
+        additional = ss.latest_observation_additional
+        result['voltage'] = additional.get('voltage', '') if additional else ''
+
+        result['analyzers'] = alert_accumulator
+        result['analyzers_summary'] = ', '.join(
+            '{}({})'.format(k, v) for k, v in alert_accumulator.items())
+
+        result['time_since_last'] = calculate_age_description(
+            ss.latest_observation_at)
+
+        result['styles'] = {}
+        los_styles = calculate_styles(
+            'latest_observation_at', ss.latest_observation_at)
+        result['styles']['time_since_last'] = ';'.join(los_styles)
+        yield result
 
 
 def calculate_age_description(val):
@@ -152,17 +164,49 @@ def calculate_styles(keyword, value):
         return fn(value)
 
 
-def filter_by_user(values, user, key='subject_id'):
+def get_permission_profile(user):
+    '''
+    A key shared by users who see the same subjects, i.e. superusers or
+    users with the same permission sets.
+    '''
+    if not hasattr(user, 'get_all_permission_sets'):
+        return None
+    if user.is_superuser:
+        return 'superuser'
+    return frozenset(user.get_all_permission_sets(only_ids=True))
+
+
+def get_user_subject_ids(user, subject_ids=None, profile_cache=None):
+    '''
+    The ids (as str) of the Subjects the User has permission to see,
+    optionally limited to subject_ids. Results are shared through
+    profile_cache by users with the same permission profile.
+    '''
+    profile = get_permission_profile(user)
+    if profile_cache is not None and profile in profile_cache:
+        return profile_cache[profile]
+
+    subjects = Subject.objects.all()
+    if subject_ids is not None:
+        subjects = subjects.filter(id__in=subject_ids)
+    user_subject_ids = {str(x) for x in subjects.by_user_subjects(user).values_list('id', flat=True)}
+
+    if profile_cache is not None:
+        profile_cache[profile] = user_subject_ids
+    return user_subject_ids
+
+
+def filter_by_user(values, user, key='subject_id', user_subject_ids=None):
     '''
     Filter list of values to those the User has permission to see.
     :param values: a list of dict objects having subject_id in 'key'.
     :param user: User to filter by.
     :param key:
+    :param user_subject_ids: precomputed subject ids for user, see get_user_subject_ids.
     :return: filtered list
     '''
-    user_subject_ids = [
-        sub.id for sub in Subject.objects.all().by_user_subjects(user)]
-    user_subject_ids = [str(x) for x in user_subject_ids]
+    if user_subject_ids is None:
+        user_subject_ids = get_user_subject_ids(user)
     return [sub for sub in values if sub[key] in user_subject_ids]
 
 
@@ -191,20 +235,32 @@ def groupify_report_data(subject_records):
     return group_list
 
 
-def generate_user_reports(userlist):
+def generate_profile_reports(userlist):
     '''
     A few steps.
     1. Generate a comprehensive list if records for all collars.
-    2. For each recipient, reduce the list to Subjects the user is allowed to see.
-    3. Organize the data in groups (by [species/region]) for the report context.
+    2. Group recipients by the Subjects they are allowed to see, resolving
+       that once per permission profile.
+    3. For each group, reduce the list to those Subjects and organize the data in
+       groups (by [species/region]) for the report context.
     :param userlist:
-    :return:
+    :return: generator of (list of users, report context)
     '''
     report_records = list(generate_subject_records())
     report_timestamp = datetime.now(tz=pytz.utc)
+    report_subject_ids = {record['subject_id'] for record in report_records}
+    profile_cache = {}
 
+    recipients_by_visibility = {}
     for user in userlist:
-        user_filtered_records = filter_by_user(report_records, user)
+        user_subject_ids = get_user_subject_ids(
+            user, subject_ids=report_subject_ids, profile_cache=profile_cache)
+        recipients_by_visibility.setdefault(
+            frozenset(user_subject_ids), []).append(user)
+
+    for user_subject_ids, users in recipients_by_visibility.items():
+        user_filtered_records = filter_by_user(
+            report_records, None, user_subject_ids=user_subject_ids)
 
         group_list = groupify_report_data(user_filtered_records)
 
@@ -214,4 +270,14 @@ def generate_user_reports(userlist):
             'report_legend': build_legend(),
         }
 
-        yield user, message_context
+        yield users, message_context
+
+
+def generate_user_reports(userlist):
+    '''
+    Like generate_profile_reports, but yields (user, report context) for each
+    user. Users who see the same Subjects share a report context.
+    '''
+    for users, message_context in generate_profile_reports(userlist):
+        for user in users:
+            yield user, message_context
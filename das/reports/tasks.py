@@ -5,11 +5,12 @@ from django.utils.translation import gettext_lazy as _
 
 from das_server import celery
 from reports.distribution import (SOURCE_REPORT_PERMISSION_CODENAME,
-                                  get_users_for_permission, send_report)
+                                  get_users_for_permission,
+                                  send_report_to_each)
 from reports.observationlagnotification import (check_sources_threshold,
                                                 get_lagging_providers,
                                                 send_lag_delay_alert)
-from reports.subjectsourcereport import generate_user_reports
+from reports.subjectsourcereport import generate_profile_reports
 
 logger = logging.getLogger(__name__)
 
@@ -26,10 +27,11 @@ def subjectsource_report(self, usernames=None):
             'No recipients for Subject Source Report, so not generating report data.')
         return
 
-    for user, report_context in generate_user_reports(recipients):
+    # Recipients who see the same subjects share one rendered report.
+    for users, report_context in generate_profile_reports(recipients):
 
-        logger.info('Generating Subject Source Report for username: %s, email: %s',
-                    user.username, user.email)
+        logger.info('Generating Subject Source Report for usernames: %s',
+                    [user.username for user in users])
 
         email_body = render_to_string(
             'subjectsourcereport.html', report_context)
@@ -39,10 +41,10 @@ def subjectsource_report(self, usernames=None):
 
         message_subject = _(
             'EarthRanger Source Report - {}').format(report_timestamp)
-        send_report(subject=message_subject,
-                    to_email=user.email, text_content=_(
-                        'EarthRanger Source report (attached as HTML).'),
-                    html_content=email_body)
+        send_report_to_each(subject=message_subject,
+                            to_emails=[user.email for user in users], text_content=_(
+                                'EarthRanger Source report (attached as HTML).'),
+                            html_content=email_body)
 
 
 @celery.app.task(bind=True)
@@ -22,6 +22,7 @@ from reports.distribution import (
     OBSERVATION_LAG_NOTIFY_PERMISSION_CODENAME,
     get_users_for_permission,
 )
+from reports.models import SourceEvent
 from reports.observationlagnotification import (
     check_sources_threshold,
     generate_lag_notification_email,
@@ -327,3 +328,35 @@ class TestReportByTask:
         assert events.count() == 2
         for event in events:
             assert event.event_type.display == "Silent Source"
+
+    def test_silent_sources_are_not_reported_again_within_threshold(
+        self, five_subject_sources
+    ):
+        provider = five_subject_sources[0].source.provider
+        provider.additional = {
+            "default_silent_notification_threshold": "00:30"}
+        provider.save()
+        source_a = five_subject_sources[0].source
+        source_b = five_subject_sources[1].source
+        source_b.provider = provider
+        source_b.save()
+
+        Observation.objects.create(
+            recorded_at=timezone.now() - timedelta(hours=4),
+            source=source_a,
+            location=Point(1, 2),
+        )
+        Observation.objects.create(
+            recorded_at=timezone.now() - timedelta(hours=3),
+            source=source_b,
+            location=Point(0, 0),
+        )
+        check_sources_threshold()
+        check_sources_threshold()
+
+        events = Event.objects.all()
+        assert events.count() == 2
+        assert SourceEvent.objects.filter(source=source_a).count() == 1
+        event = Event.objects.get(source_event__source=source_a)
+        assert event.location.x == 1 and event.location.y == 2
+        assert list(event.related_subjects.all()) == [five_subject_sources[0].subject]
@@ -2,6 +2,7 @@ import datetime
 import uuid
 
 from django.core.management import call_command
+from django.template import engines
 from django.http.request import HttpRequest
 from django.test import TestCase
 
@@ -10,7 +11,7 @@ import utils.schema_utils as schema_utils
 from accounts.models import User
 from activity.models import *
 from activity.serializers import EventSerializer
-from reports.reports import get_conservancies, get_daily_report_data
+from reports.reports import ReportChoices, get_conservancies, get_daily_report_data
 from utils.tests_tools import is_url_resolved
 
 
@@ -94,3 +95,32 @@ class TestReportUtils(TestCase):
             datetime.datetime(2016, 1, 1, tzinfo=datetime.timezone.utc),         today, username=self.user.username)
 
         assert "unknown" in get_conservancies()
+
+    def test_report_choices_resolved_once(self):
+        report_choices = ReportChoices()
+        conservancies = report_choices.get_choices('conservancy')
+        self.assertIn('unknown', conservancies)
+
+        with self.assertNumQueries(0):
+            self.assertIs(report_choices.get_choices('conservancy'), conservancies)
+            report_choices.safe_get_choice(dict(conservancy='unknown'), 'conservancy', 'conservancy')
+            report_choices.safe_get_choice(dict(conservancy='missing'), 'conservancy', 'conservancy', 'n/a')
+
+    def test_docx_template_parts_are_shared(self):
+        engine = engines['docx_template']
+        template_name = 'default/daily_report_template.docx'
+        first = engine.get_template(template_name).template
+        second = engine.get_template(template_name).template
+
+        # Each render gets its own document, the compiled parts are shared.
+        self.assertIsNot(first, second)
+        self.assertIs(first.part_environment, second.part_environment)
+
+        context = get_daily_report_data(
+            datetime.datetime(2016, 1, 1, tzinfo=datetime.timezone.utc),
+            datetime.datetime.now(tz=datetime.timezone.utc), username=self.user.username)
+        self.assertTrue(engine.get_template(template_name).render(context))
+        compiled_parts = dict(first.part_environment.compiled_parts)
+        self.assertTrue(compiled_parts)
+        self.assertTrue(engine.get_template(template_name).render(context))
+        self.assertEqual(first.part_environment.compiled_parts, compiled_parts)
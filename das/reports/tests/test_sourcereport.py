@@ -1,6 +1,7 @@
 import random
 from datetime import datetime, timedelta
 
+from django.core import mail
 from django.test import TestCase
 from django.contrib.auth.models import Permission
 from django.core.management import call_command
@@ -10,8 +11,11 @@ import pytz
 
 from accounts.models import PermissionSet
 from observations.models import Observation, Subject, SourceProvider, Source, SubjectGroup, SubjectSource
-from reports.subjectsourcereport import generate_subject_records, generate_user_reports
+from reports.subjectsourcereport import (generate_profile_reports,
+                                        generate_subject_records,
+                                        generate_user_reports)
 from reports.distribution import SOURCE_REPORT_PERMISSION_CODENAME, get_users_for_permission
+from reports.tasks import subjectsource_report
 
 
 User = get_user_model()
@@ -155,3 +159,44 @@ class TestSubjectSourceReport(TestCase):
                         'The list of reported users is not equal to the expected list.'
                         ' Expected list: {}, Actual list: {}'.format(expecting_usernames,
                                                                      username_accumulator))
+
+    def test_subject_records_single_pass(self):
+        records = {r['subject_id']: r for r in generate_subject_records()}
+        self.assertEqual(set(records), {str(self.subject1.id), str(self.subject2.id)})
+
+        # Each record covers report_hours leading up to the source's latest observation.
+        for record in records.values():
+            observation_count, _ = record['performance']
+            self.assertEqual(observation_count, 24)
+            self.assertEqual(record['voltage'], '')
+            self.assertEqual(record['analyzers'], {})
+
+        latest = Observation.objects.filter(
+            source__manufacturer_id='source2').latest('recorded_at')
+        self.assertEqual(records[str(self.subject2.id)]['latest_observation_at'], latest.recorded_at)
+
+    def test_user_reports_share_permission_profile(self):
+        # u3 has the same permission sets as u1 and gets the same report.
+        for ps in self.u1.permission_sets.all():
+            self.u3.permission_sets.add(ps)
+
+        reports = {user.username: context for user, context in
+                   generate_user_reports([self.u1, self.u2, self.u3])}
+        self.assertEqual(reports[self.u3.username]['groups'], reports[self.u1.username]['groups'])
+        self.assertEqual(len(reports[self.u2.username]['groups']), 1)
+
+    def test_profile_reports_are_generated_once_per_visibility(self):
+        for ps in self.u1.permission_sets.all():
+            self.u3.permission_sets.add(ps)
+
+        reports = list(generate_profile_reports([self.u1, self.u2, self.u3]))
+        self.assertEqual(len(reports), 2)
+        usernames = sorted(sorted(user.username for user in users) for users, _ in reports)
+        self.assertEqual(usernames, [[self.u1.username, self.u3.username], [self.u2.username]])
+
+    def test_subjectsource_report_sends_a_message_per_recipient(self):
+        subjectsource_report()
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox),
+                         sorted([self.u1.email, self.u2.email]))
+        for message in mail.outbox:
+            self.assertEqual(len(message.to), 1)
@@ -1,5 +1,9 @@
 import logging
+import threading
 import uuid
+import weakref
+from collections import namedtuple
+from contextlib import contextmanager
 
 import simplejson as json
 
@@ -9,7 +13,9 @@ from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.gis.db import models
 from django.core import serializers
-from django.db.models import Max
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -109,9 +115,10 @@ class RevisionAdapter(object):
     def get_serialized_data(self, obj):
         return self._serialize(obj, list(self.get_fieldnames()))
 
-    def get_serialized_data_diff(self, obj, original):
+    def get_serialized_data_diff(self, obj, original, obj_data=None):
         fields = list(self.get_fieldnames())
-        obj_data = self._serialize(obj, fields)
+        if obj_data is None:
+            obj_data = self._serialize(obj, fields)
         fields_diff = [key for key in fields if
                        original.get(key, None) != obj_data.get(key, None)]
         if fields_diff:
@@ -133,6 +140,180 @@ ACTION_CHOICES = (
 )
 
 
+class RevisionOriginal(object):
+    """
+    The serialized data of an instance as stored in the database, read the
+    first time it is needed rather than whenever an instance is loaded.
+
+    Revision's pre_save reads it before an instance is written, so it is
+    only read for instances that are saved. It can be assigned, for
+    example with capture_revision_original, to skip the read.
+    """
+
+    def __init__(self, adapter_class):
+        self.adapter_class = adapter_class
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if instance._state.adding or instance.pk is None:
+            raise AttributeError('revision_original')
+
+        model = type(instance)
+        stored = model._base_manager.using(instance._state.db).filter(pk=instance.pk).first()
+        data = self.adapter_class(model).get_serialized_data(stored) if stored is not None else {}
+        instance.__dict__['revision_original'] = data
+        return data
+
+
+def capture_revision_original(instance):
+    """
+    Record the instance's current data as its revision_original, for an
+    instance that was just loaded and is about to be changed.
+    """
+    instance.__dict__['revision_original'] = RevisionAdapter(type(instance)).get_data_copy(instance)
+
+
+PendingRevision = namedtuple(
+    'PendingRevision', ['instance', 'object_id', 'action', 'user_id', 'data', 'first_data'])
+
+_batch = threading.local()
+
+
+class RevisionBatch(object):
+    """
+    The revisions buffered by revisions_batched, in the order they were
+    written, each with a reference telling whether the savepoints open when
+    it was written were rolled back.
+    """
+
+    def __init__(self, using):
+        self.using = using or DEFAULT_DB_ALIAS
+        self.base_savepoints = self.get_savepoints(self.using)
+        self.entries = []
+        # (database, savepoint ids) -> marker reference
+        self.markers = {}
+
+    @staticmethod
+    def get_savepoints(using):
+        return tuple(transaction.get_connection(using).savepoint_ids)
+
+    def add(self, revision_model, using, revision):
+        savepoints = self.get_savepoints(using)
+        if (using, savepoints) not in self.markers:
+            self.markers[(using, savepoints)] = self.mark(using, savepoints)
+        self.entries.append((revision_model, using, revision, self.markers[(using, savepoints)]))
+
+    def mark(self, using, savepoints):
+        """
+        For savepoints opened within the batch, register a no-op on_commit
+        callback and keep only a weak reference to it. Django drops the
+        callbacks registered within a savepoint it rolls back, so the
+        reference is dead once one of these savepoints is rolled back.
+        """
+        if (using == self.using and savepoints == self.base_savepoints) or \
+                not transaction.get_connection(using).in_atomic_block:
+            return None
+
+        def marker():
+            pass
+        transaction.on_commit(marker, using=using)
+        return weakref.ref(marker)
+
+    def get_pending(self):
+        """(revision model, database, PendingRevision) of the revisions that weren't rolled back."""
+        return [(revision_model, using, revision) for revision_model, using, revision, marker in self.entries
+                if marker is None or marker() is not None]
+
+
+@contextmanager
+def revisions_batched(using=None):
+    """
+    Run the block in a transaction, buffering the revisions written by the
+    saves within it and inserting them in one statement as the block ends.
+    Nested blocks join the outermost one. The revisions of saves within a
+    savepoint that was rolled back are discarded.
+
+    Batching is opt-in: outside such a block each save inserts its revision
+    right away, within the caller's transaction.
+    """
+    if getattr(_batch, 'current', None) is not None:
+        yield
+        return
+
+    try:
+        with transaction.atomic(using=using):
+            _batch.current = RevisionBatch(using)
+            yield
+            batch, _batch.current = _batch.current, None
+            insert_pending_revisions(batch.get_pending())
+    finally:
+        _batch.current = None
+
+
+def insert_pending_revisions(pending):
+    """Insert (revision model, database, PendingRevision) entries, a statement per table."""
+    by_table = {}
+    for revision_model, using, revision in pending:
+        by_table.setdefault((revision_model, using), []).append(revision)
+    for (revision_model, using), revisions in by_table.items():
+        insert_revisions(revision_model, revisions, using=using)
+
+
+def insert_revisions(revision_model, pending, using='default'):
+    """
+    Insert PendingRevisions in one statement, numbering each after the
+    latest sequence of its object. An object's first revision holds
+    first_data. A later revision with data None is not written.
+    """
+    if not pending:
+        return {}
+
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    opts = revision_model._meta
+    table = qn(opts.db_table)
+    column = {name: qn(opts.get_field(name).column)
+              for name in ('id', 'object_id', 'sequence', 'action', 'revision_at', 'user', 'data')}
+    user_type = opts.get_field('user').db_type(connection)
+
+    now = timezone.now()
+    positions = {}
+    rows, params = [], []
+    for revision in pending:
+        position = positions[revision.object_id] = positions.get(revision.object_id, 0) + 1
+        rows.append(f'(%s::uuid, %s::uuid, %s, %s, %s::timestamptz, %s::{user_type}, %s::jsonb, %s::jsonb)')
+        params.extend([
+            uuid.uuid4(), revision.object_id, position, revision.action, now, revision.user_id,
+            None if revision.data is None else DjangoJSONEncoder().encode(revision.data),
+            DjangoJSONEncoder().encode(revision.first_data),
+        ])
+
+    sql = f'''
+        INSERT INTO {table} ({column['id']}, {column['object_id']}, {column['sequence']}, {column['action']},
+                             {column['revision_at']}, {column['user']}, {column['data']})
+        SELECT v.id, v.object_id, COALESCE(m.max_sequence, 0) + v.position, v.action, v.revision_at, v.user_id,
+               CASE WHEN m.max_sequence IS NULL AND v.position = 1 THEN v.first_data ELSE v.data END
+        FROM (VALUES {', '.join(rows)}) AS v(id, object_id, position, action, revision_at, user_id, data, first_data)
+        LEFT JOIN LATERAL (
+            SELECT MAX(r.{column['sequence']}) AS max_sequence FROM {table} r
+            WHERE r.{column['object_id']} = v.object_id
+        ) m ON true
+        WHERE (m.max_sequence IS NULL AND v.position = 1) OR v.data IS NOT NULL
+        RETURNING {column['object_id']}, {column['sequence']}
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        sequences = {}
+        for object_id, sequence in cursor.fetchall():
+            sequences[object_id] = max(sequence, sequences.get(object_id, 0))
+
+    for revision in pending:
+        if revision.instance is not None and revision.object_id in sequences:
+            revision.instance.revision_sequence = sequences[revision.object_id]
+    return sequences
+
+
 class Revision(object):
     manager_class = RevisionManager
     revision_adapter = RevisionAdapter
@@ -143,19 +324,13 @@ class Revision(object):
 
     def create_revision(self, instance, action, **kwargs):
         user = getattr(instance, 'revision_user', None)
-        manager = getattr(instance, self.manager_name)
+        revision_model = getattr(type(instance), self.manager_name).model
         adapter = self.revision_adapter(type(instance))
 
-        instance.revision_sequence = 0
-        if instance.id:
-            sequences = manager.all()
-            sequences = sequences.order_by('-sequence')
-            for sequence in sequences.values_list('sequence', flat=True):
-                instance.revision_sequence = sequence
-                break
-
-        if instance.revision_sequence == 0:
-            data = adapter.get_serialized_data(instance)
+        # An object's first revision holds all of its data, whatever the action.
+        first_data = adapter.get_serialized_data(instance)
+        if action == AC_ADDED:
+            data = first_data
         elif action == AC_DELETED:
             data = {}
         elif action == AC_RELATION_DELETED:
@@ -168,25 +343,25 @@ class Revision(object):
                 relation.id), 'relation_model': relation_model, 'related_query_name': related_query_name}
         else:
             data = adapter.get_serialized_data_diff(instance,
-                                                    instance.revision_original)
-            if not data:
-                return
-
-        with transaction.atomic():
-
-            o = manager.filter(object_id=instance.id).aggregate(
-                max_sequence=Max('sequence'))
-            max_sequence = o.get('max_sequence') or 0
-
-            revision = manager.create(
-                object_id=instance.id,
-                sequence=max_sequence + 1,
-                action=action,
-                user=user,
-                data=data
-            )
+                                                    instance.revision_original,
+                                                    obj_data=first_data)
+
+        revision = PendingRevision(instance=instance, object_id=instance.id, action=action,
+                                   user_id=getattr(user, 'pk', user),
+                                   data=data or None if action == AC_UPDATED else data,
+                                   first_data=first_data)
+
+        using = instance._state.db or 'default'
+        batch = getattr(_batch, 'current', None)
+        if batch is not None:
+            batch.add(revision_model, using, revision)
+        else:
+            insert_revisions(revision_model, [revision], using=using)
 
-        instance.revision_sequence = revision.sequence
+    def pre_save(self, instance, raw=False, **kwargs):
+        if not raw and not instance._state.adding:
+            # Read the stored data before it is overwritten.
+            getattr(instance, 'revision_original', None)
 
     def post_save(self, instance, created, **kwargs):
         try:
@@ -202,27 +377,23 @@ class Revision(object):
         self.create_revision(instance, AC_RELATION_DELETED,
                              relation=relation, **kwargs)
 
-    def post_init(self, instance, **kwargs):
-        instance.revision_sequence = 0
-        if instance.id:
-            adapter = RevisionAdapter(type(instance))
-            instance.revision_original = adapter.get_data_copy(instance)
-
     def finalize(self, sender, **kwargs):
         revision_model = self.create_revision_model(sender)
 
+        models.signals.pre_save.connect(
+            self.pre_save, sender=sender, weak=False)
         models.signals.post_save.connect(
             self.post_save, sender=sender, weak=False)
         models.signals.post_delete.connect(
             self.post_delete, sender=sender, weak=False)
-        models.signals.post_init.connect(
-            self.post_init, sender=sender, weak=False)
         relation_deleted.connect(
             self.relation_deleted, sender=sender, weak=False)
 
         descriptor = RevisionDescriptor(
             revision_model, self.manager_class, self.manager_name)
         setattr(sender, self.manager_name, descriptor)
+        sender.revision_sequence = 0
+        sender.revision_original = RevisionOriginal(self.revision_adapter)
 
     def get_table_fields(self, model):
         rel_name = '_%s_revision' % model._meta.object_name.lower()
@@ -273,6 +444,65 @@ class Revision(object):
         return type(name, (models.Model,), attrs)
 
 
+def update_returning_ids(queryset, **values):
+    """
+    Apply values to every row matched by queryset in a single
+    UPDATE ... RETURNING statement, bypassing save() and its signals.
+
+    :return: list of primary keys of the rows that were updated.
+    """
+    model = queryset.model
+    opts = model._meta
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+
+    subquery, subquery_params = queryset.values('pk').query.get_compiler(
+        queryset.db).as_sql()
+
+    assignments, params = [], []
+    for name, value in values.items():
+        field = opts.get_field(name)
+        assignments.append(f'{qn(field.column)} = %s')
+        params.append(field.get_db_prep_save(value, connection))
+
+    sql = (f'UPDATE {qn(opts.db_table)} SET {", ".join(assignments)} '
+           f'WHERE {qn(opts.pk.column)} IN ({subquery}) RETURNING {qn(opts.pk.column)}')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + list(subquery_params))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def bulk_create_revisions(model, data_by_id, action=AC_UPDATED, user=None, manager_name='revision'):
+    """
+    Write one revision per object in data_by_id ({object_id: data}) in a
+    single insert.
+
+    :return: {object_id: sequence} of the revisions written.
+    """
+    if not data_by_id:
+        return {}
+
+    manager = getattr(model, manager_name)
+    user_id = getattr(user, 'pk', user)
+    pending = [PendingRevision(instance=None, object_id=object_id, action=action, user_id=user_id,
+                               data=data, first_data=data)
+               for object_id, data in data_by_id.items()]
+    return insert_revisions(manager.model, pending, using=router.db_for_write(model))
+
+
+def bulk_update_with_revisions(queryset, user=None, **values):
+    """
+    Set values on every row matched by queryset, and record an 'updated'
+    revision for each changed row. Runs in its own transaction.
+
+    :return: list of primary keys of the rows that were updated.
+    """
+    with transaction.atomic(using=queryset.db):
+        ids = update_returning_ids(queryset, **values)
+        bulk_create_revisions(queryset.model, {pk: values for pk in ids}, user=user)
+    return ids
+
+
 class RevisionMixin(object):
     def save(self, *args, **kwargs):
         with transaction.atomic():
@@ -1,3 +1,93 @@
+from django.contrib.gis.geos import Point
+from django.db import transaction
 from django.test import TestCase
 
-# Create your tests here.
+from mapping.models import DisplayCategory, SpatialFeature, SpatialFeatureType
+from revision.manager import (AC_ADDED, AC_UPDATED, bulk_create_revisions,
+                              revisions_batched)
+
+
+class RevisionWriteTest(TestCase):
+
+    def setUp(self):
+        category = DisplayCategory.objects.create(name='Water')
+        self.feature_type = SpatialFeatureType.objects.create(
+            name='Water Point', display_category=category)
+
+    def create_feature(self, name='Borehole'):
+        return SpatialFeature.objects.create(
+            name=name, feature_type=self.feature_type, feature_geometry=Point(36.8, -1.3))
+
+    def test_sequence_follows_the_latest_revision(self):
+        feature = self.create_feature()
+        self.assertEqual(feature.revision_sequence, 1)
+
+        feature.name = 'Dam'
+        feature.save()
+        self.assertEqual(feature.revision_sequence, 2)
+
+        revisions = list(feature.revision.all().order_by('sequence'))
+        self.assertEqual([r.action for r in revisions], [AC_ADDED, AC_UPDATED])
+        self.assertEqual(revisions[1].data, {'name': 'Dam'})
+
+    def test_unchanged_save_writes_no_revision(self):
+        feature = SpatialFeature.objects.get(id=self.create_feature().id)
+        feature.save()
+        self.assertEqual(feature.revision.all().count(), 1)
+
+    def test_original_is_read_from_the_stored_row(self):
+        feature = self.create_feature()
+        SpatialFeature.objects.filter(id=feature.id).update(name='Spring')
+
+        feature = SpatialFeature.objects.get(id=feature.id)
+        feature.name = 'Borehole'
+        feature.save()
+        self.assertEqual(feature.revision.all().latest('sequence').data, {'name': 'Borehole'})
+
+    def test_batched_revisions_are_written_as_the_block_ends(self):
+        with revisions_batched():
+            first = self.create_feature('First')
+            second = self.create_feature('Second')
+            first.name = 'First, renamed'
+            first.save()
+            self.assertEqual(first.revision.all().count(), 0)
+
+        self.assertEqual(first.revision_sequence, 2)
+        self.assertEqual(second.revision_sequence, 1)
+        self.assertEqual(
+            list(first.revision.all().order_by('sequence').values_list('action', flat=True)),
+            [AC_ADDED, AC_UPDATED])
+        self.assertEqual(second.revision.all().count(), 1)
+
+    def test_batched_revisions_of_rolled_back_savepoint_are_discarded(self):
+        with revisions_batched():
+            kept = self.create_feature('Kept')
+            try:
+                with transaction.atomic():
+                    dropped = self.create_feature('Dropped')
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.assertEqual(kept.revision.all().count(), 1)
+        self.assertFalse(SpatialFeature.revision.filter(object_id=dropped.id).exists())
+
+    def test_batched_revisions_of_released_savepoint_are_kept(self):
+        with revisions_batched():
+            with transaction.atomic():
+                feature = self.create_feature('Kept')
+            feature.name = 'Kept, renamed'
+            feature.save()
+
+        self.assertEqual(
+            list(feature.revision.all().order_by('sequence').values_list('action', flat=True)),
+            [AC_ADDED, AC_UPDATED])
+
+    def test_created_feature_does_not_read_original(self):
+        feature = self.create_feature()
+        self.assertNotIn('revision_original', feature.__dict__)
+
+    def test_bulk_create_revisions(self):
+        feature = self.create_feature()
+        sequences = bulk_create_revisions(SpatialFeature, {feature.id: {'name': 'Well'}})
+        self.assertEqual(sequences, {feature.id: 2})
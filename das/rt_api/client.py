@@ -44,6 +44,15 @@ Bbox = collections.namedtuple('Bbox', BBOX_FIELDS)
 SID_SUBJECTS_TIMESTAMPS_KEY = 'sid-subject-timestamps-{}'
 SID_SESSION_TIMESTAMP_KEY = 'sid-session-timestamp-{}'
 
+# Bumped whenever a client changes its bbox, so realtime workers know to
+# rebuild their viewport index.
+VIEWPORT_VERSION_KEY = 'rt_api.viewport_version'
+
+# The extent of the last update broadcast for a subject or event, so the
+# sessions it moved away from still get that update.
+LAST_EXTENT_KEY = 'rt_api.last_extent.{}'
+LAST_EXTENT_TTL = 7 * 24 * 60 * 60
+
 
 def init_redis_storage():
     logger.info("Initializing redis storage")
@@ -81,6 +90,7 @@ def update_client(sid, bbox=None, event_filter=None, patrol_filter=None):
 
         update_values = {}
         if bbox:
+            bump_viewport_version()
             bbox_geom = MultiPolygon(Polygon.from_bbox(bbox))
             update_values['bbox'] = bbox_geom
         if event_filter:
@@ -95,6 +105,32 @@ def update_client(sid, bbox=None, event_filter=None, patrol_filter=None):
                 id=sid, defaults=update_values)
 
 
+def bump_viewport_version():
+    return redis_client.incr(VIEWPORT_VERSION_KEY)
+
+
+def get_viewport_version():
+    version = redis_client.get(VIEWPORT_VERSION_KEY)
+    return int(version) if version else 0
+
+
+def swap_last_extent(key, extent):
+    """
+    Record extent as the last one broadcast for key, and return the one
+    recorded before it. A None extent forgets key.
+    """
+    redis_key = LAST_EXTENT_KEY.format(key)
+    with redis_client.pipeline() as pipe:
+        if extent is None:
+            pipe.get(redis_key)
+            pipe.delete(redis_key)
+        else:
+            pipe.getset(redis_key, ','.join(str(v) for v in extent))
+            pipe.expire(redis_key, LAST_EXTENT_TTL)
+        previous = pipe.execute()[0]
+    return tuple(float(v) for v in previous.decode().split(',')) if previous else None
+
+
 def create_update_user_session(sid):
     defaults = {"time_range": DateTimeTZRange(
         lower=datetime.datetime.now(tz=pytz.utc))}
@@ -17,8 +17,10 @@ def start(realtime_server):
     def update_event_handler(data, message):
         logger.debug(
             'update_event_handler. data=%s, message=%s', data, message)
-        celery.app.send_task('rt_api.tasks.handle_update_event',
-                             args=(data['event_id'],))
+        # Bulk updates publish a single message with a list of ids.
+        for event_id in data.get('event_ids', None) or (data['event_id'],):
+            celery.app.send_task('rt_api.tasks.handle_update_event',
+                                 args=(event_id,))
 
     def delete_event_handler(data, message):
         logger.debug(
@@ -64,8 +66,10 @@ def start(realtime_server):
     def update_patrol_handler(data, message):
         logger.debug(
             'update_patrol_handler. data=%s, message=%s', data, message)
-        celery.app.send_task('rt_api.tasks.handle_update_patrol',
-                             args=(data['patrol_id'],))
+        # Bulk updates publish a single message with a list of ids.
+        for patrol_id in data.get('patrol_ids', None) or (data['patrol_id'],):
+            celery.app.send_task('rt_api.tasks.handle_update_patrol',
+                                 args=(patrol_id,))
 
     def delete_patrol_handler(data, message):
         logger.debug(
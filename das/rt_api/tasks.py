@@ -13,17 +13,19 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.request import Request
 
 from accounts.models.user import User
-from activity.models import Event, Patrol
+from activity.models import Event, EventGeometry, Patrol
 from activity.serializers import EventSerializer
 from activity.serializers.patrol_serializers import PatrolSerializer
 from activity.views import EventView, PatrolView
 from das_server import celery, pubsub
 from observations import servicesutils
-from observations.models import Announcement, Message, SocketClient
+from observations.models import (Announcement, Message, SocketClient,
+                                 SubjectStatus)
 from observations.serializers import AnnouncementSerializer, MessageSerializer
 from observations.utils import get_position, LOCATION, get_user_key
 from observations.views import ObservationsView, SubjectStatusView
 from rt_api import client
+from rt_api.viewports import extent_of, get_viewport_filter
 from rt_api.rest_api_interface.dummy_request import DummyRequest
 from utils.stats import update_gauge
 
@@ -74,6 +76,21 @@ def get_emit_data(**kwargs):
     return dict(emit_data)
 
 
+def get_event_extent(event_id):
+    geometries = list(Event.objects.filter(
+        id=event_id).values_list('location', flat=True))
+    geometries.extend(EventGeometry.objects.filter(
+        event_id=event_id).values_list('geometry', flat=True))
+    return extent_of(geometries)
+
+
+def get_subject_extent(subject_id):
+    # Include every delayed view so sessions that see the subject with a
+    # delay still get updates for the position they are shown.
+    return extent_of(SubjectStatus.objects.filter(
+        subject_id=subject_id).values_list('location', flat=True))
+
+
 def _event_handler(event_id, type_):
     try:
         logger.debug("Processing type=%s on event=%s", type_, event_id)
@@ -82,7 +99,18 @@ def _event_handler(event_id, type_):
         user_sids_map = get_username_sids_map()
         logger.debug("user_sids_map: %s", user_sids_map)
 
+        # Deletes are cheap to emit and must reach every session.
+        event_extent = get_event_extent(
+            event_id) if type_ != "delete_event" else None
+        # Sessions the event moved out of still get its last update.
+        previous_extent = client.swap_last_extent(f'event.{event_id}', event_extent)
+        viewport_filter = get_viewport_filter(event_extent, previous_extent)
+
         for username, user_sids in user_sids_map.items():
+            user_sids = viewport_filter(user_sids)
+            if not user_sids:
+                continue
+
             user = get_sid_user(username, user_sids)
             if not user:
                 continue
@@ -260,7 +288,17 @@ def _subjectstatus_update_handler(subject_id):
         user_sids_map = get_username_sids_map()
         logger.debug('user_sids_map: %s', user_sids_map)
 
+        subject_extent = get_subject_extent(subject_id)
+        # Sessions the subject moved out of still get its final position.
+        previous_extent = client.swap_last_extent(f'subject.{subject_id}', subject_extent)
+        viewport_filter = get_viewport_filter(subject_extent, previous_extent)
+
         for username, user_sids in user_sids_map.items():
+            user_sids = viewport_filter(user_sids)
+            if not user_sids:
+                logger.debug('Subject outside viewports. username=%s, subject_id=%s', username, subject_id)
+                continue
+
             try:
                 user = get_sid_user(username, user_sids)
                 if not user:
@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from rt_api import viewports
+from rt_api.client import Bbox
+from rt_api.viewports import ViewportIndex
+
+
+class ViewportIndexTestCase(SimpleTestCase):
+    def setUp(self):
+        self.index = ViewportIndex({
+            'mara': Bbox(34.8, -1.8, 35.5, -1.2),
+            'tsavo': Bbox(38.0, -3.5, 39.2, -2.3),
+            'world': Bbox(-180, -90, 180, 90),
+            'antimeridian': Bbox(170, -20, -170, 20),
+        })
+
+    def test_point_matches_only_intersecting_viewports(self):
+        matches = self.index.query((35.0, -1.5, 35.0, -1.5))
+        self.assertEqual(matches, {'mara', 'world', 'antimeridian'})
+
+    def test_extent_spanning_two_viewports(self):
+        matches = self.index.query((35.0, -3.0, 38.5, -1.5))
+        self.assertIn('mara', matches)
+        self.assertIn('tsavo', matches)
+
+    def test_filter_sids_keeps_sessions_without_bbox(self):
+        sids = {'mara', 'tsavo', 'no-bbox'}
+        self.assertEqual(self.index.filter_sids(sids, (38.5, -3.0, 38.5, -3.0)),
+                         {'tsavo', 'no-bbox'})
+
+    def test_filter_sids_without_extent_matches_all(self):
+        sids = {'mara', 'tsavo'}
+        self.assertEqual(self.index.filter_sids(sids, None), sids)
+
+    def test_filter_sids_includes_previous_extent(self):
+        sids = {'mara', 'tsavo'}
+        self.assertEqual(self.index.filter_sids(sids, (38.5, -3.0, 38.5, -3.0),
+                                                previous_extent=(35.0, -1.5, 35.0, -1.5)),
+                         sids)
+
+    def test_margin_pads_viewport(self):
+        index = ViewportIndex({'mara': Bbox(34.8, -1.8, 35.5, -1.2)}, margin=0.1)
+        self.assertEqual(index.query((35.55, -1.5, 35.55, -1.5)), {'mara'})
+
+
+class ViewportIndexCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        viewports._index = None
+        viewports._index_version = None
+
+    @override_settings(REALTIME_VIEWPORT_MARGIN=0.0)
+    @mock.patch('rt_api.viewports.client')
+    def test_index_rebuilt_only_when_version_changes(self, mock_client):
+        mock_client.Bbox = Bbox
+        mock_client.get_viewport_version.return_value = 1
+        mock_client.get_all_connections_list_decoded.return_value = {
+            'sid-1': {'sid': 'sid-1', 'username': 'admin',
+                      'bbox': {'west': 34.8, 'south': -1.8, 'east': 35.5, 'north': -1.2}},
+            'sid-2': {'sid': 'sid-2', 'username': 'admin', 'bbox': None},
+        }
+
+        index = viewports.get_viewport_index()
+        self.assertIn('sid-1', index)
+        self.assertNotIn('sid-2', index)
+        self.assertIs(viewports.get_viewport_index(), index)
+        self.assertEqual(mock_client.get_all_connections_list_decoded.call_count, 1)
+
+        mock_client.get_viewport_version.return_value = 2
+        self.assertIsNot(viewports.get_viewport_index(), index)
+        self.assertEqual(mock_client.get_all_connections_list_decoded.call_count, 2)
+
+    @override_settings(REALTIME_VIEWPORT_MARGIN=0.0)
+    @mock.patch('rt_api.viewports.client')
+    def test_viewport_filter_loads_index_once(self, mock_client):
+        mock_client.Bbox = Bbox
+        mock_client.get_viewport_version.return_value = 1
+        mock_client.get_all_connections_list_decoded.return_value = {
+            'sid-1': {'sid': 'sid-1', 'username': 'admin',
+                      'bbox': {'west': 34.8, 'south': -1.8, 'east': 35.5, 'north': -1.2}},
+            'sid-2': {'sid': 'sid-2', 'username': 'other',
+                      'bbox': {'west': 38.0, 'south': -3.5, 'east': 39.2, 'north': -2.3}},
+        }
+
+        viewport_filter = viewports.get_viewport_filter((35.0, -1.5, 35.0, -1.5))
+        self.assertEqual(viewport_filter({'sid-1'}), {'sid-1'})
+        self.assertEqual(viewport_filter({'sid-2'}), set())
+        self.assertEqual(mock_client.get_viewport_version.call_count, 1)
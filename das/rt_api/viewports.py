@@ -0,0 +1,158 @@
+import logging
+import math
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+
+from rt_api import client
+
+logger = logging.getLogger(__name__)
+
+# Size (in degrees) of a grid cell in the viewport index.
+DEFAULT_CELL_SIZE = 0.5
+
+# A viewport covering more cells than this is treated as "sees everything"
+# rather than being spread across the grid.
+MAX_CELLS_PER_VIEWPORT = 4096
+
+
+class ViewportIndex:
+    """
+    A uniform lon/lat grid of realtime client viewports (bbox).
+
+    Sessions that have not sent a bbox are not in the index and are
+    never filtered out.
+    """
+
+    def __init__(self, viewports=None, cell_size=DEFAULT_CELL_SIZE, margin=0.0):
+        self.cell_size = cell_size
+        self.margin = margin
+        self._cells = defaultdict(set)
+        self._unbounded = set()
+        self._bboxes = {}
+        for sid, bbox in (viewports or {}).items():
+            self.add(sid, bbox)
+
+    def __len__(self):
+        return len(self._bboxes)
+
+    def __contains__(self, sid):
+        return sid in self._bboxes
+
+    def _cell(self, value):
+        return int(math.floor(value / self.cell_size))
+
+    def add(self, sid, bbox):
+        west, south, east, north = (float(v) for v in bbox)
+        west, south = west - self.margin, south - self.margin
+        east, north = east + self.margin, north + self.margin
+        self._bboxes[sid] = (west, south, east, north)
+
+        # A bbox crossing the antimeridian (west > east) or one that is
+        # simply too large goes into the always-matching set.
+        if west > east or south > north:
+            self._unbounded.add(sid)
+            return
+
+        x_range = range(self._cell(west), self._cell(east) + 1)
+        y_range = range(self._cell(south), self._cell(north) + 1)
+        if len(x_range) * len(y_range) > MAX_CELLS_PER_VIEWPORT:
+            self._unbounded.add(sid)
+            return
+
+        for x in x_range:
+            for y in y_range:
+                self._cells[(x, y)].add(sid)
+
+    def query(self, extent):
+        """
+        Return the sids whose viewport intersects extent, a
+        (west, south, east, north) tuple.
+        """
+        west, south, east, north = extent
+        candidates = set(self._unbounded)
+        for x in range(self._cell(west), self._cell(east) + 1):
+            for y in range(self._cell(south), self._cell(north) + 1):
+                candidates.update(self._cells.get((x, y), ()))
+
+        matches = set()
+        for sid in candidates:
+            if sid in self._unbounded:
+                matches.add(sid)
+                continue
+            b_west, b_south, b_east, b_north = self._bboxes[sid]
+            if west <= b_east and east >= b_west and south <= b_north and north >= b_south:
+                matches.add(sid)
+        return matches
+
+    def filter_sids(self, sids, extent, previous_extent=None):
+        """
+        Reduce sids to the ones that should receive an update located
+        within extent, or last located within previous_extent. A None
+        extent (no geometry) matches every sid.
+        """
+        if extent is None:
+            return set(sids)
+        matches = self.query(extent)
+        if previous_extent is not None:
+            matches |= self.query(previous_extent)
+        return {sid for sid in sids if sid not in self._bboxes or sid in matches}
+
+
+_index = None
+_index_version = None
+
+
+def build_viewport_index():
+    viewports = {}
+    for sid, session_data in client.get_all_connections_list_decoded().items():
+        bbox = session_data.get('bbox')
+        if not bbox:
+            continue
+        try:
+            viewports[sid] = client.Bbox(**bbox)
+        except TypeError:
+            logger.warning('Ignoring malformed bbox for sid=%s, bbox=%s', sid, bbox)
+
+    return ViewportIndex(viewports,
+                         cell_size=getattr(settings, 'REALTIME_VIEWPORT_CELL_SIZE', DEFAULT_CELL_SIZE),
+                         margin=getattr(settings, 'REALTIME_VIEWPORT_MARGIN', 0.0))
+
+
+def get_viewport_index():
+    """
+    Return the worker's viewport index, rebuilding it only when a client
+    has changed its bbox since the last build.
+    """
+    global _index, _index_version
+
+    version = client.get_viewport_version()
+    if _index is None or version != _index_version:
+        _index = build_viewport_index()
+        _index_version = version
+        logger.debug('Rebuilt viewport index. version=%s, viewports=%s', version, len(_index))
+    return _index
+
+
+def extent_of(geometries):
+    """
+    Return the combined (west, south, east, north) extent of the given
+    GEOS geometries, or None if there are none.
+    """
+    extents = [g.extent for g in geometries if g is not None and not g.empty]
+    if not extents:
+        return None
+    return (min(e[0] for e in extents), min(e[1] for e in extents),
+            max(e[2] for e in extents), max(e[3] for e in extents))
+
+
+def get_viewport_filter(extent, previous_extent=None):
+    """
+    Return a function reducing a set of sids as ViewportIndex.filter_sids
+    does. The index is loaded once, so build one filter per message and
+    apply it to each user's sids.
+    """
+    if not getattr(settings, 'REALTIME_VIEWPORT_FILTERING', True):
+        return set
+    return partial(get_viewport_index().filter_sids, extent=extent, previous_extent=previous_extent)
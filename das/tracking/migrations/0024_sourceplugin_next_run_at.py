@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0023_use_models_JSONField_instead_postgres_fields_JSONField'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourceplugin',
+            name='next_run_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True,
+                                       verbose_name='Timestamp for when this plugin is next due to execute.'),
+        ),
+    ]
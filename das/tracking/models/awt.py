@@ -19,7 +19,7 @@ from django.conf import settings
 
 import utils.redis as redis_utils
 
-from tracking.models.plugin_base import Obs, TrackingPlugin, SourcePlugin, DasPluginSourceRetryError
+from tracking.models.plugin_base import Obs, TrackingPlugin, SourcePlugin, DasPluginSourceRetryError, get_http_session
 from observations.models import Source, Subject, SubjectSource
 from .utils import to_float
 
@@ -89,8 +89,9 @@ class AwtClient(object):
             }
 
     def __init__(self, host=None, username=None, password=None,
-                 subscription_token=None, enable_history=False, enable_replay=False):
+                 subscription_token=None, enable_history=False, enable_replay=False, session=None):
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.session = session or requests.Session()
         self.host = host
         self.username = username
         self.password = password
@@ -217,7 +218,7 @@ class AwtClient(object):
                 self.set_use_policy_api(api_type)
                 self.logger.info(
                     f'AWTPlugin API call {url} account {self.username}')
-                response = requests.post(
+                response = self.session.post(
                     url=url, headers=headers, data=payload)
             except requests.ConnectionError as e:
                 description = 'Connection Error for {url}'.format(url=url)
@@ -292,6 +293,10 @@ class AwtClient(object):
 
         return api_type, key
 
+    def uses_live_api(self, start_time):
+        api_type, _ = self.api_type_for_dates({'start_time': start_time.timestamp()})
+        return api_type == self.LIVE_API
+
     def fetch_data(self, params=None):
         """
         :param params:
@@ -409,6 +414,8 @@ class AwtPlugin(TrackingPlugin):
         SourcePlugin, content_type_field='plugin_type', object_id_field='plugin_id',
         related_query_name=source_plugin_reverse_relation, related_name='+')
 
+    supports_fetch_many = True
+
     def _transform_to_observation(self, source, track_data):
         # Convert track_data into Observation data format
         if track_data['lat'] and track_data['lon']:
@@ -473,7 +480,8 @@ class AwtPlugin(TrackingPlugin):
                            password=self.password,
                            subscription_token=self.subscription_token,
                            enable_replay=enable_replay,
-                           enable_history=enable_history)
+                           enable_history=enable_history,
+                           session=get_http_session(self))
         if use_policy_backoff_threshold:
             client.use_policy_backoff_threshold = use_policy_backoff_threshold
         return client
@@ -486,14 +494,7 @@ class AwtPlugin(TrackingPlugin):
         end_date = datetime.now(tz=timezone.utc)
         # create cursor_data
         self.cursor_data = copy.copy(cursor_data) if cursor_data else {}
-        try:
-            start_date = (parse(self.cursor_data['latest_timestamp']) -
-                          COLLAR_REACHBACK_OFFSET)
-            if not start_date.tzinfo:
-                start_date = start_date.replace(tzinfo=timezone.utc)
-        except Exception as e:
-            start_date = datetime.now(
-                tz=timezone.utc) - self.DEFAULT_START_OFFSET
+        start_date = self._get_start_date(self.cursor_data)
 
         # Set tag value(manufacture id) if not in additional_data
         if additional_data:
@@ -526,6 +527,76 @@ class AwtPlugin(TrackingPlugin):
         if latest_timestamp:  # Update cursor data.
             self.cursor_data['latest_timestamp'] = latest_timestamp.isoformat()
 
+    def _get_start_date(self, cursor_data):
+        try:
+            start_date = (parse(cursor_data['latest_timestamp']) -
+                          self.COLLAR_REACHBACK_OFFSET)
+            if not start_date.tzinfo:
+                start_date = start_date.replace(tzinfo=timezone.utc)
+        except Exception as e:
+            start_date = datetime.now(
+                tz=timezone.utc) - self.DEFAULT_START_OFFSET
+        return start_date
+
+    def fetch_many(self, source_plugins, additional_data={}):
+        '''
+        The live API returns the latest data of every tag on the account, so
+        the tags it covers are served by a single call and demultiplexed by
+        tag_id. Tags that need the replay or history API are fetched one at
+        a time.
+        '''
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.cursor_data_by_source = {}
+        self.failed_source_plugin_ids = set()
+
+        client = self._get_client(additional_data=additional_data)
+        live_by_tag, others = {}, []
+        for source_plugin in source_plugins:
+            start_date = self._get_start_date(source_plugin.cursor_data or {})
+            try:
+                tag_id = int(source_plugin.source.manufacturer_id)
+            except ValueError:
+                self.logger.warning('Invalid AWT tag id %s', source_plugin.source.manufacturer_id)
+                continue
+            if client.uses_live_api(start_date):
+                live_by_tag[tag_id] = source_plugin
+            else:
+                others.append(source_plugin)
+
+        latest_timestamps = {}
+        if live_by_tag:
+            try:
+                for observation in client.fetch_data({}):
+                    source_plugin = live_by_tag.get(observation.get('tag_id'))
+                    if not source_plugin:
+                        continue
+                    fix_time = datetime.fromtimestamp(
+                        observation.get('timestamp'), tz=timezone.utc)
+                    obs = self._transform_to_observation(source_plugin.source, observation)
+                    if obs:
+                        yield source_plugin, obs
+
+                    latest_timestamp = latest_timestamps.get(source_plugin.id)
+                    latest_timestamps[source_plugin.id] = (max(latest_timestamp, fix_time) if
+                                                           latest_timestamp else fix_time)
+            except DasPluginSourceRetryError:
+                raise
+            except Exception:
+                # The live call covers all these tags, so they fail together.
+                self.logger.exception('Fetching live data for %d tags', len(live_by_tag))
+                self.failed_source_plugin_ids.update(sp.id for sp in live_by_tag.values())
+                live_by_tag = {}
+
+        for source_plugin in live_by_tag.values():
+            cursor_data = copy.copy(source_plugin.cursor_data) if source_plugin.cursor_data else {}
+            if source_plugin.id in latest_timestamps:
+                cursor_data['latest_timestamp'] = latest_timestamps[source_plugin.id].isoformat()
+            self.cursor_data_by_source[source_plugin.id] = cursor_data
+
+        yield from self._fetch_each(
+            others, lambda sp: self.fetch(sp.source, sp.cursor_data,
+                                          additional_data=copy.copy(additional_data)))
+
     def _maintenance(self):
         self._sync_unit_info()
 
@@ -101,8 +101,8 @@ class DemoSourcePlugin(TrackingPlugin):
         SourcePlugin, content_type_field='plugin_type', object_id_field='plugin_id',
         related_query_name=source_plugin_reverse_relation, related_name='+')
 
-    def should_run(self, source_plugin):
-        return True
+    def get_next_run_at(self, source_plugin, now=None):
+        return now or datetime.datetime.now(tz=pytz.utc)
 
     def fetch(self, source, cursor_data=None):
 
@@ -133,24 +133,20 @@ class InreachPlugin(TrackingPlugin):
         verbose_name = "inReach Professional plugin"
         verbose_name_plural = "inReach Professional plugins"
 
-    def should_run(self, source_plugin):
+    def get_next_run_at(self, source_plugin, now=None):
+        now = now or datetime.datetime.now(tz=pytz.UTC)
 
-        # Don't bother running now if less than 20 minutes has passed since the
-        # latest fix.
+        # Don't bother running until DEFAULT_REPORT_INTERVAL has passed since
+        # the latest fix.
         try:
             latest_timestamp = source_plugin.cursor_data.get(
                 'latest_timestamp')
             if not latest_timestamp:
-                return True
-            latest_timestamp = parse_date(latest_timestamp)
+                return now
+            return parse_date(latest_timestamp) + self.DEFAULT_REPORT_INTERVAL
 
-            if (datetime.now(tz=pytz.UTC) - self.DEFAULT_REPORT_INTERVAL) > latest_timestamp:
-                return True
-
-        except Exception as e:
-            return True
-        else:
-            return False
+        except Exception:
+            return now
 
     def fetch(self, source, cursor_data=None):
 
@@ -1,10 +1,10 @@
-import json
 import logging
 import uuid
 from datetime import datetime, timedelta
 from typing import NamedTuple
 
 import pytz
+import requests
 from dateutil.parser import parse as parse_date
 
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -56,6 +56,21 @@ class DasPluginSourceRetryError(DasPluginException):
 
 logger = logging.getLogger(__name__)
 
+# (plugin label, plugin id) -> requests.Session
+_http_sessions = {}
+
+
+def get_http_session(plugin):
+    '''
+    A requests.Session per plugin account, so connections to the vendor are
+    pooled across the source plugins of the account and across runs.
+    '''
+    key = (plugin._meta.label_lower, plugin.pk)
+    session = _http_sessions.get(key)
+    if session is None:
+        session = _http_sessions[key] = requests.Session()
+    return session
+
 
 class SourcePluginResult(object):
     count = 0
@@ -111,6 +126,10 @@ class SourcePlugin(TimestampedModel):
     # last_run: datetime.min implies it hasn't ever been executed.
     last_run = models.DateTimeField(default=pytz.utc.localize(datetime(2000, 1, 1)),
                                     verbose_name='Timestamp for when this plugin last executed.')
+
+    # null implies it is due now.
+    next_run_at = models.DateTimeField(null=True, blank=True, db_index=True,
+                                       verbose_name='Timestamp for when this plugin is next due to execute.')
     plugins_to_validate_location = ['awtplugin', 'skygisticssatelliteplugin']
 
     def execute(self, target=None):
@@ -137,6 +156,7 @@ class SourcePlugin(TimestampedModel):
 
             self.last_run = pytz.utc.localize(datetime.utcnow())
             self.cursor_data = self.plugin.cursor_data
+            self.next_run_at = self.get_next_run_at(self.last_run)
             self.save()
 
             if accumulator and accumulator.get('created', 0) > 0:
@@ -163,6 +183,20 @@ class SourcePlugin(TimestampedModel):
         # return self.plugin.should_run(self) if hasattr(self.plugin,
         # 'should_run') else True
 
+    def get_next_run_at(self, now=None):
+        now = now or pytz.utc.localize(datetime.utcnow())
+        if hasattr(self.plugin, 'get_next_run_at'):
+            return self.plugin.get_next_run_at(self, now=now)
+        return now
+
+    def defer(self, delay):
+        '''
+        Push back the next run, for a source plugin that failed or was asked
+        to retry later.
+        '''
+        self.next_run_at = pytz.utc.localize(datetime.utcnow()) + delay
+        SourcePlugin.objects.filter(id=self.id).update(next_run_at=self.next_run_at)
+
     def validate_obs_location(self, observation):
         '''
         Flags observations that are at 180 x 90 as excluded_automatically.
@@ -207,48 +241,119 @@ class TrackingPlugin(TimestampedModel):
 
     source_plugin_reverse_relation = None
 
+    DEFAULT_REPORT_INTERVAL = timedelta(minutes=7)
+
     @property
     def run_source_plugins(self):
         return True
 
     def should_run(self, source_plugin):
-
         now = pytz.utc.localize(datetime.utcnow())
+        next_run_at = self.get_next_run_at(source_plugin, now=now)
+        logger.debug('Source plugin %s for %s is next due at %s.', source_plugin.id, self, next_run_at)
+        return next_run_at <= now
 
-        # Don't bother running now if less than one hour has passed since the
-        # latest fix.
+    def get_next_run_at(self, source_plugin, now=None):
+        '''
+        When source_plugin is next due: DEFAULT_REPORT_INTERVAL after its
+        latest fix, or 24 hours after it if no data has been seen for over
+        30 days.
+        '''
+        now = now or pytz.utc.localize(datetime.utcnow())
         try:
             latest_timestamp = source_plugin.cursor_data.get(
                 'latest_timestamp')
-            latest_timestamp = parse_date(
-                latest_timestamp) if latest_timestamp else pytz.utc.localize(datetime.min)
+            if not latest_timestamp:
+                return now
+            latest_timestamp = parse_date(latest_timestamp)
 
-            # If we haven't seen data from over 30 days, then use 24 hours as
-            # polling interval.
             if now - latest_timestamp > timedelta(days=30):
                 wait_interval = timedelta(hours=24)
             else:
                 wait_interval = self.DEFAULT_REPORT_INTERVAL
-
-            should_run_message = {'plugin': str(self),
-                                  'source': str(source_plugin.source),
-                                  'wait_interval': str(wait_interval),
-                                  'time_since_last': str(now - latest_timestamp),
-                                  'should_run': (now - wait_interval) >= latest_timestamp
-                                  }
-            logger.info(json.dumps(should_run_message))
-
-            if (now - wait_interval) >= latest_timestamp:
-                return True
+            return latest_timestamp + wait_interval
 
         except Exception:
             logger.exception(
-                'Failed to determine whether source-plugin %s should run.', source_plugin)
+                'Failed to determine when source-plugin %s should run.', source_plugin)
+            return source_plugin.last_run + self.DEFAULT_REPORT_INTERVAL
 
-            if (now - source_plugin.last_run) > self.DEFAULT_REPORT_INTERVAL:
-                return True
+    # Whether the source plugins of an account are run together, through
+    # fetch_many, rather than one at a time.
+    supports_fetch_many = False
 
-        return False
+    def fetch_many(self, source_plugins):
+        '''
+        Fetch for several source plugins of this account at once, yielding
+        (source_plugin, observation). Each source plugin's new cursor is left
+        in self.cursor_data_by_source[source_plugin.id], and the ids of those
+        that failed in self.failed_source_plugin_ids.
+
+        By default fetch each one in turn. A plugin whose vendor API can
+        return several collars in one call overrides this.
+        '''
+        self.cursor_data_by_source = {}
+        self.failed_source_plugin_ids = set()
+        yield from self._fetch_each(
+            source_plugins, lambda sp: self.fetch(sp.source, sp.cursor_data))
+
+    def _fetch_each(self, source_plugins, fetch):
+        '''
+        Run fetch(source_plugin) for each of source_plugins in turn, so one
+        failing collar doesn't stop the rest of the account's batch. A
+        failing source plugin keeps its cursor and is recorded in
+        self.failed_source_plugin_ids.
+        '''
+        for source_plugin in source_plugins:
+            try:
+                for observation in fetch(source_plugin):
+                    yield source_plugin, observation
+            except DasPluginSourceRetryError:
+                raise
+            except Exception:
+                logger.exception('Fetching for source plugin %s', source_plugin)
+                self.failed_source_plugin_ids.add(source_plugin.id)
+            else:
+                self.cursor_data_by_source[source_plugin.id] = self.cursor_data
+
+    def execute_source_plugins(self, source_plugins, target=None):
+        '''
+        Run source_plugins of this account together through fetch_many.
+        :return: number of observations created.
+        '''
+        source_plugins = list(source_plugins)
+        created_source_ids = set()
+        accumulator = None
+        with target or DasDefaultTarget() as t:
+            for source_plugin, observation in self.fetch_many(source_plugins):
+                if self._meta.model_name in SourcePlugin.plugins_to_validate_location:
+                    observation = source_plugin.validate_obs_location(observation)
+                created = accumulator.get('created', 0) if accumulator else 0
+                accumulator = t.send(observation)
+                if accumulator and accumulator.get('created', 0) > created:
+                    created_source_ids.add(source_plugin.source_id)
+
+        now = pytz.utc.localize(datetime.utcnow())
+        cursor_data_by_source = getattr(self, 'cursor_data_by_source', {})
+        failed_source_plugin_ids = getattr(self, 'failed_source_plugin_ids', set())
+        for source_plugin in source_plugins:
+            source_plugin.last_run = now
+            if source_plugin.id in failed_source_plugin_ids:
+                # Back off for a report interval rather than failing again every tick.
+                source_plugin.next_run_at = now + self.DEFAULT_REPORT_INTERVAL
+            else:
+                source_plugin.cursor_data = cursor_data_by_source.get(source_plugin.id, source_plugin.cursor_data)
+                source_plugin.next_run_at = self.get_next_run_at(source_plugin, now=now)
+            source_plugin.save(update_fields=['last_run', 'cursor_data', 'next_run_at', 'updated_at'])
+
+        for source_id in created_source_ids:
+            notify_new_tracks(str(source_id))
+
+        stats_count = accumulator.get('created', 0) if accumulator else 0
+        stats.increment("tracking", tags=[
+            f"name:{self._meta.label_lower}",
+            "state:created"], value=stats_count)
+        return stats_count
 
     def execute(self):
         '''
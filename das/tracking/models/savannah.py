@@ -15,7 +15,8 @@ from django.utils.translation import gettext_lazy as _
 
 from observations.models import Observation
 from tracking.models.plugin_base import (DasPluginFetchError, Obs,
-                                         SourcePlugin, TrackingPlugin)
+                                         SourcePlugin, TrackingPlugin,
+                                         get_http_session)
 
 
 class STObservation(NamedTuple):
@@ -71,13 +72,14 @@ REQUEST_TO_URL = {
 class SavannaClient(object):
     logger = logging.getLogger(__name__)
 
-    def __init__(self, host=None, username=None, password=None):
+    def __init__(self, host=None, username=None, password=None, session=None):
 
         self.logger = SavannaClient.logger
 
         self.username = username
         self.password = password
         self.host = host
+        self.session = session or requests.Session()
 
     @staticmethod
     def str2date(d, replace_tzinfo=pytz.utc):
@@ -88,7 +90,7 @@ class SavannaClient(object):
         """ Make request to savannah api with multiple request types """
         payload = dict(uid=self.username, pwd=self.password,
                        request=request, collar=collar_id, record_index=record_index)
-        return requests.post(self.host + REQUEST_TO_URL[request], data=payload)
+        return self.session.post(self.host + REQUEST_TO_URL[request], data=payload)
 
     def select_data(self, collar_id, record):
         """ Select and order data received from savannah api """
@@ -209,6 +211,10 @@ class SavannahPlugin(TrackingPlugin):
         SourcePlugin, content_type_field='plugin_type', object_id_field='plugin_id',
         related_query_name=source_plugin_reverse_relation, related_name='+')
 
+    # The API serves one collar per request, so fetch_many requests the
+    # collars in turn over the account's pooled session.
+    supports_fetch_many = True
+
     def fetch(self, source, cursor_data=None, dry_run=False):
 
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -218,7 +224,8 @@ class SavannahPlugin(TrackingPlugin):
 
         client = SavannaClient(username=self.service_username,
                                password=self.service_password,
-                               host=self.service_api_host)
+                               host=self.service_api_host,
+                               session=get_http_session(self))
 
         try:
             st = parse_date(self.cursor_data['latest_timestamp'])
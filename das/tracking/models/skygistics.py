@@ -17,7 +17,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
 from django.contrib.contenttypes.fields import GenericRelation
 
-from tracking.models.plugin_base import Obs, TrackingPlugin, DasPluginFetchError, SourcePlugin
+from tracking.models.plugin_base import Obs, TrackingPlugin, DasPluginFetchError, SourcePlugin, get_http_session
 from tracking.models import SourcePlugin
 from observations.models import Source, Subject, SubjectSource
 
@@ -50,10 +50,11 @@ class SkygisticsLoginError(Exception):
 
 
 class SkygisticsClient:
-    def __init__(self, username=None, password=None, service_url='http://skyq1.skygistics.com'):
+    def __init__(self, username=None, password=None, service_url='http://skyq1.skygistics.com', session=None):
         self.username = username
         self.password = password
         self.service_url = service_url
+        self.session = session or requests.Session()
 
         # this is mildly ugly:  skygistics returns '0' for a failed login
         #   but a session_id for success and session_ids may contain hyphens so the session_id must
@@ -89,12 +90,12 @@ def str2date(d, default_tzinfo=pytz.UTC):
 SKYGISTICS_SERVICE_TIMEZONE = pytz.timezone('Africa/Johannesburg')
 
 
-def get_client(username=None, password=None, service_url=None):
+def get_client(username=None, password=None, service_url=None, session=None):
     sq_class = SkygisticsQ1Client
     if service_url and 'skyq3' in service_url:
         sq_class = SkygisticsQ3Client
     return sq_class(username=username, password=password,
-                    service_url=service_url)
+                    service_url=service_url, session=session)
 
 
 class Company(NamedTuple):
@@ -199,11 +200,11 @@ class SkygisticsQ3Client(SkygisticsClient):
     user_agent = 'Mozilla/4.0 (compatible; MSIE 6.0; MS Web Services Client Protocol 4.0.30319.42000)'
     replay_page_limit = 100
 
-    def __init__(self, username=None, password=None, service_url=None):
+    def __init__(self, username=None, password=None, service_url=None, session=None):
         if not service_url:
             service_url = self.default_url
 
-        super().__init__(username=username, password=password, service_url=service_url)
+        super().__init__(username=username, password=password, service_url=service_url, session=session)
 
     def _is_logged_in(self):
         if self.company and self.company.company_id:
@@ -410,7 +411,7 @@ class SkygisticsQ3Client(SkygisticsClient):
         url = urllib.parse.urljoin(self.service_url, self.server_path)
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 url, data=envelope, headers=headers, timeout=(30, 60))
             if response.status_code != 200:
                 fault = self._get_fault(response.text)
@@ -627,7 +628,7 @@ class SkygisticsQ1Client(SkygisticsClient):
     def _get_text(self, url, query):
         response_text = None
         try:
-            response = requests.get(url, query, timeout=5.0)
+            response = self.session.get(url, query, timeout=5.0)
             # todo:  sad API, it returns a 500 if any param is bad or missing.
             #   check status code and do better
             if response.status_code != 200:
@@ -865,17 +866,36 @@ class SkygisticsSatellitePlugin(TrackingPlugin):
         related_query_name=source_plugin_reverse_relation, related_name='+')
 
 
+    # The API serves one unit per replay request, so fetch_many logs in once
+    # and requests the units in turn.
+    supports_fetch_many = True
+
     def fetch(self, source, cursor_data=None):
 
         self.logger = logging.getLogger(self.__class__.__name__)
 
-        # create cursor_data
-        self.cursor_data = copy.copy(cursor_data) if cursor_data else {}
-
         client = self._get_client()
 
         client.begin_session()
 
+        yield from self._fetch_with_client(client, source, cursor_data)
+
+    def fetch_many(self, source_plugins):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.cursor_data_by_source = {}
+        self.failed_source_plugin_ids = set()
+
+        client = self._get_client()
+        client.begin_session()
+
+        yield from self._fetch_each(
+            source_plugins, lambda sp: self._fetch_with_client(client, sp.source, sp.cursor_data))
+
+    def _fetch_with_client(self, client, source, cursor_data=None):
+
+        # create cursor_data
+        self.cursor_data = copy.copy(cursor_data) if cursor_data else {}
+
         try:
             # Given a latest-timestamp, reach back another 12-hours to fill in
             # any gaps.
@@ -935,7 +955,8 @@ class SkygisticsSatellitePlugin(TrackingPlugin):
     def _get_client(self):
         return get_client(username=self.service_username,
                           password=self.service_password,
-                          service_url=self.service_api_url)
+                          service_url=self.service_api_url,
+                          session=get_http_session(self))
 
     def _sync_unit_info(self):
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -1,6 +1,12 @@
 import logging
+from datetime import timedelta
+
 from celery_once import QueueOnce
 from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from das_server import celery
 from tracking.models import *
 from tracking.models.plugin_base import DasPluginSourceRetryError
@@ -9,6 +15,12 @@ logger = logging.getLogger(__name__)
 
 EXPIRE_SUBTASKS = 300
 
+# Due source plugins are claimed and dispatched this many at a time, up to
+# MAX_SOURCE_PLUGIN_BATCHES batches per plugin class each tick. The rest
+# stay due for the next tick.
+SOURCE_PLUGIN_BATCH_SIZE = 200
+MAX_SOURCE_PLUGIN_BATCHES = 25
+
 
 @celery.app.task(bind=True)
 def run_plugins(self, expire_subtasks=EXPIRE_SUBTASKS):
@@ -24,7 +36,8 @@ def run_plugins(self, expire_subtasks=EXPIRE_SUBTASKS):
 @celery.app.task(base=QueueOnce, once={'graceful': True, })
 def run_plugin_class(plugin_class, expire_subtasks=EXPIRE_SUBTASKS):
     '''
-    Fetch all instances of plugin_class and execute.
+    Fetch all instances of plugin_class and execute, or dispatch those of
+    their source plugins that are due.
     :param plugin_class:
     :return:
     '''
@@ -32,19 +45,100 @@ def run_plugin_class(plugin_class, expire_subtasks=EXPIRE_SUBTASKS):
     if isinstance(plugin_class, str):
         plugin_class = apps.get_model('tracking', plugin_class)
 
+    plugin_ids = []
     for plugin in plugin_class.objects.all():
-
         if plugin.run_source_plugins:
-            for sp in plugin.source_plugins.filter(status='enabled'):
-                if sp.should_run():
-                    # Expire in N seconds where N is the same as the period for the scheduled task.
-                    # This is to avoid letting our task queue get jammed with
-                    # redundant tasks.
-                    run_source_plugin.apply_async(
-                        args=[str(sp.id), ], expires=expire_subtasks)
+            plugin_ids.append(plugin.id)
         else:
             plugin.execute()
 
+    if plugin_ids:
+        dispatch_due_source_plugins(plugin_class, plugin_ids, expire_subtasks=expire_subtasks)
+
+
+def claim_due_source_plugins(plugin_class, plugin_ids, lease, batch_size=SOURCE_PLUGIN_BATCH_SIZE):
+    '''
+    Claim up to batch_size enabled source plugins of plugin_ids whose due
+    time has passed, most overdue first, pushing their due time back by
+    lease. Running a source plugin sets its next due time, so a claimed
+    source plugin whose task expires is due again once the lease is over.
+    :return: ids of the claimed source plugins.
+    '''
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(SourcePlugin.objects
+                   .filter(plugin_type=ContentType.objects.get_for_model(plugin_class),
+                           plugin_id__in=plugin_ids, status=SourcePlugin.STATUS_ENABLED)
+                   .filter(Q(next_run_at__isnull=True) | Q(next_run_at__lte=now))
+                   .order_by(F('next_run_at').asc(nulls_first=True))
+                   .select_for_update(skip_locked=True)
+                   .values_list('id', flat=True)[:batch_size])
+        SourcePlugin.objects.filter(id__in=ids).update(next_run_at=now + lease)
+    return ids
+
+
+def dispatch_due_source_plugins(plugin_class, plugin_ids, expire_subtasks=EXPIRE_SUBTASKS):
+    '''
+    Dispatch a task per due source plugin or, for plugin classes that
+    support fetch_many, a task per account and batch of due source plugins.
+    '''
+    if plugin_class.supports_fetch_many:
+        accounts = [[plugin_id] for plugin_id in plugin_ids]
+    else:
+        accounts = [plugin_ids]
+
+    dispatched = 0
+    for account_plugin_ids in accounts:
+        for _ in range(MAX_SOURCE_PLUGIN_BATCHES):
+            ids = claim_due_source_plugins(plugin_class, account_plugin_ids,
+                                           lease=timedelta(seconds=expire_subtasks))
+            # Expire in N seconds where N is the same as the period for the scheduled task.
+            # This is to avoid letting our task queue get jammed with
+            # redundant tasks.
+            if plugin_class.supports_fetch_many and ids:
+                run_account_source_plugins.apply_async(
+                    args=[plugin_class.__name__, str(account_plugin_ids[0]), [str(i) for i in ids]],
+                    expires=expire_subtasks)
+            else:
+                for source_plugin_id in ids:
+                    run_source_plugin.apply_async(
+                        args=[str(source_plugin_id), ], expires=expire_subtasks)
+            dispatched += len(ids)
+            if len(ids) < SOURCE_PLUGIN_BATCH_SIZE:
+                break
+
+    logger.info('Dispatched %d due source plugins for %s.', dispatched, plugin_class.__name__)
+    return dispatched
+
+
+@celery.app.task(bind=True, base=QueueOnce, once={'graceful': True, }, max_retries=2)
+def run_account_source_plugins(self, plugin_class, plugin_id, source_plugin_ids):
+    '''
+    Run source plugins of one plugin account together, through the
+    plugin's fetch_many.
+    '''
+    if isinstance(plugin_class, str):
+        plugin_class = apps.get_model('tracking', plugin_class)
+
+    plugin = plugin_class.objects.get(id=plugin_id)
+    source_plugins = SourcePlugin.objects.filter(
+        id__in=source_plugin_ids, status=SourcePlugin.STATUS_ENABLED).select_related('source')
+
+    logger.debug('Running plugin %s for %d sources', plugin, len(source_plugin_ids))
+    try:
+        count = plugin.execute_source_plugins(source_plugins)
+    except DasPluginSourceRetryError as ex:
+        logger.debug('Retry plugin {} after {}'.format(plugin, ex.retry_seconds))
+        source_plugins.update(next_run_at=timezone.now() + timedelta(seconds=ex.retry_seconds)
+                              + plugin.DEFAULT_REPORT_INTERVAL)
+        self.retry(countdown=ex.retry_seconds)
+    except Exception:
+        # Back off for a report interval rather than failing again every tick.
+        source_plugins.update(next_run_at=timezone.now() + plugin.DEFAULT_REPORT_INTERVAL)
+        raise
+    else:
+        logger.debug('Finished running plugin {} with result.count={}'.format(plugin, count))
+
 
 @celery.app.task(base=QueueOnce, once={'graceful': True, })
 def run_firms_plugin(id: str):
@@ -102,7 +196,12 @@ def run_source_plugin(self, source_plugin_id):
         result = sp.execute()
     except DasPluginSourceRetryError as ex:
         logger.debug('Retry plugin {} for source {} after {}'.format(sp, sp.source, ex.retry_seconds))
+        sp.defer(timedelta(seconds=ex.retry_seconds) + sp.plugin.DEFAULT_REPORT_INTERVAL)
         self.retry(countdown=ex.retry_seconds)
+    except Exception:
+        # Back off for a report interval rather than failing again every tick.
+        sp.defer(sp.plugin.DEFAULT_REPORT_INTERVAL)
+        raise
     else:
         logger.debug('Finished running plugin {} for source {} with result.count={}'.format(sp, sp.source, result.count))
 
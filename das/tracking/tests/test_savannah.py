@@ -1,6 +1,9 @@
 import io
+import threading
 from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from unittest import mock
+from urllib.parse import parse_qs
 import pytz
 import json
 
@@ -15,7 +18,7 @@ from observations.models import Source, SourceProvider, Subject, SubjectType, \
     SubjectSubType, SubjectSource
 from tracking.models import SavannahPlugin, SourcePlugin
 from tracking.models.savannah import SavannaClient, STObservation, STAlert
-from tracking.tasks import run_source_plugin
+from tracking.tasks import run_account_source_plugins, run_source_plugin
 
 
 def make_data_download(request_mock, host):
@@ -235,3 +238,90 @@ class SavannahPluginTest(TestCase):
         self.assertTrue(any(observation.__dict__['additional'].get(
             'device_alert', None) == 'immobility_all_clear'
             for observation in self.henry.observations()))
+
+
+class StubSavannahHandler(BaseHTTPRequestHandler):
+    """
+    Serves one data record per collar, and no alerts, recording the
+    collars it was asked for.
+    """
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+        self.server.requests.append((form['request'], form['collar']))
+
+        records = []
+        if form['request'] == 'data_download':
+            records.append({
+                "record_index": 100, "record_time": "8/6/2019 12:29:57",
+                "latitude": -3.60681, "longitude": 39.87715, "hdop": 0, "h_accuracy": 0,
+                "heading": 0, "speed": 0, "temperature": 39, "battery": 3.76})
+        body = json.dumps({"sucess": True, "error_msg": "", "has_more_records": False,
+                           "records": records}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SavannahFetchManyTest(TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), StubSavannahHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.plugin = SavannahPlugin.objects.create(
+            name='Savannah', service_username="random", service_password="random",
+            service_api_host='http://127.0.0.1:{}'.format(self.server.server_port))
+        self.source_plugins = []
+        for manufacturer_id in ('ST2010-1', 'ST2010-2'):
+            source = Source.objects.create(manufacturer_id=manufacturer_id,
+                                           source_type='tracking-device')
+            self.source_plugins.append(SourcePlugin.objects.create(source=source, plugin=self.plugin))
+
+    @mock.patch("das_server.pubsub.get_pool", fake_get_pool)
+    def test_run_account_source_plugins(self):
+        run_account_source_plugins('SavannahPlugin', str(self.plugin.id),
+                                   [str(sp.id) for sp in self.source_plugins])
+
+        self.assertEqual(sorted(self.server.requests), [
+            ('data_download', 'ST2010-1'), ('data_download', 'ST2010-2'),
+            ('exceptions_download', 'ST2010-1'), ('exceptions_download', 'ST2010-2')])
+
+        for sp in self.source_plugins:
+            sp.refresh_from_db()
+            self.assertEqual(sp.cursor_data['record_index'], 100)
+            self.assertIsNotNone(sp.next_run_at)
+            self.assertEqual(sp.source.observation_set.count(), 1)
+
+    @mock.patch("das_server.pubsub.get_pool", fake_get_pool)
+    def test_failing_collar_does_not_abort_batch(self):
+        fetch = SavannahPlugin.fetch
+
+        def failing_fetch(plugin, source, cursor_data=None):
+            if source.manufacturer_id == 'ST2010-1':
+                raise ValueError('collar unavailable')
+            return fetch(plugin, source, cursor_data)
+
+        with mock.patch.object(SavannahPlugin, 'fetch', autospec=True, side_effect=failing_fetch):
+            run_account_source_plugins('SavannahPlugin', str(self.plugin.id),
+                                       [str(sp.id) for sp in self.source_plugins])
+
+        failed, succeeded = self.source_plugins
+        failed.refresh_from_db()
+        succeeded.refresh_from_db()
+
+        self.assertEqual(failed.cursor_data, {})
+        self.assertEqual(failed.next_run_at, failed.last_run + SavannahPlugin.DEFAULT_REPORT_INTERVAL)
+        self.assertEqual(failed.source.observation_set.count(), 0)
+
+        self.assertEqual(succeeded.cursor_data['record_index'], 100)
+        self.assertEqual(succeeded.source.observation_set.count(), 1)
@@ -13,6 +13,7 @@ from django.contrib.gis.geos import Polygon, MultiPolygon
 import uuid
 from tracking.models.plugin_base import DasDefaultTarget
 from tracking.models import skygistics
+from tracking.tasks import claim_due_source_plugins
 class TestSourcePlugin(TestCase):
 
     def setUp(self):
@@ -93,6 +94,55 @@ class TestSourcePlugin(TestCase):
         sp = SourcePlugin.objects.create(source=source, plugin=plugin, cursor_data={'latest_timestamp':latest_timestamp_early.isoformat()})
         self.assertTrue(sp.should_run())
 
+    def test_next_run_at(self):
+        plugin = SavannahPlugin.objects.create(name='dummy-savannah-plugin')
+        now = pytz.utc.localize(datetime.utcnow())
+
+        sp = SourcePlugin(source=self.source, plugin=plugin, cursor_data={})
+        self.assertEqual(sp.get_next_run_at(now), now)
+
+        latest_timestamp = now - timedelta(minutes=2)
+        sp.cursor_data = {'latest_timestamp': latest_timestamp.isoformat()}
+        self.assertEqual(sp.get_next_run_at(now), latest_timestamp + plugin.DEFAULT_REPORT_INTERVAL)
+
+        # Sources that have been quiet for over 30 days are polled daily.
+        latest_timestamp = now - timedelta(days=31)
+        sp.cursor_data = {'latest_timestamp': latest_timestamp.isoformat()}
+        self.assertEqual(sp.get_next_run_at(now), latest_timestamp + timedelta(hours=24))
+
+    def test_claim_due_source_plugins(self):
+        plugin = SavannahPlugin.objects.create(name='dummy-savannah-plugin')
+        now = pytz.utc.localize(datetime.utcnow())
+
+        def create_source_plugin(next_run_at, status=SourcePlugin.STATUS_ENABLED):
+            source = Source.objects.create(manufacturer_id=str(uuid.uuid4()), additional={})
+            return SourcePlugin.objects.create(source=source, plugin=plugin, status=status,
+                                               next_run_at=next_run_at)
+
+        unscheduled = create_source_plugin(None)
+        overdue = create_source_plugin(now - timedelta(minutes=10))
+        create_source_plugin(now + timedelta(minutes=10))
+        create_source_plugin(now - timedelta(minutes=10), status=SourcePlugin.STATUS_DISABLED)
+
+        claimed = claim_due_source_plugins(SavannahPlugin, [plugin.id], lease=timedelta(minutes=5))
+        self.assertEqual(set(claimed), {unscheduled.id, overdue.id})
+
+        # Claimed source plugins are not due again until the lease is over.
+        overdue.refresh_from_db()
+        self.assertGreater(overdue.next_run_at, now)
+        self.assertEqual(claim_due_source_plugins(SavannahPlugin, [plugin.id], lease=timedelta(minutes=5)), [])
+
+    def test_claim_due_source_plugins_in_batches(self):
+        plugin = SavannahPlugin.objects.create(name='dummy-savannah-plugin')
+        for i in range(3):
+            source = Source.objects.create(manufacturer_id=f'batch-{i}', additional={})
+            SourcePlugin.objects.create(source=source, plugin=plugin)
+
+        claimed = claim_due_source_plugins(SavannahPlugin, [plugin.id], lease=timedelta(minutes=5), batch_size=2)
+        self.assertEqual(len(claimed), 2)
+        claimed = claim_due_source_plugins(SavannahPlugin, [plugin.id], lease=timedelta(minutes=5), batch_size=2)
+        self.assertEqual(len(claimed), 1)
+
     def test_invalid_skygistic_observations_saved_but_flagged(self):
         plugin = SkygisticsSatellitePlugin.objects.create()
         source_plugin = SourcePlugin(source=self.source, plugin=plugin)
@@ -0,0 +1,274 @@
+"""
+A shared Redis cache backend with a small in-process cache in front of it.
+
+Values of keys under the configured L1_KEY_PREFIXES are kept in process
+for up to L1_TIMEOUT seconds, so hot lookups (choice versions and rows,
+rendered schemas, change stamps) skip the round trip to Redis. Writing or
+deleting such a key broadcasts an invalidation over the das pubsub, and
+every process that listens drops its copy. L1_TIMEOUT bounds how stale a
+copy can be when a broadcast is missed.
+
+Configure it in CACHES, for example:
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'utils.cache.TieredRedisCache',
+            'LOCATION': 'redis://redis:6379/3',
+            'OPTIONS': {
+                'L1_TIMEOUT': 5,
+                'L1_MAX_ENTRIES': 2000,
+                'L1_KEY_PREFIXES': ('choices:', 'schema:', 'changestamp:'),
+            },
+        }
+    }
+"""
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django_redis.cache import RedisCache
+
+from utils.telemetry import record_cache_lookups
+
+logger = logging.getLogger(__name__)
+
+INVALIDATE_ROUTING_KEY = 'das.cache.invalidate'
+
+DEFAULT_L1_TIMEOUT = 5
+DEFAULT_L1_MAX_ENTRIES = 1000
+DEFAULT_L1_KEY_PREFIXES = ('choices:', 'schema:', 'changestamp:')
+
+_missing = object()
+
+# Django creates a cache backend per thread, so the in-process caches, and
+# the listeners that invalidate them, are shared by location.
+_local_caches = {}
+_listener_pids = {}
+_lock = threading.Lock()
+
+_origin = uuid.uuid4().hex
+
+# Backends whose entries live in a single process.
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias=DEFAULT_CACHE_ALIAS):
+    """
+    Whether every process uses the same cache for alias, so a key deleted
+    in one process is gone for all of them. The CACHE_IS_SHARED setting
+    overrides the guess made from the backend.
+    """
+    shared = getattr(settings, 'CACHE_IS_SHARED', None)
+    if shared is not None:
+        return shared
+    return settings.CACHES.get(alias, {}).get('BACKEND') not in PROCESS_LOCAL_BACKENDS
+
+
+def get_origin():
+    """Identifies this process's broadcasts, so it skips its own."""
+    return f'{_origin}:{os.getpid()}'
+
+
+class LocalCache(object):
+    """A bounded, thread-safe, in-process store of pickled values with a TTL."""
+
+    def __init__(self, timeout, max_entries):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, pickled = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False, None
+        return True, pickle.loads(pickled)
+
+    def set(self, key, value):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.timeout, pickled)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TieredRedisCache(RedisCache):
+
+    def __init__(self, server, params):
+        options = dict(params.get('OPTIONS') or {})
+        l1_timeout = options.pop('L1_TIMEOUT', DEFAULT_L1_TIMEOUT)
+        l1_max_entries = options.pop('L1_MAX_ENTRIES', DEFAULT_L1_MAX_ENTRIES)
+        self.l1_key_prefixes = tuple(options.pop('L1_KEY_PREFIXES', DEFAULT_L1_KEY_PREFIXES))
+        self.broadcast = options.pop('BROADCAST_INVALIDATION', True)
+        super().__init__(server, dict(params, OPTIONS=options))
+
+        self.location = server if isinstance(server, str) else ','.join(server)
+        with _lock:
+            self.l1 = _local_caches.get(self.location)
+            if self.l1 is None:
+                self.l1 = _local_caches[self.location] = LocalCache(l1_timeout, l1_max_entries)
+
+    def uses_l1(self, key):
+        return key.startswith(self.l1_key_prefixes)
+
+    def get(self, key, default=None, version=None, client=None):
+        if not self.uses_l1(key):
+            value = super().get(key, default=_missing, version=version, client=client)
+            if value is _missing:
+                record_cache_lookups(0, 1)
+                return default
+            record_cache_lookups(1)
+            return value
+
+        self._ensure_listener()
+        full_key = self.make_key(key, version=version)
+        found, value = self.l1.get(full_key)
+        if found:
+            record_cache_lookups(1)
+            return value
+
+        value = super().get(key, default=_missing, version=version, client=client)
+        if value is _missing:
+            record_cache_lookups(0, 1)
+            return default
+        record_cache_lookups(1)
+        self.l1.set(full_key, value)
+        return value
+
+    def get_many(self, keys, version=None, client=None):
+        keys = list(keys)
+        values, remote_keys = {}, []
+        for key in keys:
+            if self.uses_l1(key):
+                self._ensure_listener()
+                found, value = self.l1.get(self.make_key(key, version=version))
+                if found:
+                    values[key] = value
+                    continue
+            remote_keys.append(key)
+
+        if remote_keys:
+            remote_values = super().get_many(remote_keys, version=version, client=client)
+            for key, value in remote_values.items():
+                if self.uses_l1(key):
+                    self.l1.set(self.make_key(key, version=version), value)
+            values.update(remote_values)
+        record_cache_lookups(len(values), len(keys) - len(values))
+        return values
+
+    def set(self, key, value, *args, version=None, **kwargs):
+        result = super().set(key, value, *args, version=version, **kwargs)
+        self._invalidate([key], version)
+        return result
+
+    def add(self, key, value, *args, version=None, **kwargs):
+        result = super().add(key, value, *args, version=version, **kwargs)
+        if result:
+            self._invalidate([key], version)
+        return result
+
+    def set_many(self, data, *args, version=None, **kwargs):
+        result = super().set_many(data, *args, version=version, **kwargs)
+        self._invalidate(list(data), version)
+        return result
+
+    def delete(self, key, *args, version=None, **kwargs):
+        result = super().delete(key, *args, version=version, **kwargs)
+        self._invalidate([key], version)
+        return result
+
+    def delete_many(self, keys, *args, version=None, **kwargs):
+        keys = list(keys)
+        result = super().delete_many(keys, *args, version=version, **kwargs)
+        self._invalidate(keys, version)
+        return result
+
+    def incr(self, key, delta=1, version=None, client=None):
+        result = super().incr(key, delta=delta, version=version, client=client)
+        self._invalidate([key], version)
+        return result
+
+    def decr(self, key, delta=1, version=None, client=None):
+        result = super().decr(key, delta=delta, version=version, client=client)
+        self._invalidate([key], version)
+        return result
+
+    def clear(self):
+        result = super().clear()
+        self.l1.clear()
+        self._publish({'clear': True})
+        return result
+
+    def _invalidate(self, keys, version):
+        full_keys = [self.make_key(key, version=version) for key in keys if self.uses_l1(key)]
+        if full_keys:
+            self.l1.delete(*full_keys)
+            self._publish({'keys': full_keys})
+
+    def _publish(self, body):
+        if not self.broadcast:
+            return
+        from das_server import pubsub
+        pubsub.publish(dict(body, location=self.location, origin=get_origin()),
+                       routing_key=INVALIDATE_ROUTING_KEY)
+
+    def handle_invalidation(self, body, message=None):
+        if body.get('location') != self.location or body.get('origin') == get_origin():
+            return
+        if body.get('clear'):
+            self.l1.clear()
+        else:
+            self.l1.delete(*body.get('keys', ()))
+
+    def _ensure_listener(self):
+        """
+        Start listening for invalidations in this process, once per process
+        since the listener thread does not survive a fork.
+        """
+        pid = os.getpid()
+        if not self.broadcast or _listener_pids.get(self.location) == pid:
+            return
+        with _lock:
+            if _listener_pids.get(self.location) == pid:
+                return
+            _listener_pids[self.location] = pid
+        # Copies inherited from the parent process were never invalidated here.
+        self.l1.clear()
+        thread = threading.Thread(target=self._listen, name='cache-invalidation', daemon=True)
+        thread.start()
+
+    def _listen(self):
+        from das_server import pubsub
+        while True:
+            try:
+                pubsub.subscribe([{'routing_key': INVALIDATE_ROUTING_KEY,
+                                   'callback': self.handle_invalidation}])
+            except Exception:
+                logger.exception('Cache invalidation listener failed, reconnecting.')
+                # Copies may have missed invalidations while disconnected.
+                self.l1.clear()
+                time.sleep(DEFAULT_L1_TIMEOUT)
@@ -1,13 +1,11 @@
 import inspect
-import json
 import logging
+import random
 import re
-import time
 import uuid
-from datetime import datetime, timedelta
+from datetime import timedelta
 from threading import local
 
-import pytz
 from google.auth.exceptions import DefaultCredentialsError
 from google.cloud import error_reporting
 from oauth2_provider.models import get_access_token_model
@@ -16,12 +14,11 @@ from django.conf import settings
 from django.shortcuts import redirect
 from django.utils import timezone
 
-from core import persistent_storage
-from observations.utils import (LOCATION, block_user_temp, get_position,
-                                get_user_key, is_banned)
+from observations.utils import is_banned, record_position
 from utils import add_base_url, stats
 from utils.categories import should_apply_geographic_features
 from utils.gis import convert_to_point
+from utils.telemetry import RequestTelemetry
 
 logger = logging.getLogger(__name__)
 
@@ -44,20 +41,24 @@ class RequestLoggingMiddleware(object):
         # One-time configuration and initialization.
 
     def __call__(self, request):
-        # Code to be executed for each request before
-        # the view (and later middleware) are called.
-        self.process_request(request)
+        # The middleware instance is shared by concurrent requests, so
+        # everything measured is kept on the request.
+        request.telemetry = RequestTelemetry()
+        with request.telemetry.activate():
+            # Code to be executed for each request before
+            # the view (and later middleware) are called.
+            self.process_request(request)
 
-        response = self.get_response(request)
+            response = self.get_response(request)
 
-        # Code to be executed for each request/response after
-        # the view is called.
-        return self.process_response(request, response)
+            # Code to be executed for each request/response after
+            # the view is called.
+            return self.process_response(request, response)
 
     def process_request(self, request):
+        # Speeds are checked, and users blocked, by
+        # observations.tasks.enforce_geo_permission_speeds.
         self._save_location(request)
-        block_user_temp(request.user)
-        self.start_time = time.time()
 
     def process_exception(self, request, exception):
         self.logger.exception("Exception handling %s", request.get_full_path)
@@ -73,11 +74,10 @@ class RequestLoggingMiddleware(object):
             user_id = "-"
             if hasattr(request, "user"):
                 user_id = getattr(request.user, "id", "-")
-            try:
-                req_time = time.time() - self.start_time
-            except AttributeError:
-                req_time = 0
-            content_length = len(getattr(response, "content", []))
+            telemetry = getattr(request, "telemetry", None)
+            req_time = telemetry.elapsed if telemetry else 0
+            # Reading a streaming response's content would buffer it.
+            content_length = 0 if response.streaming else len(response.content)
             referer = request.META.get("HTTP_REFERER", "")
             user_agent = request.META.get("HTTP_USER_AGENT", "")
             status = response.status_code
@@ -112,13 +112,8 @@ class RequestLoggingMiddleware(object):
             )
 
             self.logger.info('request', extra=extra)
-            stats.histogram('api_request_time', req_time,
-                            tags=[
-                                f'path:{path}',
-                                f'method:{method}'
-                                f'satus:{status}'
-                            ]
-                            )
+            if telemetry:
+                self._report_telemetry(request, telemetry, req_time, status)
 
         except Exception:
             logging.exception('RequestLoggingMiddleware Error')
@@ -127,6 +122,34 @@ class RequestLoggingMiddleware(object):
 
         return response
 
+    def _report_telemetry(self, request, telemetry, req_time, status):
+        resolver_match = getattr(request, "resolver_match", None)
+        view_name = resolver_match.view_name if resolver_match else "unresolved"
+        tags = [
+            f'view:{view_name}',
+            f'method:{request.method}',
+            f'status:{status}',
+        ]
+        stats.histogram('api_request_time', req_time, tags=tags)
+        stats.histogram('api_request_db_queries', telemetry.db_queries, tags=tags)
+        stats.histogram('api_request_db_time', telemetry.db_time, tags=tags)
+        stats.histogram('api_request_redis_calls', telemetry.redis_calls, tags=tags)
+        if telemetry.cache_hit_rate is not None:
+            stats.histogram('api_request_cache_hit_rate', telemetry.cache_hit_rate, tags=tags)
+
+        if req_time >= settings.SLOW_REQUEST_SECONDS and random.random() < settings.SLOW_REQUEST_SAMPLE_RATE:
+            self.logger.warning(
+                'Slow request %s %s (%.02f seconds, %d queries in %.02f seconds)',
+                request.method, request.get_full_path(), req_time, telemetry.db_queries, telemetry.db_time,
+                extra=dict(view_name=view_name,
+                           req_time=req_time,
+                           db_queries=telemetry.db_queries,
+                           db_time=telemetry.db_time,
+                           redis_calls=telemetry.redis_calls,
+                           cache_hits=telemetry.cache_hits,
+                           cache_misses=telemetry.cache_misses,
+                           query_fingerprints=telemetry.query_fingerprints()))
+
     def _save_location(self, request):
         if (
                 request.user
@@ -134,35 +157,8 @@ class RequestLoggingMiddleware(object):
                 and re.search(ACTIVITY_EVENTS_PATH_REGEX, request.path)
                 and "location" in request.GET
         ):
-            now = timezone.now()
-            key = get_user_key(request.user, LOCATION)
             point = convert_to_point(request.GET.get("location"))
-            position = json.dumps({
-                "datetime": datetime.timestamp(now),
-                "position": {
-                    "latitude": point.y,
-                    "longitude": point.x,
-                },
-            })
-
-            last_item = get_position(key)
-
-            # Save position only if the newest is greater than one minute regardless
-            # the location is the same as previous
-            if last_item:
-                last_item_point = convert_to_point(last_item.get("position"))
-                if last_item_point == point:
-                    last_item_datetime = datetime.fromtimestamp(
-                        last_item.get("datetime"), tz=pytz.UTC)
-                    if int((now - last_item_datetime).seconds / 60) > 0:
-                        persistent_storage.insert_in_sorted_set(
-                            key, position, datetime.timestamp(now))
-                else:
-                    persistent_storage.insert_in_sorted_set(
-                        key, position, datetime.timestamp(now))
-            else:
-                persistent_storage.insert_in_sorted_set(
-                    key, position, datetime.timestamp(now))
+            record_position(request.user, point, timezone.now())
 
 
 class RequestDataMiddleware(object):
@@ -241,7 +237,7 @@ class GeographicMiddleware:
             )
             response["Warning"] = f"199 - {warn_text}"
 
-        if is_banned(user) and (re.search(ACTIVITY_EVENTS_PATH_REGEX, request.path)):
+        if re.search(ACTIVITY_EVENTS_PATH_REGEX, request.path) and is_banned(user):
             warn_text = (
                 f"199 - You have violated the maximum speed configured."
                 f" Please wait a little while before trying again, or contact "
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 
-import redis
+from utils.telemetry import InstrumentedRedis
 
 
 class PersistentStorage(ABC):
@@ -35,12 +35,18 @@ class PersistentStorageWitSortedSet(PersistentStorage):
     def get_sorted_set(self, key):
         pass
 
+    def insert_in_sorted_set_and_mark(self, key, value, score, marked_key, member, min_score=None):
+        pass
+
+    def pop_set(self, key):
+        pass
+
 
 class RedisStorage(PersistentStorageWitSortedSet):
     def __init__(self, config):
         self.host = config["HOST"]
         self.port = config["PORT"]
-        self._connection = redis.Redis(host=self.host, port=self.port)
+        self._connection = InstrumentedRedis(host=self.host, port=self.port)
 
     def insert_key(self, key, value, expiration=3600):
         self._connection.set(key, value, expiration)
@@ -67,3 +73,23 @@ class RedisStorage(PersistentStorageWitSortedSet):
 
     def slice_sorted_set(self, key, maximum):
         self._connection.zremrangebyscore(key, min=0, max=maximum)
+
+    def insert_in_sorted_set_and_mark(self, key, value, score, marked_key, member, min_score=None):
+        """
+        Insert value in the sorted set at key, dropping its items scored up to
+        min_score, and add member to the set at marked_key, in one round trip.
+        """
+        pipeline = self._connection.pipeline(transaction=False)
+        pipeline.zadd(key, {value: score})
+        if min_score is not None:
+            pipeline.zremrangebyscore(key, min=0, max=min_score)
+        pipeline.sadd(marked_key, member)
+        pipeline.execute()
+
+    def pop_set(self, key):
+        """Remove the set at key and return its members."""
+        pipeline = self._connection.pipeline()
+        pipeline.smembers(key)
+        pipeline.delete(key)
+        members, _ = pipeline.execute()
+        return members
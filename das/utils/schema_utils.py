@@ -1,4 +1,5 @@
 import copy
+import hashlib
 import html
 import json
 import logging
@@ -10,12 +11,15 @@ from collections import OrderedDict
 import jsonschema
 
 from django.apps import apps
+from django.core.cache import cache
 from django.template import Context, Template
 from django.template.base import TextNode, VariableNode
 
 from activity.exceptions import (SCHEMA_ERROR_MISSING_DOLLAR_SIGN_SCHEMA,
                                  SchemaValidationError, UnmappableFormKeyError)
 from activity.models import EventDetails
+from choices.cache import (DYNAMIC_VERSION_KEY, choice_version_key,
+                           get_cached_choices, get_versions, table_version_key)
 from choices.models import Choice, DynamicChoice
 from utils.memoize import memoize
 
@@ -101,14 +105,17 @@ def _get_dynamic_choices(field_details, event=None):
     return return_val
 
 
-def get_enum_choices(field_details, as_string=True, queryset=None):
+def get_enum_choices(field_details, as_string=True, queryset=None, active_only=False):
     options = OrderedDict()
-    qs = queryset or Choice.objects.all()
-    for choice in qs.filter(model='activity.event',
-                            field=field_details['field']).extra(
-        select={'lower_name': 'lower(display)'}).order_by('ordernum',
-                                                          'lower_name'):
-        options[choice.value] = choice.display
+    if queryset is None:
+        for choice in get_cached_choices(Choice.Field_Reports, field_details['field'], active_only=active_only):
+            options[choice.value] = choice.display
+    else:
+        for choice in queryset.filter(model='activity.event',
+                                      field=field_details['field']).extra(
+            select={'lower_name': 'lower(display)'}).order_by('ordernum',
+                                                              'lower_name'):
+            options[choice.value] = choice.display
 
     if field_details['type'] == 'names':
         return_val = options
@@ -128,11 +135,14 @@ def get_enum_choices(field_details, as_string=True, queryset=None):
     return return_val
 
 
-def get_enumImage_values(field_details, queryset=None):
-    qs = queryset or Choice.objects.all()
+def get_enumImage_values(field_details, queryset=None, active_only=False):
     options = OrderedDict()
-    for choice in qs.filter(model='activity.event', field=field_details['field']).extra(select={'lower_name': 'lower(display)'}).order_by('ordernum', 'lower_name'):
-        options[choice.value] = choice.icon
+    if queryset is None:
+        for choice in get_cached_choices(Choice.Field_Reports, field_details['field'], active_only=active_only):
+            options[choice.value] = choice.icon
+    else:
+        for choice in queryset.filter(model='activity.event', field=field_details['field']).extra(select={'lower_name': 'lower(display)'}).order_by('ordernum', 'lower_name'):
+            options[choice.value] = choice.icon
 
     return {k: v for k, v in options.items() if v}
 
@@ -163,7 +173,51 @@ def get_table_choices(field_details, as_string=True):
     return return_val
 
 
+RENDERED_SCHEMA_CACHE_TIMEOUT = 60 * 60 * 24
+
+# schema hash -> (rendered schema cache key, rendered schema JSON text)
+_local_rendered_schemas = {}
+
+# schema hash -> the choice version keys the schema depends on
+_schema_version_keys = {}
+
+
+def schema_choice_version_keys(schema_fields):
+    """The choices.cache version keys of the choices a schema is rendered with."""
+    version_keys = set()
+    for schema_field in schema_fields:
+        if schema_field['lookup'] == 'enum':
+            version_keys.add(choice_version_key(Choice.Field_Reports, schema_field['field']))
+        elif schema_field['lookup'] == 'query':
+            version_keys.add(DYNAMIC_VERSION_KEY)
+        elif schema_field['lookup'] == 'table':
+            version_keys.add(table_version_key(schema_field['field']))
+    return sorted(version_keys)
+
+
+def get_rendered_schema_cache_key(schema_hash, schema):
+    """
+    Key of the rendered schema: the schema's hash plus the versions of the
+    choices it is rendered with.
+    """
+    version_keys = _schema_version_keys.get(schema_hash)
+    if version_keys is None:
+        version_keys = _schema_version_keys[schema_hash] = schema_choice_version_keys(
+            get_replacement_fields_in_schema(schema))
+
+    key = f'schema:rendered:{schema_hash}'
+    if version_keys:
+        versions = get_versions(version_keys)
+        key += ':' + hashlib.sha1(':'.join(versions[k] for k in version_keys).encode('utf-8')).hexdigest()
+    return key
+
+
 def get_schema_renderer_method():
+    """
+    Return a function rendering a schema, through the rendered schema cache
+    shared by every caller. A schema is rendered again when it changes or
+    when any of the choices it is rendered with change.
+    """
 
     @memoize
     def memo_enum_choices(enum_choices_identifier):
@@ -180,8 +234,7 @@ def get_schema_renderer_method():
         field_name, field_type = table_choices_identifier.split(':')
         return get_table_choices({'field': field_name, 'type': field_type})
 
-    @memoize
-    def render_f(schema):
+    def render_template(schema):
 
         schema_fields = get_replacement_fields_in_schema(schema)
 
@@ -202,11 +255,40 @@ def get_schema_renderer_method():
                 Context(parameters, autoescape=False))
         else:
             rendered_template = schema
+        return rendered_template
+
+    @memoize
+    def render_f(schema):
+        schema_hash = hashlib.sha1(schema.encode('utf-8')).hexdigest()
+        cache_key = get_rendered_schema_cache_key(schema_hash, schema)
+
+        local_key, rendered_template = _local_rendered_schemas.get(schema_hash, (None, None))
+        if local_key != cache_key:
+            rendered_template = cache.get(cache_key)
+            if rendered_template is None:
+                rendered_template = render_template(schema)
+                # Only schemas that render valid JSON are cached.
+                json.loads(rendered_template)
+                cache.set(cache_key, rendered_template, RENDERED_SCHEMA_CACHE_TIMEOUT)
+            _local_rendered_schemas[schema_hash] = (cache_key, rendered_template)
 
         return json.loads(rendered_template, object_pairs_hook=OrderedDict)
     return render_f
 
 
+def warm_rendered_schemas(schemas):
+    """Render schemas into the rendered schema cache, returning how many failed."""
+    render_f = get_schema_renderer_method()
+    failed = 0
+    for schema in schemas:
+        try:
+            render_f(schema)
+        except Exception:
+            logger.warning('Unable to render schema while warming the rendered schema cache.', exc_info=True)
+            failed += 1
+    return failed
+
+
 def validate(event, schema=None, raise_exception=False):
     '''
     Validate event details against a rendered_schema.
@@ -0,0 +1,129 @@
+"""
+Per-request performance telemetry.
+
+RequestLoggingMiddleware makes a RequestTelemetry current for the request.
+While current, it counts database queries and their time on every
+database connection of the thread. Redis round trips are counted by
+InstrumentedRedis, the client of the shared cache and persistent
+storage. Cache hits and misses are reported by utils.cache.
+"""
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+import redis
+import redis.client
+
+from django.db import connections
+
+# Queries kept per request to fingerprint a slow one.
+MAX_RECORDED_QUERIES = 1000
+MAX_FINGERPRINT_LENGTH = 500
+
+_local = threading.local()
+
+PLACEHOLDER_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Reduce a query to its shape, so queries differing only in values group together."""
+    sql = STRING_LITERAL_RE.sub('?', sql)
+    sql = NUMBER_LITERAL_RE.sub('?', sql)
+    sql = PLACEHOLDER_LIST_RE.sub('(%s, ...)', sql)
+    return WHITESPACE_RE.sub(' ', sql).strip()[:MAX_FINGERPRINT_LENGTH]
+
+
+class RequestTelemetry(object):
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.redis_calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # (sql, seconds) of the first MAX_RECORDED_QUERIES queries.
+        self.queries = []
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started_at
+
+    @property
+    def cache_hit_rate(self):
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else None
+
+    def __call__(self, execute, sql, params, many, context):
+        """The database execute wrapper."""
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started_at
+            self.db_queries += 1
+            self.db_time += duration
+            if len(self.queries) < MAX_RECORDED_QUERIES:
+                self.queries.append((sql, duration))
+
+    @contextmanager
+    def activate(self):
+        previous = getattr(_local, 'telemetry', None)
+        _local.telemetry = self
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self))
+                yield self
+        finally:
+            _local.telemetry = previous
+
+    def query_fingerprints(self, limit=10):
+        """The query shapes that took the most time, with their counts."""
+        totals = {}
+        for sql, duration in self.queries:
+            key = fingerprint(sql)
+            count, total = totals.get(key, (0, 0.0))
+            totals[key] = (count + 1, total + duration)
+        fingerprints = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+        return [dict(query=key, count=count, time=round(total, 4))
+                for key, (count, total) in fingerprints[:limit]]
+
+
+def current_telemetry():
+    return getattr(_local, 'telemetry', None)
+
+
+def record_redis_call():
+    telemetry = current_telemetry()
+    if telemetry:
+        telemetry.redis_calls += 1
+
+
+def record_cache_lookups(hits, misses=0):
+    telemetry = current_telemetry()
+    if telemetry:
+        telemetry.cache_hits += hits
+        telemetry.cache_misses += misses
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+
+    def execute(self, *args, **kwargs):
+        record_redis_call()
+        return super().execute(*args, **kwargs)
+
+
+class InstrumentedRedis(redis.Redis):
+    """A Redis client that counts its round trips against the current request."""
+
+    def execute_command(self, *args, **options):
+        record_redis_call()
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
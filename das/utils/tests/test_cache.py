@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from utils.cache import LocalCache, TieredRedisCache, get_origin, is_shared_cache
+
+
+class TestLocalCache(SimpleTestCase):
+
+    def test_values_expire(self):
+        local = LocalCache(timeout=5, max_entries=10)
+        with mock.patch('utils.cache.time.monotonic', return_value=100):
+            local.set('key', {'a': 1})
+            self.assertEqual(local.get('key'), (True, {'a': 1}))
+        with mock.patch('utils.cache.time.monotonic', return_value=106):
+            self.assertEqual(local.get('key'), (False, None))
+
+    def test_values_are_copies(self):
+        local = LocalCache(timeout=5, max_entries=10)
+        value = {'a': 1}
+        local.set('key', value)
+        value['a'] = 2
+        local.get('key')[1]['a'] = 3
+        self.assertEqual(local.get('key'), (True, {'a': 1}))
+
+    def test_oldest_entries_are_dropped(self):
+        local = LocalCache(timeout=5, max_entries=2)
+        for key in ('a', 'b', 'c'):
+            local.set(key, key)
+        self.assertEqual(local.get('a'), (False, None))
+        self.assertEqual(local.get('c'), (True, 'c'))
+
+
+class TestIsSharedCache(SimpleTestCase):
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_locmem_is_not_shared(self):
+        self.assertFalse(is_shared_cache())
+
+    @override_settings(CACHES={'default': {'BACKEND': 'utils.cache.TieredRedisCache'}})
+    def test_redis_is_shared(self):
+        self.assertTrue(is_shared_cache())
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                       CACHE_IS_SHARED=True)
+    def test_setting_overrides_backend(self):
+        self.assertTrue(is_shared_cache())
+
+
+class TestTieredRedisCache(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = TieredRedisCache('redis://localhost:6379/15', {
+            'OPTIONS': {'L1_KEY_PREFIXES': ('choices:',), 'BROADCAST_INVALIDATION': False}})
+        self.cache.l1.clear()
+
+    def test_uses_l1(self):
+        self.assertTrue(self.cache.uses_l1('choices:version:dynamic'))
+        self.assertFalse(self.cache.uses_l1('mvt:features'))
+
+    def test_handle_invalidation(self):
+        full_key = self.cache.make_key('choices:rows')
+        self.cache.l1.set(full_key, ('row',))
+
+        # Its own broadcasts are skipped.
+        self.cache.handle_invalidation(
+            {'keys': [full_key], 'location': self.cache.location, 'origin': get_origin()})
+        self.assertTrue(self.cache.l1.get(full_key)[0])
+
+        self.cache.handle_invalidation(
+            {'keys': [full_key], 'location': self.cache.location, 'origin': 'another-process'})
+        self.assertFalse(self.cache.l1.get(full_key)[0])
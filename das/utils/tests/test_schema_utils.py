@@ -2,6 +2,7 @@ from collections import OrderedDict
 import json
 from django.test import TestCase
 import utils.schema_utils as schema_utils
+from unittest import mock
 from unittest.mock import MagicMock
 from choices.models import Choice, DynamicChoice
 from observations.models import Subject
@@ -223,6 +224,37 @@ class TestReportUtils(TestCase):
         ]
         self.assertListEqual(expected_map_result, json.loads(map_result))
 
+    @mock.patch('activity.signals.warm_event_type_schemas')
+    @mock.patch('choices.cache.transaction.on_commit', side_effect=lambda func: func())
+    def test_rendered_schema_cache(self, on_commit, warm_event_type_schemas):
+        schema_utils.get_schema_renderer_method()(self.raw_schema_1)
+
+        # A new renderer reads the rendered schema from the cache.
+        with self.assertNumQueries(0):
+            result = schema_utils.get_schema_renderer_method()(self.raw_schema_1)
+        self.assertEqual(result, self.rendered_schema_1)
+
+        # Changing a choice renders the schema again.
+        Choice.objects.create(model='activity.event', field='carcassrep_species',
+                              value='lion', display='Lion')
+        result = schema_utils.get_schema_renderer_method()(self.raw_schema_1)
+        self.assertEqual(
+            result['schema']['properties']['carcassrep_species']['enum'], ['lion', 'zebra'])
+
+    @mock.patch('activity.signals.warm_event_type_schemas')
+    @mock.patch('choices.cache.transaction.on_commit', side_effect=lambda func: func())
+    def test_rendered_schema_cache_with_dynamic_choices(self, on_commit, warm_event_type_schemas):
+        DynamicChoice.objects.create(id='elephants', model_name='observations.subject',
+                                     criteria='[["subject_subtype", "elephant"]]',
+                                     value_col='id', display_col='name')
+        schema = '{"enum": {{query___elephants___names}}}'
+
+        self.assertEqual(schema_utils.get_schema_renderer_method()(schema), {'enum': {}})
+
+        alvin = Subject.objects.create(name='Alvin', subject_subtype_id='elephant')
+        self.assertEqual(schema_utils.get_schema_renderer_method()(schema),
+                         {'enum': {str(alvin.id): 'Alvin'}})
+
     def test_rendered_schema_requires_valid_properties(self):
         rendered_schema_invalid_property_attributes = {
             "schema": {
@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from utils import middleware
+from utils.telemetry import (RequestTelemetry, current_telemetry, fingerprint,
+                             record_cache_lookups)
+
+
+class TestFingerprint(TestCase):
+
+    def test_values_are_dropped(self):
+        self.assertEqual(
+            fingerprint("SELECT *  FROM t WHERE name = 'o''neil' AND id IN (%s, %s, %s) LIMIT 21"),
+            "SELECT * FROM t WHERE name = ? AND id IN (%s, ...) LIMIT ?")
+
+
+class TestRequestTelemetry(TestCase):
+
+    def test_counts_queries_while_active(self):
+        telemetry = RequestTelemetry()
+        with telemetry.activate():
+            self.assertIs(current_telemetry(), telemetry)
+            get_user_model().objects.filter(username='ranger').exists()
+            get_user_model().objects.filter(username='tracker').exists()
+            record_cache_lookups(3, 1)
+        get_user_model().objects.exists()
+
+        self.assertIsNone(current_telemetry())
+        self.assertEqual(telemetry.db_queries, 2)
+        self.assertEqual(telemetry.cache_hit_rate, 0.75)
+        fingerprints = telemetry.query_fingerprints()
+        self.assertEqual(len(fingerprints), 1)
+        self.assertEqual(fingerprints[0]['count'], 2)
+
+
+class TestRequestLoggingMiddleware(TestCase):
+
+    @override_settings(SLOW_REQUEST_SECONDS=0, SLOW_REQUEST_SAMPLE_RATE=1)
+    def test_reports_request_telemetry(self):
+        def get_response(request):
+            get_user_model().objects.exists()
+            return StreamingHttpResponse(iter([b'streamed']))
+
+        request = RequestFactory().get('/api/v1.0/status')
+        request.user = mock.MagicMock(is_superuser=True)
+        request_logging_middleware = middleware.RequestLoggingMiddleware(get_response)
+
+        with mock.patch('utils.middleware.stats.histogram') as histogram, \
+                mock.patch.object(request_logging_middleware.logger, 'warning') as warning:
+            response = request_logging_middleware(request)
+
+        self.assertTrue(response.streaming)
+        values = {call[0][0]: call[0][1] for call in histogram.call_args_list}
+        self.assertEqual(values['api_request_db_queries'], 1)
+        self.assertIn('view:unresolved', histogram.call_args_list[0][1]['tags'])
+        self.assertEqual(warning.call_args[1]['extra']['db_queries'], 1)
+
+    def test_process_response_without_telemetry(self):
+        request = RequestFactory().get('/api/v1.0/status')
+        request_logging_middleware = middleware.RequestLoggingMiddleware(lambda request: HttpResponse())
+        with mock.patch('utils.middleware.stats.histogram') as histogram:
+            request_logging_middleware.process_response(request, HttpResponse())
+        histogram.assert_not_called()
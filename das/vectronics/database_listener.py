@@ -5,10 +5,11 @@ import psycopg2.extensions
 import select
 import pytz
 
+from django.contrib.gis.geos import Point
 from django.db import connections
-from observations.models import Source, Observation, SourceProvider, Subject
+from observations.models import Source, Observation, SourceProvider, SubjectStatus
+from observations.utils import is_observation_stationary_subject
 from vectronics.models import GpsPlusPositions
-from tracking.models.plugin_base import Obs
 from tracking.pubsub_registry import notify_new_tracks
 
 
@@ -19,38 +20,54 @@ MODEL_NAME = 'vectronics'
 SOURCE_PROVIDER_KEY = 'default'
 
 
-def handle_notify(notify):
+# Positions are loaded and recorded this many at a time.
+BATCH_SIZE = 1000
+
+
+def handle_notifies(payloads):
+    '''
+    Record the positions of a batch of notifications: load them in one
+    query, resolve each collar's source once and insert their observations
+    in bulk.
+    '''
+    position_ids = list(dict.fromkeys(payloads))
+    for i in range(0, len(position_ids), BATCH_SIZE):
+        chunk = position_ids[i:i + BATCH_SIZE]
+        positions = list(GpsPlusPositions.objects.filter(pk__in=chunk))
+        missing = set(chunk) - {str(position.pk) for position in positions}
+        if missing:
+            logger.warning(
+                'Notified for id_position: %s, but it does not exist in the database.', ', '.join(sorted(missing)))
+        handle_gps_plus_positions(positions)
+
+
+def ensure_sources(collar_ids):
+    '''
+    Return {collar_id: Source}, creating the sources (and their subjects)
+    of collars seen for the first time.
+    '''
+    provider, created = SourceProvider.objects.get_or_create(
+        provider_key=SOURCE_PROVIDER_KEY)
+    manufacturer_ids = {str(collar_id) for collar_id in collar_ids}
+    sources = {source.manufacturer_id: source for source in
+               Source.objects.filter(provider=provider, manufacturer_id__in=manufacturer_ids)}
 
-    try:
-        print('Handling notify...')
-        logger.info('Handling notify...')
-        position = GpsPlusPositions.objects.get(pk=notify.payload)
-        handle_gps_plus_position(position)
-    except GpsPlusPositions.DoesNotExist:
-        logger.warning(
-            'Notified for id_position: %s, but it does not exist in the database.', notify.payload)
+    for manufacturer_id in manufacturer_ids - set(sources):
+        sources[manufacturer_id] = Source.objects.ensure_source(source_type=SOURCE_TYPE,
+                                                                manufacturer_id=manufacturer_id,
+                                                                model_name=MODEL_NAME,
+                                                                provider=provider.provider_key,
+                                                                subject={
+                                                                    'subject_subtype_id': 'unassigned',
+                                                                    'name': manufacturer_id
+                                                                }
+                                                                )
+        logger.debug('Created source (%s) for collar_id: %s', sources[manufacturer_id].id, manufacturer_id)
 
+    return {collar_id: sources[str(collar_id)] for collar_id in collar_ids}
 
-def handle_gps_plus_position(position):
-    logger.info('GpsPlusPosition (%s) reported for collar: %s at %s, location: lon/lat %s, %s',
-                position.id_position,
-                position.id_collar, position.acquisition_time.isoformat(), position.longitude, position.latitude)
 
-    provider, created = SourceProvider.objects.get_or_create(
-        provider_key=SOURCE_PROVIDER_KEY)
-    manufacturer_id = position.id_collar
-    source = Source.objects.ensure_source(source_type=SOURCE_TYPE,
-                                          manufacturer_id=position.id_collar,
-                                          model_name=MODEL_NAME,
-                                          provider=provider.provider_key,
-                                          subject={
-                                              'subject_subtype_id': 'unassigned',
-                                              'name': manufacturer_id
-                                          }
-                                          )
-
-    logger.debug('{} source ({}) for collar_id: {}'.format('Created' if created else 'Found', source.id,
-                                                           position.id_collar))
+def position_to_observation(source, position):
 
     additional = dict((k, v) for k, v in position if not k.startswith('_') and v is not None and
                       k not in ('id_collar', 'latitude', 'longitude', 'acquisition_time'))
@@ -68,20 +85,59 @@ def handle_gps_plus_position(position):
 
     # Vectronics database stores a naive date that we can assume is UTC.
     recorded_at = pytz.utc.localize(position.acquisition_time)
-    observation = Obs(source=source, recorded_at=recorded_at, latitude=latitude,
-                      longitude=longitude, additional=additional)
+    return Observation(source=source, recorded_at=recorded_at,
+                       location=Point(x=longitude, y=latitude), additional=additional)
 
-    try:
-        observation, created = Observation.objects.add_observation(observation)
 
-        if created:
-            notify_new_tracks(observation.source.id)
+def handle_gps_plus_positions(positions):
+    if not positions:
+        return
+
+    sources = ensure_sources({position.id_collar for position in positions})
+
+    # A later position for the same collar and time is a duplicate.
+    observations = {}
+    for position in positions:
+        observation = position_to_observation(sources[position.id_collar], position)
+        observations.setdefault((observation.source_id, observation.recorded_at), observation)
 
-        logger.info('Recorded observation for collar_id: %s, at %s, longitude: %s, latitude: %s',
-                    position.id_collar, recorded_at.isoformat(), position.longitude, position.latitude)
+    try:
+        existing = set(Observation.objects.filter(
+            source_id__in={source.id for source in sources.values()},
+            recorded_at__in={recorded_at for _, recorded_at in observations}
+        ).values_list('source_id', 'recorded_at'))
+        new_observations = [observation for key, observation in observations.items() if key not in existing]
+        Observation.objects.bulk_create(new_observations, ignore_conflicts=True)
     except Exception:
-        logger.exception('Failed observation for collar_id: %s, at %s, longitude: %s, latitude: %s',
-                         position.id_collar, recorded_at.isoformat(), position.longitude, position.latitude)
+        logger.exception('Failed observations for collar_ids: %s',
+                         ', '.join(sorted({str(position.id_collar) for position in positions})))
+        return
+
+    logger.info('Recorded %d new observations from %d positions for %d collars.',
+                len(new_observations), len(positions), len(sources))
+
+    # Bulk inserts skip the Observation post_save handler, so bring
+    # SubjectStatus up to date and announce the new tracks once per source.
+    for source in {observation.source for observation in new_observations}:
+        latest = max((o for o in new_observations if o.source_id == source.id), key=lambda o: o.recorded_at)
+        SubjectStatus.objects.update_current_from_source(
+            source, include_empty_location=is_observation_stationary_subject(latest))
+        notify_new_tracks(source.id)
+
+
+def handle_gps_plus_position(position):
+    logger.info('GpsPlusPosition (%s) reported for collar: %s at %s, location: lon/lat %s, %s',
+                position.id_position,
+                position.id_collar, position.acquisition_time.isoformat(), position.longitude, position.latitude)
+    handle_gps_plus_positions([position])
+
+
+def drain_notifies(db_connection):
+    '''Return the payloads of every notification waiting on db_connection.'''
+    db_connection.poll()
+    payloads = [notify.payload for notify in db_connection.notifies]
+    db_connection.notifies.clear()
+    return payloads
 
 
 def start_listening():
@@ -99,9 +155,9 @@ def start_listening():
     while True:
         try:
             if select.select([db_connection], [], [], 5) != ([], [], []):
-                db_connection.poll()
-                while db_connection.notifies:
-                    notify = db_connection.notifies.pop(0)
-                    handle_notify(notify)
+                payloads = drain_notifies(db_connection)
+                if payloads:
+                    logger.info('Handling %d notifications...', len(payloads))
+                    handle_notifies(payloads)
         except psycopg2.OperationalError as oe:
             logger.exception('Caught exception in select loop.')
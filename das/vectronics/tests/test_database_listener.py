@@ -0,0 +1,53 @@
+from datetime import datetime
+from unittest import mock
+
+from django.test import TestCase
+
+from core.tests import fake_get_pool
+from observations.models import Observation, Source
+from vectronics import database_listener
+from vectronics.models import GpsPlusPositions
+
+
+class HandleGpsPlusPositionsTest(TestCase):
+
+    def make_position(self, id_position, id_collar, acquisition_time, latitude=-1.5, longitude=35.2):
+        return GpsPlusPositions(id_position=id_position, id_collar=id_collar,
+                                acquisition_time=acquisition_time,
+                                latitude=latitude, longitude=longitude, temperature=21.0)
+
+    @mock.patch("das_server.pubsub.get_pool", fake_get_pool)
+    def test_positions_are_recorded_per_collar(self):
+        positions = [
+            self.make_position(1, 4001, datetime(2021, 3, 1, 10, 0)),
+            self.make_position(2, 4001, datetime(2021, 3, 1, 11, 0)),
+            self.make_position(3, 4002, datetime(2021, 3, 1, 10, 0), latitude=None),
+            # A repeated fix for the same collar and time.
+            self.make_position(4, 4001, datetime(2021, 3, 1, 11, 0)),
+        ]
+
+        with mock.patch.object(database_listener, 'notify_new_tracks') as notify_new_tracks:
+            database_listener.handle_gps_plus_positions(positions)
+
+        sources = {source.manufacturer_id: source for source in
+                   Source.objects.filter(manufacturer_id__in=['4001', '4002'])}
+        self.assertEqual(set(sources), {'4001', '4002'})
+        self.assertEqual(Observation.objects.filter(source=sources['4001']).count(), 2)
+
+        null_position = Observation.objects.get(source=sources['4002'])
+        self.assertTrue(null_position.additional['null_position'])
+        self.assertEqual(null_position.additional['temperature'], 21.0)
+
+        self.assertEqual(sorted(call.args[0] for call in notify_new_tracks.call_args_list),
+                         sorted(source.id for source in sources.values()))
+
+    @mock.patch("das_server.pubsub.get_pool", fake_get_pool)
+    def test_known_positions_are_skipped(self):
+        position = self.make_position(1, 4001, datetime(2021, 3, 1, 10, 0))
+        database_listener.handle_gps_plus_positions([position])
+
+        with mock.patch.object(database_listener, 'notify_new_tracks') as notify_new_tracks:
+            database_listener.handle_gps_plus_positions([position])
+
+        self.assertEqual(Observation.objects.filter(source__manufacturer_id='4001').count(), 1)
+        notify_new_tracks.assert_not_called()